@@ -1,14 +1,25 @@
 from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional
 
 
 class Bot(ABC):
     """Abstract Bot representation"""
 
-    def __init__(self, settings: dict):
+    def __init__(
+        self,
+        settings: dict,
+        resume: bool = False,
+        dry_run: bool = False,
+        plan_path: Optional[Path] = None,
+    ):
         """Initialize Bot with the settings including the Sinan credentials
 
         Args:
             settings (dict): Configuration
+            resume (bool, optional): Resume the interrupted run. Defaults to False.
+            dry_run (bool, optional): Only plan the actions, nothing is submitted. Defaults to False.
+            plan_path (Optional[Path], optional): Execute the reviewed plan in this path. Defaults to None.
         """
         raise NotImplementedError("init() not implemented")
 
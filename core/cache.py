@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+
+from .constants import DATASETS_CACHE_MAX_AGE, DATASETS_CACHE_PATH
+
+
+def file_digest(path: Path, chunk_size: int = 1024**2) -> str:
+    """Compute the SHA-256 digest of a file content
+
+    Args:
+        path (Path): Path to the file
+        chunk_size (int, optional): Size of each read. Defaults to 1 MB.
+
+    Returns:
+        str: The hexadecimal digest
+    """
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DatasetCache:
+    """Content-addressed cache of converted datasets stored as Parquet files
+
+    The cache key is the digest of the source file content plus a `version` describing the
+    conversion rules, so changing the rules invalidates every entry. To avoid hashing the
+    source file on every run, its digest is remembered next to its size and mtime.
+
+    The entries of a source file whose content changed are removed, and the entries (and the
+    remembered digests) not used for `max_age` seconds are removed when storing.
+    """
+
+    def __init__(
+        self,
+        version: str,
+        folder: Path = DATASETS_CACHE_PATH,
+        max_age: float = DATASETS_CACHE_MAX_AGE,
+    ):
+        """Initialize the DatasetCache
+
+        Args:
+            version (str): Description of the conversion rules (part of the cache key)
+            folder (Path, optional): Cache folder. Defaults to `DATASETS_CACHE_PATH`.
+            max_age (float, optional): Seconds an unused entry is kept. Defaults to `DATASETS_CACHE_MAX_AGE`.
+        """
+        self.version = hashlib.sha256(version.encode()).hexdigest()[:16]
+        self.folder = folder
+        self.max_age = max_age
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+    def __meta_path(self, path: Path) -> Path:
+        """Path of the file remembering the digest of a source file"""
+        key = hashlib.sha256(str(path.resolve()).encode()).hexdigest()[:32]
+        return self.folder / f"{key}.json"
+
+    def digest(self, path: Path) -> str:
+        """Get the digest of a source file (recomputed only if its size or mtime changed)
+
+        Args:
+            path (Path): Path to the source file
+
+        Returns:
+            str: The hexadecimal digest
+        """
+        stat = path.stat()
+        meta_path = self.__meta_path(path)
+        previous: Optional[str] = None
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            previous = meta["digest"]
+            if meta["size"] == stat.st_size and meta["mtime_ns"] == stat.st_mtime_ns:
+                os.utime(meta_path)  # still in use (see `prune`)
+                return meta["digest"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        digest = file_digest(path)
+        meta = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "digest": digest}
+        meta_path.write_text(json.dumps(meta), encoding="utf-8")
+        if previous and previous != digest:
+            self.__remove_digest(previous)
+        return digest
+
+    def __remove_digest(self, digest: str):
+        """Remove the entries of a replaced content, unless another source file still has it"""
+        for meta_path in self.folder.glob("*.json"):
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if meta.get("digest") == digest:
+                return
+
+        for entry_path in self.folder.glob(f"{digest[:32]}-*.parquet"):
+            entry_path.unlink(missing_ok=True)
+
+    def prune(self):
+        """Remove the entries and the remembered digests not used for `max_age` seconds"""
+        limit = time.time() - self.max_age
+        for pattern in ("*.parquet", "*.json", "*.tmp"):
+            for path in self.folder.glob(pattern):
+                try:
+                    if path.stat().st_mtime < limit:
+                        path.unlink()
+                except OSError:
+                    pass
+
+    def __entry_path(self, path: Path) -> Path:
+        """Path of the Parquet file caching the converted source file"""
+        return self.folder / f"{self.digest(path)[:32]}-{self.version}.parquet"
+
+    def load(self, path: Path) -> Optional[pd.DataFrame]:
+        """Load the converted dataset of a source file (memory-mapped)
+
+        Args:
+            path (Path): Path to the source file
+
+        Returns:
+            Optional[pd.DataFrame]: The cached dataframe or None on cache miss
+        """
+        entry_path = self.__entry_path(path)
+        if not entry_path.exists():
+            return None
+
+        try:
+            df = pd.read_parquet(entry_path, memory_map=True)
+        except (OSError, pa.ArrowException):
+            return None
+
+        os.utime(entry_path)  # still in use (see `prune`)
+        return df
+
+    def store(self, path: Path, df: pd.DataFrame) -> bool:
+        """Store the converted dataset of a source file
+
+        Args:
+            path (Path): Path to the source file
+            df (pd.DataFrame): The converted dataframe
+
+        Returns:
+            bool: True if stored, False if the dataframe can't be saved as Parquet (eg. mixed types)
+        """
+        entry_path = self.__entry_path(path)
+        tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            df.to_parquet(tmp_path, index=False)
+        except (pa.ArrowException, ValueError, TypeError):
+            tmp_path.unlink(missing_ok=True)
+            return False
+
+        os.replace(tmp_path, entry_path)
+        self.prune()
+        return True
@@ -35,6 +35,15 @@ SETTINGS_FILE = "settings.toml"
 DATA_FOLDER = "dados"
 """Folder name to store the datasets used by the bots."""
 
+NAME_PARTICLES: list[str] = ["D", "DA", "DAS", "DE", "DI", "DO", "DOS", "DU", "E"]
+"""Name particles ignored by the canonical name keys (eg. "MARIA DA SILVA" ~ "MARIA SILVA")."""
+
+PATIENT_KEY_COLUMN = "Chave do Paciente"
+"""Column with the canonical key of the patient name (`Paciente`) in the GAL dataset."""
+
+MOTHER_KEY_COLUMN = "Chave da Mãe"
+"""Column with the canonical key of the mother name (`Nome da Mãe`) in the GAL dataset."""
+
 POSSIBLE_EXAM_TYPES = Literal["IgM", "NS1", "PCR"]
 
 EXAMS_GAL_MAP: dict[str, POSSIBLE_EXAM_TYPES] = {
@@ -52,6 +61,33 @@ EXAM_VALUE_COL_MAP: dict[POSSIBLE_EXAM_TYPES, str] = {
 }
 """Represents the column name of the exam value in the unificated dataset."""
 
+GAL_MUNICIPALITY_COLUMN = "Município de Residência"
+"""Column with the municipality of residence of the patient in the GAL dataset (routes the exams among the profiles of the same agravo)."""
+
+GAL_COLUMNS_DTYPES: Mapping[str, type | str] = {
+    "Paciente": str,
+    "Nome da Mãe": str,
+    "Núm. Notificação Sinan": str,
+    "Exame": "category",
+    "Resultado": "category",
+    "Dengue": "category",
+    "Sorotipo": "category",
+    GAL_MUNICIPALITY_COLUMN: "category",
+}
+"""Load schema of the (non-date) GAL columns used by the bots. The other columns are not loaded."""
+
+GAL_DATE_COLUMNS: list[str] = [
+    "Data de Nascimento",
+    "Data do 1º Sintomas",
+    "Data da Coleta",
+    "Data da Liberação",
+    "Data da Notificação",
+]
+"""Date columns of the GAL dataset used by the bots (parsed on load)."""
+
+GAL_DATE_FORMAT = "%d-%m-%Y"
+"""Date format of the GAL dataset."""
+
 # 5 = Descartado; 10 = Dengue
 CLASSSIFICATION_MAP: Mapping[POSSIBLE_EXAM_TYPES, Mapping[str, str | None]] = {
     "IgM": {
@@ -92,6 +128,44 @@ EXAM_RESULT_ID: Mapping[POSSIBLE_EXAM_TYPES, Mapping[str, str]] = {
 }
 """Input value map for the exam result in unificated dataset to Sinan Investigation Form"""
 
+EXAM_TYPE_COLUMN = "Tipo de Exame"
+"""Column with the exam type (`EXAMS_GAL_MAP`) derived on load in the GAL dataset."""
+
+EXAM_RESULT_COLUMN = "Resultado do Exame"
+"""Column with the exam result (`EXAM_VALUE_COL_MAP`) derived on load in the GAL dataset."""
+
+SINAN_RESULT_ID_COLUMN = "ID do Resultado Sinan"
+"""Column with the Sinan result ID (`EXAM_RESULT_ID`) derived on load in the GAL dataset."""
+
+FORMATTED_DATE_COLUMNS: Mapping[str, str] = {
+    "Data de Nascimento": "Data de Nascimento Formatada",
+    "Data da Coleta": "Data da Coleta Formatada",
+}
+"""Date columns of the GAL dataset formatted on load (dd/mm/YYYY or N/A) and the formatted column names."""
+
+EXAM_KEY_COLUMN = "Chave do Exame"
+"""Column with the content hash of the fields identifying an exam (`EXAM_KEY_FIELDS`) in the GAL dataset."""
+
+EXAM_KEY_FIELDS: list[str] = [
+    PATIENT_KEY_COLUMN,
+    MOTHER_KEY_COLUMN,
+    "Data de Nascimento",
+    EXAM_TYPE_COLUMN,
+    "Data da Coleta",
+    EXAM_RESULT_COLUMN,
+]
+"""Fields identifying an exam: the same exam in overlapping GAL exports has the same values."""
+
+PATIENT_GROUP_FIELDS: list[str] = [
+    PATIENT_KEY_COLUMN,
+    MOTHER_KEY_COLUMN,
+    "Data de Nascimento",
+]
+"""Fields identifying a patient: the exams with the same values are searched only once."""
+
+INVALID_REASON_COLUMN = "Motivo da Invalidez"
+"""Column with the reason why a GAL exam can't be processed (empty for valid exams)."""
+
 
 class NotificationType(TypedDict):
     """Represents a notification on `investigator.investigate_multiple` method. (Typescript?! LOL!)"""
@@ -126,6 +200,74 @@ SCRIPT_GENERATED_PATH.mkdir(exist_ok=True)
 UNIVERSAL_STATS_FILE_PATH = SCRIPT_GENERATED_PATH / "stats.json"
 """The path to save the universal statistics where will be saved the stats between executions."""
 
+DATASETS_CACHE_PATH = SCRIPT_GENERATED_PATH / "cache"
+"""The path to save the converted (normalized and typed) datasets as Parquet files."""
+
+DATASETS_CACHE_MAX_AGE = 30 * 24 * 3600.0
+"""Time (seconds) a cached dataset (or a remembered digest) is kept without being used."""
+
+LEDGER_PATH = SCRIPT_GENERATED_PATH / "ledger.sqlite3"
+"""The path of the SQLite database recording the exams processed in previous runs."""
+
+LEDGER_SETTLED_OUTCOMES: list[str] = ["investigated"]
+"""Outcomes of the exams that don't need to be processed again in the next runs."""
+
+JOURNAL_PATH = SCRIPT_GENERATED_PATH / "journal.jsonl"
+"""The path of the journal with the progress of the current batch (used to resume an interrupted run)."""
+
+REQUEST_TIMEOUT = 60.0
+"""Default timeout (seconds) of each request to the Sinan website (`desempenho.tempo_limite_requisicao`)."""
+
+PATIENT_TIME_BUDGET = 300.0
+"""Default time (seconds) a patient may take before being postponed to the end of the run (`desempenho.tempo_limite_paciente`)."""
+
+SNAPSHOTS_PATH = SCRIPT_GENERATED_PATH / "snapshots.sqlite3"
+"""The path of the SQLite database with the parsed notification pages (snapshots) by notification number."""
+
+SNAPSHOT_MAX_AGE = 0.0
+"""Default time (seconds) a notification snapshot is reused instead of opening the notification (`desempenho.cache_fichas`), 0 disables the snapshots."""
+
+SNAPSHOT_MEMORY_SIZE = 2000
+"""Number of notification snapshots kept in memory (the others are read from the database)."""
+
+SNAPSHOT_VERSION = 2
+"""Version of the notification snapshots. Bump it whenever `parse_notification_page` or the stored fields change to discard the stored ones."""
+
+SNAPSHOT_PAGE_FACTS: list[str] = [
+    "investigation_tab_enabled",
+    "save_button_exists",
+    "residence_checkbox_checked",
+]
+"""Facts of the notification page kept in the snapshots (the view state is never stored)."""
+
+SNAPSHOT_FORM_FIELDS: list[str] = [
+    "form:nuNotificacao",
+    "form:dtNotificacaoInputDate",
+    "form:dtPrimeirosSintomasInputDate",
+    "form:notificacao_nome_mae",
+    "form:notificacao_paciente_endereco_municipio_noMunicipiocomboboxField",
+]
+"""Fields of the notification form kept in the snapshots (the ones read by the checks of the sheets)."""
+
+SEARCH_CACHE_TTL = 0.0
+"""Default time (seconds) a search result is reused by identical searches (`desempenho.cache_pesquisa`), 0 disables the cache."""
+
+DEFAULT_EXAM_COSTS: dict[POSSIBLE_EXAM_TYPES, float] = {
+    "PCR": 20.0,
+    "NS1": 20.0,
+    "IgM": 45.0,
+}
+"""Estimated seconds spent on an exam of each type while there is no history in the ledger (IgM may analyze many episodes)."""
+
+SCHEDULING_WINDOW = 500
+"""Default number of patients reordered at a time by the scheduler (`desempenho.janela_agendamento`)."""
+
+SCHEDULING_URGENCY_DAYS = 7.0
+"""Days of age (since the collection) that double the priority of an exam in the balanced scheduling policy."""
+
+PLAN_PATH = SCRIPT_GENERATED_PATH / "plan.jsonl"
+"""The path of the plan (decided actions of each exam) generated by the dry-run to be reviewed and executed later."""
+
 
 SEARCH_POSSIBLE_CRITERIAS = Literal[
     "Nome do paciente",
@@ -166,6 +308,17 @@ POSSIBLE_AGRAVOS_LIST: list[POSSIBLE_AGRAVOS] = [
 ]
 """List of possible agravos for the app in general"""
 
+EXAMS_AGRAVO_MAP: dict[str, POSSIBLE_AGRAVOS] = {
+    "Dengue, IgM": "A90 - DENGUE",
+    "Dengue, Detecção de Antígeno NS1": "A90 - DENGUE",
+    "Dengue, Biologia Molecular": "A90 - DENGUE",
+    "Pesquisa de Arbovírus (ZDC)": "A90 - DENGUE",  # the result read is the Dengue one
+}
+"""Agravo of each exam of the Gal dataset (the multi-profile runs split the exams by it)."""
+
+AGRAVO_COLUMN = "Agravo"
+"""Column with the agravo of the exam (`EXAMS_AGRAVO_MAP`) in the exported patient data (eg. the plan)."""
+
 
 POSSIBLE_MUNICIPALITIES = Literal["FLORIANOPOLIS"]
 """[TypeHint] Possible municipalities where the app is running"""
@@ -0,0 +1,207 @@
+import mmap
+import struct
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+DELETED_FLAG = ord("*")
+"""First byte of a deleted record."""
+
+TRUE_VALUES = np.frombuffer(b"TtYy", dtype=np.uint8)
+"""First bytes of a true logical (`L`) field."""
+
+FALSE_VALUES = np.frombuffer(b"FfNn", dtype=np.uint8)
+"""First bytes of a false logical (`L`) field."""
+
+
+class DBFField(NamedTuple):
+    """Field descriptor of a DBF file"""
+
+    name: str
+    type: str
+    offset: int
+    length: int
+    decimals: int
+
+
+class DBFHeader(NamedTuple):
+    """Header of a DBF file"""
+
+    records: int
+    header_length: int
+    record_length: int
+    fields: list[DBFField]
+
+
+def read_dbf_header(buffer: Union[bytes, mmap.mmap], encoding: str) -> DBFHeader:
+    """Read the header and the field descriptors of a DBF file
+
+    Args:
+        buffer (Union[bytes, mmap.mmap]): The file content
+        encoding (str): Encoding of the field names
+
+    Returns:
+        DBFHeader: The header with the fields (offsets are relative to the record start)
+    """
+    records, header_length, record_length = struct.unpack("<IHH", buffer[4:12])
+
+    fields: list[DBFField] = []
+    offset = 1  # the first byte of each record is the deletion flag
+    position = 32
+    while position + 32 <= header_length and buffer[position] != 0x0D:
+        descriptor = buffer[position : position + 32]
+        name = descriptor[:11].split(b"\0")[0].decode(encoding).strip()
+        field_type = chr(descriptor[11])
+        length, decimals = descriptor[16], descriptor[17]
+        if field_type == "C":
+            # character fields longer than 255 bytes use the decimals byte as high byte
+            length, decimals = length | decimals << 8, 0
+
+        fields.append(DBFField(name, field_type, offset, length, decimals))
+        offset += length
+        position += 32
+
+    return DBFHeader(records, header_length, record_length, fields)
+
+
+@lru_cache
+def is_single_byte_encoding(encoding: str) -> bool:
+    """Check if every byte of the encoding decodes to exactly one character (eg. latin-1)
+
+    Args:
+        encoding (str): The encoding name
+
+    Returns:
+        bool: True if the encoding is single byte
+    """
+    return len(bytes(range(256)).decode(encoding, errors="replace")) == 256
+
+
+def _decode_text(raw: np.ndarray, encoding: str) -> np.ndarray:
+    """Decode a fixed width bytes column (`S<n>`) to stripped strings (empty as None)
+
+    Args:
+        raw (np.ndarray): The bytes column
+        encoding (str): The text encoding
+
+    Returns:
+        np.ndarray: Object array of strings
+    """
+    width = raw.dtype.itemsize
+    if is_single_byte_encoding(encoding):
+        # decode the whole column at once and reinterpret it as fixed width unicode
+        text = raw.tobytes().decode(encoding, errors="replace")
+        values = np.frombuffer(text.encode("utf-32-le"), dtype=f"<U{width}")
+    else:
+        values = np.char.decode(raw, encoding, errors="replace")
+
+    values = np.char.strip(np.char.rstrip(values, "\0")).astype(object)
+    values[values == ""] = None
+    return values
+
+
+def _decode_field(raw: np.ndarray, field: DBFField, encoding: str) -> np.ndarray:
+    """Decode the raw bytes of one field into a typed column
+
+    Args:
+        raw (np.ndarray): The field bytes, one row per record (uint8, contiguous)
+        field (DBFField): The field descriptor
+        encoding (str): The text encoding
+
+    Returns:
+        np.ndarray | pd.Series | pd.DatetimeIndex: The typed column
+    """
+    if field.type == "I":
+        return raw.view("<i4").ravel()
+
+    if field.type == "L":
+        first = raw[:, 0]
+        values = np.full(len(first), None, dtype=object)
+        values[np.isin(first, TRUE_VALUES)] = True
+        values[np.isin(first, FALSE_VALUES)] = False
+        return values
+
+    fixed = raw.view(f"S{field.length}").ravel()
+
+    if field.type in ("N", "F"):
+        numbers = pd.to_numeric(
+            pd.Series(np.char.strip(fixed).astype("U")), errors="coerce"
+        )
+        if field.decimals == 0 and not numbers.isna().any():
+            return numbers.astype("int64").to_numpy()
+        return numbers.to_numpy()
+
+    if field.type == "D":
+        return pd.to_datetime(
+            np.char.strip(fixed).astype("U"), format="%Y%m%d", errors="coerce"
+        )
+
+    return _decode_text(fixed, encoding)
+
+
+def read_dbf(
+    path: Path,
+    columns: Optional[Union[Sequence[str], Callable[[str], bool]]] = None,
+    encoding: str = "latin-1",
+    as_arrow: bool = False,
+) -> Union[pd.DataFrame, pa.Table]:
+    """Read a DBF file column by column from a memory-mapped file
+
+    The fixed width records are viewed as a 2D byte matrix and each (projected) field is
+    decoded at once into a typed column. Deleted records are skipped.
+
+    Args:
+        path (Path): Path to the `.dbf` file
+        columns (Optional[Union[Sequence[str], Callable[[str], bool]]], optional): Fields to read or a
+            callable selecting the fields by name. Defaults to None (every field).
+        encoding (str, optional): Text encoding. Defaults to "latin-1".
+        as_arrow (bool, optional): Return an Arrow table instead of a DataFrame. Defaults to False.
+
+    Raises:
+        ValueError: Some requested field doesn't exist in the file
+
+    Returns:
+        Union[pd.DataFrame, pa.Table]: The loaded data
+    """
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header = read_dbf_header(mm, encoding)
+
+        fields = header.fields
+        if callable(columns):
+            fields = [field for field in fields if columns(field.name)]
+        elif columns is not None:
+            by_name = {field.name: field for field in fields}
+            missing = [column for column in columns if column not in by_name]
+            if missing:
+                raise ValueError(f"Campos não encontrados no arquivo DBF: {missing}")
+            fields = [by_name[column] for column in columns]
+
+        # the records count in the header may be wrong in truncated exports
+        available = (len(mm) - header.header_length) // max(header.record_length, 1)
+        records_count = min(header.records, available)
+
+        records = np.frombuffer(
+            mm,
+            dtype=np.uint8,
+            count=records_count * header.record_length,
+            offset=header.header_length,
+        ).reshape(records_count, header.record_length)
+        alive = records[:, 0] != DELETED_FLAG
+
+        data = {
+            field.name: _decode_field(
+                # fancy indexing copies, so nothing references the mmap afterwards
+                records[alive, field.offset : field.offset + field.length],
+                field,
+                encoding,
+            )
+            for field in fields
+        }
+        del records, alive
+
+    df = pd.DataFrame(data, columns=[field.name for field in fields])
+    return pa.Table.from_pandas(df, preserve_index=False) if as_arrow else df
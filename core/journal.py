@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .constants import JOURNAL_PATH
+
+
+class Journal:
+    """Append-only journal (JSON lines) of the progress of each exam in the current batch
+
+    Each entry is written with a single `write` and synced to the disk before the bot moves on,
+    so after a crash the journal tells exactly which steps (eg. a saved investigation or a deleted
+    notification) already succeeded. A partially written last line is ignored on load.
+
+    Entries: `{"exam": <exam key>, "step": <step>, "notification": <notification number>, "at": <datetime>}`
+    """
+
+    def __init__(self, path: Path = JOURNAL_PATH, resume: bool = False):
+        """Initialize the Journal
+
+        Args:
+            path (Path, optional): Path to the journal file. Defaults to `JOURNAL_PATH`.
+            resume (bool, optional): Keep the entries of the interrupted run, otherwise a new
+                journal is started and the previous one is kept as `<name>.prev` (`rotated`),
+                so forgetting `--resume` once doesn't lose it. Defaults to False.
+        """
+        self.path = path
+        self.rotated: Optional[Path] = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.__steps: set[tuple[int, str, str]] = set()
+        self.__finished: set[int] = set()
+        self.__notification_steps: set[tuple[str, str]] = set()
+        self.__lock = threading.Lock()
+
+        if resume:
+            self.__load()
+        elif self.path.exists() and self.path.stat().st_size:
+            self.rotated = self.path.with_name(f"{self.path.name}.prev")
+            os.replace(self.path, self.rotated)
+        else:
+            self.path.unlink(missing_ok=True)
+
+        self.__fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        if resume and self.path.stat().st_size:
+            with self.path.open("rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # terminate the partially written line, so the next entry stays valid
+                    os.write(self.__fd, b"\n")
+
+    def __load(self):
+        """Load the entries of the interrupted run"""
+        if not self.path.exists():
+            return
+
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # interrupted while writing
+
+                self.__remember(entry["exam"], entry["step"], entry["notification"])
+
+    def __remember(self, exam: int, step: str, notification: str):
+        """Keep the entry in memory"""
+        self.__steps.add((exam, step, notification))
+        self.__notification_steps.add((step, notification))
+        if step == "done":
+            self.__finished.add(exam)
+
+    def append(self, exam: Optional[int], step: str, notification: str = ""):
+        """Append an entry to the journal (synced to the disk before returning)
+
+        Args:
+            exam (Optional[int]): The exam key, exams without key are ignored
+            step (str): The step done (eg. "decided", "investigated", "deleted", "done")
+            notification (str, optional): The Sinan notification number involved. Defaults to "".
+        """
+        if exam is None:
+            return
+
+        line = json.dumps(
+            {
+                "exam": exam,
+                "step": step,
+                "notification": notification,
+                "at": datetime.now().isoformat(timespec="seconds"),
+            },
+            ensure_ascii=False,
+        )
+        with self.__lock:
+            os.write(self.__fd, f"{line}\n".encode("utf-8"))
+            os.fsync(self.__fd)
+            self.__remember(exam, step, notification)
+
+    def is_finished(self, exam: Optional[int]) -> bool:
+        """Check if the exam was completely processed
+
+        Args:
+            exam (Optional[int]): The exam key
+
+        Returns:
+            bool: True if the exam reached the "done" step
+        """
+        return exam in self.__finished
+
+    def has_done(
+        self, step: str, exams: Iterable[Optional[int]], notification: str
+    ) -> bool:
+        """Check if a step on a notification already succeeded for every exam
+
+        Args:
+            step (str): The step (eg. "investigated", "deleted")
+            exams (Iterable[Optional[int]]): The exam keys
+            notification (str): The Sinan notification number
+
+        Returns:
+            bool: True if every exam has the step on the notification
+        """
+        exams = list(exams)
+        return bool(exams) and all(
+            (exam, step, notification) in self.__steps for exam in exams
+        )
+
+    def notification_has_done(self, step: str, notification: str) -> bool:
+        """Check if a step on a notification already succeeded for any exam (eg. "deleted")
+
+        Args:
+            step (str): The step
+            notification (str): The Sinan notification number
+
+        Returns:
+            bool: True if the step was done on the notification
+        """
+        return (step, notification) in self.__notification_steps
+
+    def close(self):
+        """Close the journal file"""
+        os.close(self.__fd)
@@ -0,0 +1,158 @@
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from .constants import LEDGER_PATH, LEDGER_SETTLED_OUTCOMES
+
+
+def to_signed_keys(keys: Iterable[int]) -> np.ndarray:
+    """Reinterpret unsigned 64 bits keys (eg. `pd.util.hash_pandas_object`) as the signed integers SQLite stores
+
+    Args:
+        keys (Iterable[int]): The unsigned keys
+
+    Returns:
+        np.ndarray: The signed keys (int64)
+    """
+    return np.asarray(keys, dtype=np.uint64).view(np.int64)
+
+
+class ExamLedger:
+    """Persistent record (SQLite) of the exams already processed in previous runs
+
+    Each exam (by its key) keeps the outcome of its last processing and the Sinan notification
+    numbers involved. The exams with a settled outcome (`LEDGER_SETTLED_OUTCOMES`) don't need to
+    be processed again. The time spent on each exam is also kept (by exam type and number of
+    results found) to estimate the cost of the next ones (see `investigation.scheduler`).
+    """
+
+    def __init__(self, path: Path = LEDGER_PATH):
+        """Initialize the ExamLedger (the database is created if it doesn't exist)
+
+        Args:
+            path (Path, optional): Path to the SQLite database. Defaults to `LEDGER_PATH`.
+        """
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.__lock = threading.Lock()
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS exams (
+                key INTEGER PRIMARY KEY,
+                outcome TEXT NOT NULL,
+                notification_numbers TEXT NOT NULL DEFAULT '',
+                processed_at TEXT NOT NULL
+            )
+            """
+        )
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS timings (
+                exam_type TEXT NOT NULL,
+                results INTEGER NOT NULL,
+                seconds REAL NOT NULL,
+                recorded_at TEXT NOT NULL
+            )
+            """
+        )
+        self.connection.commit()
+
+    def settled_keys(self) -> np.ndarray:
+        """Get the keys of the exams with a settled outcome
+
+        Returns:
+            np.ndarray: The unsigned keys (uint64), comparable to the exam key column
+        """
+        placeholders = ", ".join("?" for _ in LEDGER_SETTLED_OUTCOMES)
+        rows = self.connection.execute(
+            f"SELECT key FROM exams WHERE outcome IN ({placeholders})",
+            list(LEDGER_SETTLED_OUTCOMES),
+        ).fetchall()
+        return np.fromiter((row[0] for row in rows), dtype=np.int64).view(np.uint64)
+
+    def record(
+        self,
+        key: Optional[int],
+        outcome: str,
+        notification_numbers: Iterable[str] = (),
+    ):
+        """Record (or replace) the outcome of an exam
+
+        Args:
+            key (Optional[int]): The exam key, exams without key are ignored
+            outcome (str): The outcome (eg. "investigated", "not_found")
+            notification_numbers (Iterable[str], optional): The Sinan notification numbers involved. Defaults to ().
+        """
+        if key is None:
+            return
+
+        with self.__lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO exams (key, outcome, notification_numbers, processed_at) VALUES (?, ?, ?, ?)",
+                (
+                    int(to_signed_keys([key])[0]),
+                    outcome,
+                    ";".join(notification_numbers),
+                    datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
+            self.connection.commit()
+
+    def notification_counts(self) -> dict[int, int]:
+        """Get the number of notifications found for the exams processed without a settled outcome
+
+        Returns:
+            dict[int, int]: The number of notifications by unsigned exam key
+        """
+        placeholders = ", ".join("?" for _ in LEDGER_SETTLED_OUTCOMES)
+        rows = self.connection.execute(
+            f"SELECT key, notification_numbers FROM exams WHERE outcome NOT IN ({placeholders})",
+            list(LEDGER_SETTLED_OUTCOMES),
+        ).fetchall()
+        keys = np.fromiter((row[0] for row in rows), dtype=np.int64).view(np.uint64)
+        return {
+            int(key): len(numbers.split(";")) if numbers else 0
+            for key, (_, numbers) in zip(keys, rows)
+        }
+
+    def record_timings(self, timings: Iterable[tuple[str, int, float]]):
+        """Record the time spent on processed exams
+
+        Args:
+            timings (Iterable[tuple[str, int, float]]): The exam type, the number of results
+                found and the seconds spent on each exam
+        """
+        recorded_at = datetime.now().isoformat(timespec="seconds")
+        with self.__lock:
+            self.connection.executemany(
+                "INSERT INTO timings (exam_type, results, seconds, recorded_at) VALUES (?, ?, ?, ?)",
+                [
+                    (exam_type, results, seconds, recorded_at)
+                    for exam_type, results, seconds in timings
+                ],
+            )
+            self.connection.commit()
+
+    def average_timings(self) -> dict[tuple[str, int], tuple[float, int]]:
+        """Get the average time spent on the exams by exam type and number of results
+
+        Returns:
+            dict[tuple[str, int], tuple[float, int]]: The average seconds and the number of exams
+                recorded, by exam type and number of results
+        """
+        rows = self.connection.execute(
+            "SELECT exam_type, results, AVG(seconds), COUNT(*) FROM timings GROUP BY exam_type, results"
+        ).fetchall()
+        return {
+            (exam_type, results): (seconds, count)
+            for exam_type, results, seconds, count in rows
+        }
+
+    def close(self):
+        """Close the database connection"""
+        self.connection.close()
@@ -0,0 +1,73 @@
+import sys
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Get the peak resident set size (RSS) of the process
+
+    Returns:
+        Optional[float]: The peak RSS in MB or None if not available (Windows)
+    """
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return max_rss / 1024**2 if sys.platform == "darwin" else max_rss / 1024
+
+
+class MemoryTracker:
+    """Tracks the Python allocations of each unit of work (patient) using `tracemalloc`
+
+    Attributes:
+        last_allocation_mb (float): Peak allocation of the last tracked unit (MB)
+        last_retained_mb (float): Memory retained after the last tracked unit (MB)
+    """
+
+    def __init__(self):
+        self.last_allocation_mb = 0.0
+        self.last_retained_mb = 0.0
+
+    def start(self):
+        """Start tracing the Python allocations"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stop(self):
+        """Stop tracing the Python allocations"""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @property
+    def traced_mb(self) -> float:
+        """Memory currently allocated by Python (MB)
+
+        Returns:
+            float: The traced memory in MB
+        """
+        current, _ = tracemalloc.get_traced_memory()
+        return current / 1024**2
+
+    @contextmanager
+    def track(self) -> Iterator["MemoryTracker"]:
+        """Track the allocations made inside the context
+
+        Yields:
+            MemoryTracker: The tracker itself (results are available after the context)
+        """
+        self.start()
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        try:
+            yield self
+        finally:
+            after, peak = tracemalloc.get_traced_memory()
+            self.last_allocation_mb = (peak - before) / 1024**2
+            self.last_retained_mb = (after - before) / 1024**2
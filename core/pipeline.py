@@ -0,0 +1,300 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Hashable, Iterable, Mapping, Optional, Sequence, Union
+
+from .utils import Printter
+
+display = Printter("PIPELINE")
+
+_DONE = object()
+"""Sentinel that tells the workers of a stage that there is no more work"""
+
+_POLL_INTERVAL = 0.5
+"""Seconds between the checks of the stop flag while waiting on a queue"""
+
+
+class Stage:
+    """A pipeline stage: a function run by its own workers, reading a bounded input queue
+
+    Attributes:
+        name (str): The stage name (shown in the monitor)
+        processed (int): Work units finished by the stage
+        busy (float): Seconds spent running the stage function (all workers)
+        starved (float): Seconds the workers waited for input
+        blocked (float): Seconds the workers waited for room in the next queue
+        max_depth (int): Largest size observed of the input queue
+    """
+
+    def __init__(
+        self, name: str, fn: Callable[[Any], Any], workers: int, queue_size: int
+    ):
+        """Initialize the Stage
+
+        Args:
+            name (str): The stage name
+            fn (Callable[[Any], Any]): Function run on each work unit, its return goes to the next stage
+            workers (int): Number of workers (threads) of the stage
+            queue_size (int): Capacity of the input queue (a full queue blocks the previous stage)
+        """
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self.processed = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+        self.max_depth = 0
+        self.active = 0
+        self.lock = threading.Lock()
+
+    def add_time(self, attribute: str, seconds: float):
+        """Accumulate the time of a worker in one of the stage counters"""
+        with self.lock:
+            setattr(self, attribute, getattr(self, attribute) + seconds)
+
+
+class Pipeline:
+    """Producer/consumer pipeline of stages connected by bounded queues
+
+    Every work unit holds a lane (eg. a logged Sinan session) from its first stage until the
+    end of the last one, so the lane is used by a single stage at a time. The lanes and the
+    bounded queues are the backpressure: when the later stages are slow the queues fill up,
+    the earlier stages block and no more lanes are taken.
+
+    The lanes can be split in pools (eg. the sessions of each agravo), then each work unit takes
+    a lane of the pool given by `route`.
+    """
+
+    def __init__(
+        self,
+        lanes: Union[Sequence[Any], Mapping[Hashable, Sequence[Any]]],
+        stages: Sequence[tuple[str, Callable[[Any], Any], int]],
+        queue_size: int = 4,
+        monitor_interval: float = 30.0,
+        route: Optional[Callable[[Any], Hashable]] = None,
+    ):
+        """Initialize the Pipeline
+
+        Args:
+            lanes (Union[Sequence[Any], Mapping[Hashable, Sequence[Any]]]): The lanes (resources)
+                shared by the work units, or the pools of lanes by key
+            stages (Sequence[tuple[str, Callable[[Any], Any], int]]): The stages (name, function, workers)
+                in order. The first function receives `(lane, item)`, the others the return of the
+                previous one.
+            queue_size (int, optional): Capacity of each stage queue. Defaults to 4.
+            monitor_interval (float, optional): Seconds between the queue reports. Defaults to 30.0.
+            route (Optional[Callable[[Any], Hashable]], optional): Gives the pool key of a work unit,
+                required when the lanes are split in pools. Defaults to None.
+        """
+        self.stages = [
+            Stage(name, fn, workers, queue_size) for name, fn, workers in stages
+        ]
+        pools = lanes if isinstance(lanes, Mapping) else {None: lanes}
+        self.pools: dict[Hashable, queue.Queue] = {}
+        self.__pool_of: dict[int, Hashable] = {}
+        for key, pool in pools.items():
+            self.pools[key] = queue.Queue()
+            for lane in pool:
+                self.pools[key].put(lane)
+                self.__pool_of[id(lane)] = key
+        self.route = route or (lambda item: None)
+        self.lanes_count = len(self.__pool_of)
+        self.lane_wait = 0.0
+        self.monitor_interval = monitor_interval
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__error: Optional[BaseException] = None
+
+    def __put(self, target: queue.Queue, item: Any) -> bool:
+        """Put an item in a queue waiting for room (returns False if the pipeline stopped)"""
+        while not self.__stop.is_set():
+            try:
+                target.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __get(self, source: queue.Queue) -> Any:
+        """Get an item from a queue waiting for one (returns `_DONE` if the pipeline stopped)"""
+        while not self.__stop.is_set():
+            try:
+                return source.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def __fail(self, error: BaseException):
+        """Stop the pipeline keeping the first error (re-raised by `run`)"""
+        if self.__error is None:
+            self.__error = error
+        self.__stop.set()
+
+    def __worker(self, index: int):
+        """Run the stage function on each work unit of the stage queue
+
+        Args:
+            index (int): The stage index
+        """
+        stage = self.stages[index]
+        is_first = index == 0
+        is_last = index == len(self.stages) - 1
+        next_stage = None if is_last else self.stages[index + 1]
+
+        try:
+            while True:
+                waiting = time.perf_counter()
+                item = self.__get(stage.queue)
+                stage.add_time("starved", time.perf_counter() - waiting)
+                if item is _DONE:
+                    break
+
+                if is_first:
+                    waiting = time.perf_counter()
+                    lane = self.__get(self.pools[self.route(item)])
+                    with self.__lock:
+                        self.lane_wait += time.perf_counter() - waiting
+                    if lane is _DONE:
+                        break
+                    payload = (lane, item)
+                else:
+                    lane, payload = item
+
+                released = False
+                try:
+                    started = time.perf_counter()
+                    result = stage.fn(payload)
+                    stage.add_time("busy", time.perf_counter() - started)
+                    with stage.lock:
+                        stage.processed += 1
+
+                    if next_stage is not None:
+                        waiting = time.perf_counter()
+                        released = not self.__put(next_stage.queue, (lane, result))
+                        next_stage.max_depth = max(
+                            next_stage.max_depth, next_stage.queue.qsize()
+                        )
+                        stage.add_time("blocked", time.perf_counter() - waiting)
+                    else:
+                        released = True
+                except BaseException:
+                    released = True
+                    raise
+                finally:
+                    if released:
+                        self.pools[self.__pool_of[id(lane)]].put(lane)
+        except BaseException as error:
+            self.__fail(error)
+        finally:
+            with stage.lock:
+                stage.active -= 1
+                last_worker = stage.active == 0
+            # the last worker leaving tells the next stage that there is no more work
+            if last_worker and next_stage is not None:
+                for _ in range(next_stage.workers):
+                    self.__put(next_stage.queue, _DONE)
+
+    def __queues_summary(self) -> str:
+        """Describe the queues depths and the free lanes"""
+        queues = ", ".join(
+            f"{stage.name} {stage.queue.qsize()}/{stage.queue.maxsize}"
+            for stage in self.stages
+        )
+        return f"Filas: {queues} | sessões livres: {self.free_lanes}/{self.lanes_count}"
+
+    @property
+    def free_lanes(self) -> int:
+        """Number of lanes not taken by a work unit (all the pools)"""
+        return sum(pool.qsize() for pool in self.pools.values())
+
+    def bottleneck(self) -> Stage:
+        """Get the stage with the highest occupation (busy time per worker)
+
+        Returns:
+            Stage: The slowest stage, the reason why the queues before it grow
+        """
+        return max(self.stages, key=lambda stage: stage.busy / stage.workers)
+
+    def __monitor(self):
+        """Show the queues periodically while the pipeline runs"""
+        while not self.__stop.wait(self.monitor_interval):
+            for stage in self.stages:
+                stage.max_depth = max(stage.max_depth, stage.queue.qsize())
+            # a full queue means its stage is slower than the previous one
+            full = [
+                stage.name
+                for stage in self.stages[1:]
+                if stage.queue.qsize() >= stage.queue.maxsize
+            ]
+            message = self.__queues_summary()
+            if full:
+                message += f" | filas cheias (etapa lenta): {', '.join(full)}"
+            elif not self.free_lanes:
+                message += f" | todas as sessões ocupadas (gargalo atual: {self.bottleneck().name})"
+            display(message, category="info")
+
+    def summary(self) -> str:
+        """Describe the stages counters (processed, occupation and waits)
+
+        Returns:
+            str: One line per stage and the bottleneck
+        """
+        lines = [
+            f"{stage.name}: {stage.processed} processados, {stage.workers} trabalhador(es), "
+            f"ocupado {stage.busy:.1f}s, sem entrada {stage.starved:.1f}s, "
+            f"bloqueado pela fila seguinte {stage.blocked:.1f}s, fila máxima {stage.max_depth}"
+            for stage in self.stages
+        ]
+        lines.append(f"Espera por sessão livre: {self.lane_wait:.1f}s")
+        lines.append(f"Etapa mais lenta (gargalo): {self.bottleneck().name}")
+        return "\n".join(lines)
+
+    def run(self, items: Iterable[Any]):
+        """Run the items through the stages (blocks until every item leaves the last stage)
+
+        Args:
+            items (Iterable[Any]): The work units of the first stage
+
+        Raises:
+            BaseException: The first error raised by a stage (the pipeline stops on it)
+        """
+        threads = []
+        for index, stage in enumerate(self.stages):
+            stage.active = stage.workers
+            for number in range(stage.workers):
+                thread = threading.Thread(
+                    target=self.__worker,
+                    args=(index,),
+                    name=f"{stage.name}-{number + 1}",
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+
+        monitor = threading.Thread(target=self.__monitor, daemon=True)
+        monitor.start()
+
+        first = self.stages[0]
+        try:
+            for item in items:
+                first.max_depth = max(first.max_depth, first.queue.qsize())
+                if not self.__put(first.queue, item):
+                    break
+            for _ in range(first.workers):
+                self.__put(first.queue, _DONE)
+
+            for thread in threads:
+                thread.join()
+        except BaseException as error:
+            self.__fail(error)
+            for thread in threads:
+                thread.join()
+        finally:
+            self.__stop.set()
+            monitor.join()
+
+        display(self.summary(), category="info")
+        if self.__error is not None:
+            raise self.__error
@@ -0,0 +1,88 @@
+import threading
+from typing import Any, Literal, NamedTuple, Optional
+
+import requests
+
+from .session import DeadlineExceeded, ViewStateNotFound
+
+FAILURE_CLASSES = Literal["timeout", "view_state", "missing_tab", "server_error"]
+
+FAILURE_CLASSES_TRANSLATED: dict[FAILURE_CLASSES, str] = {
+    "timeout": "Tempo limite excedido",
+    "view_state": "Estado de visualização expirado",
+    "missing_tab": "Aba ou formulário não encontrado",
+    "server_error": "Erro do servidor",
+}
+"""Friendly name of each failure class"""
+
+RETRYABLE_ERRORS = (DeadlineExceeded, requests.RequestException, FileNotFoundError)
+"""Errors that postpone the patient to a retry instead of stopping the run"""
+
+
+class RetryStrategy(NamedTuple):
+    """How a retry round is done, each round escalates the previous one"""
+
+    description: str
+    fresh_session: bool  # login again (new server session) before the round
+    split_groups: bool  # search each exam alone, reloading every page
+    request_interval: float  # minimum seconds between the requests of a session
+
+
+RETRY_STRATEGIES: tuple[RetryStrategy, ...] = (
+    RetryStrategy("nova sessão", True, False, 0.0),
+    RetryStrategy("nova sessão e páginas recarregadas por exame", True, True, 0.0),
+    RetryStrategy("nova sessão, páginas recarregadas e ritmo reduzido", True, True, 2.0),
+)
+"""Strategy of each retry round, in order"""
+
+
+def classify_failure(error: BaseException) -> Optional[FAILURE_CLASSES]:
+    """Get the failure class of an error
+
+    Args:
+        error (BaseException): The error raised while processing a patient
+
+    Returns:
+        Optional[FAILURE_CLASSES]: The failure class or None if the error is not retryable
+    """
+    if isinstance(error, (DeadlineExceeded, requests.Timeout)):
+        return "timeout"
+    if isinstance(error, ViewStateNotFound):
+        return "view_state"
+    if isinstance(error, FileNotFoundError):
+        return "missing_tab"
+    if isinstance(error, requests.RequestException):
+        return "server_error"
+    return None
+
+
+class RetryQueue:
+    """Failed work units (eg. patient groups) grouped by failure class, replayed after the main pass"""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__items: dict[FAILURE_CLASSES, list[Any]] = {}
+
+    def add(self, failure: FAILURE_CLASSES, item: Any):
+        """Add a failed work unit
+
+        Args:
+            failure (FAILURE_CLASSES): The failure class
+            item (Any): The work unit
+        """
+        with self.__lock:
+            self.__items.setdefault(failure, []).append(item)
+
+    def drain(self) -> dict[FAILURE_CLASSES, list[Any]]:
+        """Take every failed work unit (the queue is emptied)
+
+        Returns:
+            dict[FAILURE_CLASSES, list[Any]]: The work units by failure class
+        """
+        with self.__lock:
+            items, self.__items = self.__items, {}
+        return items
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return sum(len(items) for items in self.__items.values())
@@ -0,0 +1,146 @@
+import time
+from contextlib import contextmanager
+from typing import Callable, Hashable, Iterator, Optional
+
+import requests
+
+from .constants import REQUEST_TIMEOUT
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request is made after the time budget of the current patient is over"""
+
+
+class ServerError(requests.HTTPError):
+    """Raised when the Sinan website answers with a server error (5xx)"""
+
+
+class ViewStateNotFound(FileNotFoundError):
+    """Raised when a Sinan page doesn't have the `javax.faces.ViewState` (eg. expired session)"""
+
+
+class ViewExpired(ViewStateNotFound):
+    """Raised when the Sinan answers that the view state of the page expired (`ViewExpiredException`)"""
+
+
+class SessionExpired(ViewExpired):
+    """Raised when the Sinan redirects to the login page (dropped session), after logging in again"""
+
+
+_LOGIN_PATH = "/sinan/login/login.jsf"
+"""Path of the login page, where the Sinan redirects the requests of a dropped session"""
+
+
+class SinanSession(requests.Session):
+    """A requests session where every request has a timeout and respects the patient budget
+
+    The time budget is spent only inside `metered` contexts (the time waiting in a queue of the
+    pipeline doesn't count). A request made after the budget is over raises `DeadlineExceeded`,
+    and the timeout of each request is reduced to the budget left. A server error (5xx) raises
+    `ServerError`, and `request_interval` slows down the requests (see `core.retry`).
+
+    `results_page` identifies the search whose results page is the current one in the server
+    session (a sheet can only be opened from it, see `Sheet`).
+
+    Each response is also classified: a page with `ViewExpiredException` raises `ViewExpired`
+    and a redirect to the login page logs in again (`on_session_expired`) and raises
+    `SessionExpired`, so the caller can go back to where it was (see `Sheet`).
+    """
+
+    def __init__(self, timeout: float = REQUEST_TIMEOUT):
+        """Initialize the SinanSession
+
+        Args:
+            timeout (float, optional): Default timeout of each request (seconds). Defaults to `REQUEST_TIMEOUT`.
+        """
+        super().__init__()
+        self.timeout = timeout
+        self.request_interval = 0.0
+        self.on_session_expired: Optional[Callable[[], None]] = None
+        self.results_page: Optional[Hashable] = None
+        self.__relogging = False
+        self.__last_request = 0.0
+        self.__budget: Optional[float] = None
+        self.__deadline: Optional[float] = None
+
+    def set_budget(self, seconds: Optional[float]):
+        """Set the time budget of the next unit of work (eg. a patient)
+
+        Args:
+            seconds (Optional[float]): The budget in seconds, None (or 0) to disable it
+        """
+        self.__budget = seconds or None
+
+    @property
+    def budget_left(self) -> Optional[float]:
+        """Seconds left of the budget (None if there is no budget)"""
+        return self.__budget
+
+    @contextmanager
+    def metered(self) -> Iterator[None]:
+        """Spend the budget with the time spent inside the context
+
+        Raises:
+            DeadlineExceeded: (inside the context) When a request is made after the deadline
+        """
+        if self.__budget is None:
+            yield
+            return
+
+        started = time.monotonic()
+        self.__deadline = started + self.__budget
+        try:
+            yield
+        finally:
+            self.__budget -= time.monotonic() - started
+            self.__deadline = None
+
+    def request(self, method, url, *args, **kwargs) -> requests.Response:
+        """Make a request with the default timeout, limited to the budget left
+
+        Raises:
+            DeadlineExceeded: When the budget is over
+            ServerError: When the response is a server error (5xx)
+            ViewExpired: When the view state expired
+            SessionExpired: When the session was dropped (logged in again before raising)
+        """
+        if self.request_interval:
+            wait = self.__last_request + self.request_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+
+        timeout = kwargs.pop("timeout", None) or self.timeout
+        if self.__deadline is not None:
+            remaining = self.__deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"{method} {url}")
+            timeout = min(timeout, remaining)
+
+        try:
+            res = super().request(method, url, *args, timeout=timeout, **kwargs)
+        finally:
+            self.__last_request = time.monotonic()
+
+        if res.status_code >= 500:
+            raise ServerError(f"{res.status_code} em {method} {url}", response=res)
+        self.__check_expired(method, url, res)
+        return res
+
+    def __check_expired(self, method: str, url: str, res: requests.Response):
+        """Classify the response: a login page (dropped session) or an expired view state
+
+        Raises:
+            SessionExpired: When the request was redirected to the login page
+            ViewExpired: When the page says the view state expired
+        """
+        if _LOGIN_PATH in res.url and _LOGIN_PATH not in url:
+            if self.on_session_expired and not self.__relogging:
+                self.__relogging = True
+                try:
+                    self.on_session_expired()
+                finally:
+                    self.__relogging = False
+            raise SessionExpired(f"Sessão expirada em {method} {url}")
+
+        if b"ViewExpiredException" in res.content:
+            raise ViewExpired(f"Estado de visualização expirado em {method} {url}")
@@ -0,0 +1,184 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from .constants import (
+    SNAPSHOT_FORM_FIELDS,
+    SNAPSHOT_MAX_AGE,
+    SNAPSHOT_MEMORY_SIZE,
+    SNAPSHOT_PAGE_FACTS,
+    SNAPSHOT_VERSION,
+    SNAPSHOTS_PATH,
+)
+
+
+class Snapshot(NamedTuple):
+    """The parsed notification page of a notification and when it was taken"""
+
+    page: dict  # the page facts read by the checks (`SNAPSHOT_PAGE_FACTS`)
+    form_data: dict  # the form fields read by the checks (`SNAPSHOT_FORM_FIELDS`)
+    version: int
+    taken_at: float  # epoch seconds
+
+
+class NotificationSnapshots:
+    """Store of the parsed notification pages by notification number (`form:nuNotificacao`)
+
+    The most recent snapshots are kept in memory (LRU) and every snapshot is persisted in
+    SQLite, so the next runs reuse them too. A snapshot older than `max_age` or taken with
+    another version of the parsing rules (`SNAPSHOT_VERSION`) is ignored. The snapshot of a
+    notification is dropped when it is changed (`invalidate`).
+
+    Only the page facts and form fields read by the checks of the sheets are kept, so
+    the patient data and the view state of the page are not written to the database.
+    """
+
+    def __init__(
+        self,
+        path: Path = SNAPSHOTS_PATH,
+        max_age: float = SNAPSHOT_MAX_AGE,
+        memory_size: int = SNAPSHOT_MEMORY_SIZE,
+    ):
+        """Initialize the NotificationSnapshots (the database is created if it doesn't exist)
+
+        Args:
+            path (Path, optional): Path to the SQLite database. Defaults to `SNAPSHOTS_PATH`.
+            max_age (float, optional): Seconds a snapshot is valid. Defaults to `SNAPSHOT_MAX_AGE`.
+            memory_size (int, optional): Snapshots kept in memory. Defaults to `SNAPSHOT_MEMORY_SIZE`.
+        """
+        self.path = path
+        self.max_age = max_age
+        self.memory_size = memory_size
+        self.hits = 0
+        self.misses = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.__lock = threading.Lock()
+        self.__memory: OrderedDict[str, Snapshot] = OrderedDict()
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS snapshots (
+                notification_number TEXT PRIMARY KEY,
+                page TEXT NOT NULL,
+                form_data TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                taken_at REAL NOT NULL
+            )
+            """
+        )
+        self.connection.execute(
+            "DELETE FROM snapshots WHERE version != ? OR taken_at < ?",
+            (SNAPSHOT_VERSION, time.time() - max_age),
+        )
+        self.connection.commit()
+
+    def __remember(self, notification_number: str, snapshot: Snapshot):
+        """Keep a snapshot in memory, forgetting the least recently used (called with the lock)"""
+        self.__memory[notification_number] = snapshot
+        self.__memory.move_to_end(notification_number)
+        while len(self.__memory) > self.memory_size:
+            self.__memory.popitem(last=False)
+
+    def __valid(self, snapshot: Snapshot) -> bool:
+        """Check the version and the age of a snapshot"""
+        return (
+            snapshot.version == SNAPSHOT_VERSION
+            and time.time() - snapshot.taken_at <= self.max_age
+        )
+
+    def get(self, notification_number: str) -> Optional[Snapshot]:
+        """Get the valid snapshot of a notification
+
+        Args:
+            notification_number (str): The Sinan notification number
+
+        Returns:
+            Optional[Snapshot]: A copy of the snapshot or None if there is no valid one
+        """
+        with self.__lock:
+            snapshot = self.__memory.get(notification_number)
+            if snapshot is None:
+                row = self.connection.execute(
+                    "SELECT page, form_data, version, taken_at FROM snapshots WHERE notification_number = ?",
+                    (notification_number,),
+                ).fetchone()
+                if row is not None:
+                    page, form_data, version, taken_at = row
+                    snapshot = Snapshot(
+                        json.loads(page), json.loads(form_data), version, taken_at
+                    )
+
+            if snapshot is None or not self.__valid(snapshot):
+                self.__memory.pop(notification_number, None)
+                self.misses += 1
+                return None
+
+            self.__remember(notification_number, snapshot)
+            self.hits += 1
+
+        # the sheets change their page facts and form data
+        return snapshot._replace(
+            page=dict(snapshot.page), form_data=dict(snapshot.form_data)
+        )
+
+    def put(self, notification_number: str, page: dict, form_data: dict):
+        """Store (or replace) the snapshot of a notification
+
+        Args:
+            notification_number (str): The Sinan notification number
+            page (dict): The page facts (see `parse_notification_page`)
+            form_data (dict): The notification form data
+        """
+        snapshot = Snapshot(
+            {fact: page[fact] for fact in SNAPSHOT_PAGE_FACTS if fact in page},
+            {
+                field: form_data[field]
+                for field in SNAPSHOT_FORM_FIELDS
+                if field in form_data
+            },
+            SNAPSHOT_VERSION,
+            time.time(),
+        )
+        with self.__lock:
+            self.__remember(notification_number, snapshot)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO snapshots (notification_number, page, form_data, version, taken_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    notification_number,
+                    json.dumps(snapshot.page, ensure_ascii=False),
+                    json.dumps(snapshot.form_data, ensure_ascii=False),
+                    snapshot.version,
+                    snapshot.taken_at,
+                ),
+            )
+            self.connection.commit()
+
+    def invalidate(self, notification_number: str):
+        """Drop the snapshot of a notification (eg. investigated or deleted)
+
+        Args:
+            notification_number (str): The Sinan notification number
+        """
+        with self.__lock:
+            self.__memory.pop(notification_number, None)
+            self.connection.execute(
+                "DELETE FROM snapshots WHERE notification_number = ?",
+                (notification_number,),
+            )
+            self.connection.commit()
+
+    def summary(self) -> str:
+        """Describe the use of the store
+
+        Returns:
+            str: The summary
+        """
+        return f"Fichas de notificação: {self.hits} reaproveitadas, {self.misses} abertas no Sinan."
+
+    def close(self):
+        """Close the database connection"""
+        self.connection.close()
@@ -1,17 +1,21 @@
+import csv
 import os
 import re
+import unicodedata
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import Collection, Iterator, List, Mapping, Optional, Union
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 import requests
 import toml
 from bs4 import BeautifulSoup, NavigableString, Tag
-from dbfread import DBF
 
 from .constants import (
     CRITERIA_OPERATIONS,
     CURRENT_YEAR_FIRST_DAY,
+    NAME_PARTICLES,
     POSSIBLE_AGRAVOS,
     POSSIBLE_AGRAVOS_LIST,
     POSSIBLE_MUNICIPALITIES_LIST,
@@ -20,6 +24,7 @@ from .constants import (
     TODAY_FORMATTED,
     TODAY_MONTH_FORMATTED,
 )
+from .dbf import read_dbf
 
 
 def clear_screen():
@@ -27,12 +32,37 @@ def clear_screen():
     os.system("cls" if os.name == "nt" else "clear")
 
 
-def load_data(path: Path) -> pd.DataFrame:
+def read_csv_header(path: Path) -> list[str]:
+    """Read the column names of a `.csv` file (`;` separated and `latin-1` encoded)
+
+    Args:
+        path (Path): Path to the `.csv` file
+
+    Returns:
+        list[str]: The column names
+    """
+    with path.open(encoding="latin-1", newline="") as f:
+        return next(csv.reader(f, delimiter=";"), [])
+
+
+def load_data(
+    path: Path,
+    columns: Optional[Collection[str]] = None,
+    dtype: Optional[Mapping] = None,
+    date_columns: Collection[str] = (),
+    date_format: Optional[str] = None,
+) -> pd.DataFrame:
     """Load data from file
 
     Args:
         path (Path): Path to file.
             Allowed extensions: `.csv`, `.xlsx`, `.dbf`
+        columns (Optional[Collection[str]], optional): Columns to load (the missing ones are ignored).
+            Defaults to None (every column).
+        dtype (Optional[Mapping], optional): Dtypes of the columns. Defaults to None (inferred).
+        date_columns (Collection[str], optional): Columns parsed as dates on read (`.csv` only,
+            `.dbf` dates are always parsed). Defaults to ().
+        date_format (Optional[str], optional): Format of the `date_columns`. Defaults to None.
 
     Raises:
         ValueError: Unsupported file type
@@ -41,17 +71,95 @@ def load_data(path: Path) -> pd.DataFrame:
         pd.DataFrame: Dataframe with loaded data
     """
     ext = path.suffix
+    usecols = (lambda column: column in columns) if columns is not None else None
     match ext:
         case ".csv":
-            return pd.read_csv(path, sep=";", encoding="latin-1")
+            header = read_csv_header(path)
+            parse_dates = [column for column in date_columns if column in header]
+            return pd.read_csv(
+                path,
+                sep=";",
+                encoding="latin-1",
+                usecols=usecols,
+                dtype=dtype,  # type: ignore
+                parse_dates=parse_dates or None,
+                date_format=date_format,
+            )
         case ".xlsx":
-            return pd.read_excel(path)
+            return pd.read_excel(path, usecols=usecols, dtype=dtype)  # type: ignore
         case ".dbf":
-            return pd.DataFrame(iter(DBF(path, encoding="latin-1")))
+            df = read_dbf(path, columns=usecols, encoding="latin-1")
+            if dtype:
+                df = df.astype({k: v for k, v in dtype.items() if k in df.columns})
+            return df
         case _:
             raise ValueError(f"Unsupported file type: {ext}")
 
 
+def iter_csv_chunks(
+    path: Path,
+    block_size: int = 16 * 1024**2,
+    columns: Optional[Collection[str]] = None,
+    date_columns: Collection[str] = (),
+    date_format: Optional[str] = None,
+) -> Iterator[pd.DataFrame]:
+    """Stream a `.csv` export in chunks using the pyarrow CSV reader
+
+    Every column is read as string (the type inference of the streaming reader only
+    looks at the first block), except the `date_columns` that are parsed as timestamps.
+
+    Args:
+        path (Path): Path to the `.csv` file (`;` separated and `latin-1` encoded)
+        block_size (int, optional): Size in bytes of each chunk. Defaults to 16 MB.
+        columns (Optional[Collection[str]], optional): Columns to load (the missing ones are ignored).
+            Defaults to None (every column).
+        date_columns (Collection[str], optional): Columns parsed as dates. Defaults to ().
+        date_format (Optional[str], optional): Format of the `date_columns`. Defaults to None.
+
+    Yields:
+        pd.DataFrame: Dataframe with the rows of each chunk
+    """
+    header = read_csv_header(path)
+    if columns is not None:
+        header = [column for column in header if column in columns]
+
+    reader = pa_csv.open_csv(
+        path,
+        read_options=pa_csv.ReadOptions(encoding="latin-1", block_size=block_size),
+        parse_options=pa_csv.ParseOptions(delimiter=";"),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=header,
+            column_types={
+                column: pa.timestamp("s") if column in date_columns else pa.string()
+                for column in header
+            },
+            timestamp_parsers=[date_format] if date_format else None,
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def as_text(series: pd.Series) -> pd.Series:
+    """Convert a series to text keeping the missing values (eg. numeric codes read from `.xlsx`)
+
+    Args:
+        series (pd.Series): The series to convert
+
+    Returns:
+        pd.Series: Object series of strings (missing values as None)
+    """
+    if pd.api.types.is_object_dtype(series):
+        return series
+
+    if pd.api.types.is_float_dtype(series) and series.dropna().mod(1).eq(0).all():
+        series = series.astype("Int64")  # 123.0 -> "123"
+
+    return series.astype("string").astype(object).where(series.notna(), None)
+
+
 def normalize_name(name: str) -> str:
     """Normalize name (string) to the same format (upper and no spaces)
 
@@ -66,6 +174,26 @@ def normalize_name(name: str) -> str:
     return re.sub(r"\s+", " ", name).strip().upper()
 
 
+def normalize_series(series: pd.Series) -> pd.Series:
+    """Vectorized `normalize_name` (upper and no repeated spaces), non-string values are kept
+
+    Args:
+        series (pd.Series): Series of names
+
+    Returns:
+        pd.Series: Normalized names
+    """
+    if not (
+        pd.api.types.is_object_dtype(series)
+        or pd.api.types.is_string_dtype(series)
+        or isinstance(series.dtype, pd.CategoricalDtype)
+    ):
+        return series
+
+    normalized = series.str.replace(r"\s+", " ", regex=True).str.strip().str.upper()
+    return normalized.where(normalized.notna(), series)
+
+
 def normalize_columns(df: pd.DataFrame, columns: List[str]):
     """Inplace normalization of columns
 
@@ -74,7 +202,57 @@ def normalize_columns(df: pd.DataFrame, columns: List[str]):
         columns (List[str]): List of columns to normalize
     """
     for column in columns:
-        df[column] = df[column].apply(lambda x: normalize_name(x))
+        df[column] = normalize_series(df[column])
+
+
+_PARTICLES_PATTERN = re.compile(rf"\b(?:{'|'.join(NAME_PARTICLES)})\b")
+_NON_LETTERS_PATTERN = re.compile(r"[^A-Z]+")
+
+
+def canonical_name_key(name: Optional[str]) -> str:
+    """Canonical key of a name used to compare names from GAL and Sinan
+
+    The key is upper-case, without accents, punctuation and name particles (`NAME_PARTICLES`)
+    and with collapsed whitespace. A missing name has an empty key.
+
+    Args:
+        name (Optional[str]): The name
+
+    Returns:
+        str: The key
+    """
+    if not isinstance(name, str):
+        if pd.isna(name):
+            return ""
+        name = str(name)
+
+    key = (
+        unicodedata.normalize("NFKD", name)
+        .encode("ascii", errors="ignore")
+        .decode("ascii")
+        .upper()
+    )
+    key = _NON_LETTERS_PATTERN.sub(" ", key)
+    key = _PARTICLES_PATTERN.sub(" ", key)
+    return " ".join(key.split())
+
+
+def canonical_name_keys(series: pd.Series) -> pd.Series:
+    """Canonical keys of a column of names (see `canonical_name_key`)
+
+    Each distinct name is converted only once.
+
+    Args:
+        series (pd.Series): Series of names
+
+    Returns:
+        pd.Series: Series of keys
+    """
+    keys: dict[Optional[str], str] = {}
+    values = series.astype(object).where(series.notna(), None)
+    for value in values.unique():
+        keys[value] = canonical_name_key(value)
+    return pd.Series([keys[value] for value in values], index=series.index, dtype=object)
 
 
 def to_datetime(df: pd.DataFrame, columns: List[str], **kw):
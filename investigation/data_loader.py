@@ -1,30 +1,351 @@
+import itertools
 import os
+import queue
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from operator import itemgetter
 from pathlib import Path
+from typing import Callable, Iterator, Optional
 
+import numpy as np
 import pandas as pd
 
-from core.constants import DATA_FOLDER
-from core.utils import Printter, clear_screen, load_data, normalize_columns, to_datetime
+from core.cache import DatasetCache
+from core.ledger import ExamLedger
+from core.constants import (
+    DATA_FOLDER,
+    EXAM_RESULT_COLUMN,
+    EXAM_KEY_COLUMN,
+    EXAM_KEY_FIELDS,
+    EXAM_RESULT_ID,
+    EXAM_TYPE_COLUMN,
+    EXAM_VALUE_COL_MAP,
+    EXAMS_GAL_MAP,
+    FORMATTED_DATE_COLUMNS,
+    GAL_COLUMNS_DTYPES,
+    GAL_DATE_COLUMNS,
+    GAL_DATE_FORMAT,
+    INVALID_REASON_COLUMN,
+    MOTHER_KEY_COLUMN,
+    PATIENT_GROUP_FIELDS,
+    PATIENT_KEY_COLUMN,
+    SINAN_RESULT_ID_COLUMN,
+)
+from core.utils import (
+    Printter,
+    as_text,
+    canonical_name_keys,
+    clear_screen,
+    iter_csv_chunks,
+    load_data,
+    normalize_columns,
+    to_datetime,
+)
+from investigation.patient import Patient
 from investigation.report import Report
 
 display = Printter("DADOS")
 
 
+TO_NORMALIZE = ["Paciente", "Nome da Mãe"]
+"""GAL columns normalized on load."""
+
+TO_SETDATETIME = GAL_DATE_COLUMNS
+"""GAL columns converted to datetime on load (if not parsed on read)."""
+
+REPORT_SUMMARY_COLUMNS = ["Data da Liberação", "Exame"]
+"""GAL columns used by the report to generate its filename."""
+
+PREPARATION_VERSION = "7"
+"""Version of the preparation rules (`prepare`). Bump it whenever the rules change to invalidate the cached datasets."""
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Inplace cast of the GAL columns to the load schema (`GAL_COLUMNS_DTYPES`).
+
+    Columns of the schema missing in the dataset are created empty and the date columns
+    already parsed are given nanosecond resolution.
+
+    Args:
+        df (pd.DataFrame): The GAL dataframe.
+
+    Returns:
+        pd.DataFrame: The same dataframe, with the schema dtypes.
+    """
+    for column, dtype in GAL_COLUMNS_DTYPES.items():
+        if column not in df.columns:
+            df[column] = pd.Series(None, index=df.index, dtype=object)
+
+        if dtype is str:
+            df[column] = as_text(df[column])
+        elif str(df[column].dtype) != str(dtype):
+            df[column] = df[column].astype(dtype)
+
+    for column in GAL_DATE_COLUMNS:
+        if column not in df.columns:
+            df[column] = pd.NaT
+        elif pd.api.types.is_datetime64_dtype(df[column]):
+            # the streamed `.csv` chunks are read with second resolution, and the exam key
+            # hashes the raw values, so every load mode must give the same resolution
+            df[column] = df[column].astype("datetime64[ns]")
+
+    return df
+
+
+def derive(df: pd.DataFrame) -> pd.DataFrame:
+    """Inplace computation of the values derived from the GAL columns (vectorized).
+
+    The exam type, the exam result (read from the exam type column), the Sinan result ID,
+    the formatted dates (`FORMATTED_DATE_COLUMNS`) and the exam key (a hash of
+    `EXAM_KEY_FIELDS`). Values that can't be derived (eg. unknown exams) are left missing.
+
+    Args:
+        df (pd.DataFrame): The GAL dataframe (schema applied and dates converted).
+
+    Returns:
+        pd.DataFrame: The same dataframe, with the derived columns.
+    """
+    exam_type = df["Exame"].astype(object).map(EXAMS_GAL_MAP)
+    exam_result = pd.Series(None, index=df.index, dtype=object)
+    result_id = pd.Series(None, index=df.index, dtype=object)
+
+    for exam, column in EXAM_VALUE_COL_MAP.items():
+        mask = exam_type.eq(exam)
+        if not mask.any():
+            continue
+
+        results = df.loc[mask, column].astype(object)
+        exam_result[mask] = results
+
+        result_map = EXAM_RESULT_ID[exam]
+        ids = results.map({k: v for k, v in result_map.items() if k != "_default"})
+        if "_default" in result_map:
+            ids = ids.where(ids.notna() | results.isna(), result_map["_default"])
+        result_id[mask] = ids
+
+    df[EXAM_TYPE_COLUMN] = exam_type.astype("category")
+    df[EXAM_RESULT_COLUMN] = exam_result.astype("category")
+    df[SINAN_RESULT_ID_COLUMN] = result_id.astype("category")
+
+    for column, formatted_column in FORMATTED_DATE_COLUMNS.items():
+        df[formatted_column] = df[column].dt.strftime("%d/%m/%Y").fillna("N/A")
+
+    # hashed by value (not by category code), so equal exams of different exports match
+    df[EXAM_KEY_COLUMN] = pd.util.hash_pandas_object(
+        df[EXAM_KEY_FIELDS], index=False
+    ).to_numpy()
+
+    return df
+
+
+def validate(df: pd.DataFrame, require_birth_date: bool = False) -> pd.Series:
+    """Finds the GAL exams that can't be processed (vectorized).
+
+    Args:
+        df (pd.DataFrame): The prepared GAL dataframe.
+        require_birth_date (bool, optional): The birth date is used on the search. Defaults to False.
+
+    Returns:
+        pd.Series: The reason why each exam can't be processed (empty string for valid exams).
+    """
+    rules = [
+        (df["Paciente"].isna(), "Exame sem nome do paciente."),
+        (df[EXAM_TYPE_COLUMN].isna(), "Exame desconhecido (não mapeado)."),
+        (
+            df[EXAM_TYPE_COLUMN].notna() & df[EXAM_RESULT_COLUMN].isna(),
+            "Exame sem resultado.",
+        ),
+        (
+            df[EXAM_RESULT_COLUMN].notna() & df[SINAN_RESULT_ID_COLUMN].isna(),
+            "Resultado do exame sem correspondência no Sinan.",
+        ),
+        (df["Data da Coleta"].isna(), "Exame sem data da coleta."),
+    ]
+    if require_birth_date:
+        rules.append(
+            (df["Data de Nascimento"].isna(), "Paciente sem data de nascimento.")
+        )
+
+    reasons = pd.Series("", index=df.index, dtype=object)
+    # the first rule broken is the reported one
+    for mask, reason in reversed(rules):
+        reasons = reasons.mask(mask, reason)
+    return reasons
+
+
+def prepare(df: pd.DataFrame) -> pd.DataFrame:
+    """Inplace schema cast, normalization, canonical name keys, datetime conversion and derived values of a GAL dataframe (or chunk).
+
+    Args:
+        df (pd.DataFrame): The GAL dataframe.
+
+    Returns:
+        pd.DataFrame: The same dataframe, prepared.
+    """
+    apply_schema(df)
+    normalize_columns(df, TO_NORMALIZE)
+    df[PATIENT_KEY_COLUMN] = canonical_name_keys(df["Paciente"])
+    df[MOTHER_KEY_COLUMN] = canonical_name_keys(df["Nome da Mãe"])
+    to_datetime(df, TO_SETDATETIME, format=GAL_DATE_FORMAT)
+    derive(df)
+    return df
+
+
+def read_dataset(path: Path) -> pd.DataFrame:
+    """Reads only the GAL columns used by the bots with their schema dtypes (dates parsed on read).
+
+    Args:
+        path (Path): Path to the dataset.
+
+    Returns:
+        pd.DataFrame: The raw (not prepared) dataframe.
+    """
+    return load_data(
+        path,
+        columns=[*GAL_COLUMNS_DTYPES, *GAL_DATE_COLUMNS],
+        dtype=GAL_COLUMNS_DTYPES,
+        date_columns=GAL_DATE_COLUMNS,
+        date_format=GAL_DATE_FORMAT,
+    )
+
+
+def preparation_cache() -> DatasetCache:
+    """Creates the cache of prepared datasets (keyed by the preparation rules).
+
+    Returns:
+        DatasetCache: The cache.
+    """
+    return DatasetCache(
+        f"{PREPARATION_VERSION}:{TO_NORMALIZE}:{GAL_COLUMNS_DTYPES}:{GAL_DATE_COLUMNS}"
+        f":{EXAMS_GAL_MAP}:{EXAM_VALUE_COL_MAP}:{EXAM_RESULT_ID}:{EXAM_KEY_FIELDS}"
+    )
+
+
+def load_dataset(path: Path, use_cache: bool = True) -> pd.DataFrame:
+    """Loads and prepares one GAL dataset (module-level so it can run in a process pool).
+
+    Args:
+        path (Path): Path to the dataset.
+        use_cache (bool, optional): Use the cache of prepared datasets. Defaults to True.
+
+    Returns:
+        pd.DataFrame: The prepared dataframe.
+    """
+    if not use_cache:
+        return prepare(read_dataset(path))
+
+    cache = preparation_cache()
+    df = cache.load(path)
+    if df is None:
+        df = prepare(read_dataset(path))
+        cache.store(path, df)
+    return df
+
+
+def concat_datasets(dfs: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenates GAL datasets with a unified schema.
+
+    The empty datasets (or without any GAL value) are dropped and the load schema is applied to each
+    dataset before the concatenation, so the dtypes don't depend on which files are empty.
+    Every dataset is reindexed to the union of the columns (in order of appearance), the
+    categories are unified and the columns still loaded with different dtypes among the
+    datasets become object.
+
+    Args:
+        dfs (list[pd.DataFrame]): The prepared dataframes.
+
+    Returns:
+        pd.DataFrame: The concatenated dataframe.
+    """
+    gal_columns = [*GAL_COLUMNS_DTYPES, *GAL_DATE_COLUMNS]
+    filled = [
+        df
+        for df in dfs
+        if df.reindex(columns=gal_columns).notna().any(axis=None)
+    ]
+    dfs = [apply_schema(df) for df in (filled or dfs[:1])]
+
+    columns = list(dict.fromkeys(column for df in dfs for column in df.columns))
+    dfs = [df.reindex(columns=columns) for df in dfs]
+    for column in columns:
+        dtypes = [df[column].dtype for df in dfs]
+        if all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            categories = list(
+                dict.fromkeys(
+                    itertools.chain.from_iterable(dtype.categories for dtype in dtypes)
+                )
+            )
+            for df in dfs:
+                df[column] = df[column].cat.set_categories(categories)
+        elif len({str(dtype) for dtype in dtypes}) > 1:
+            for df in dfs:
+                df[column] = df[column].astype(object)
+
+    return pd.concat(dfs, ignore_index=True)
+
+
+def group_patients(df: pd.DataFrame) -> Iterator[list[Patient]]:
+    """Groups the exams of the same patient (`PATIENT_GROUP_FIELDS`), so each patient is searched once.
+
+    The groups keep the order of the first exam of each patient and the exams keep their order.
+
+    Args:
+        df (pd.DataFrame): The prepared GAL dataframe (or chunk).
+
+    Yields:
+        list[Patient]: The exams of each patient.
+    """
+    codes = (
+        df.groupby(PATIENT_GROUP_FIELDS, sort=False, dropna=False)
+        .ngroup()
+        .to_numpy()
+    )
+    order = np.argsort(codes, kind="stable")
+    rows = zip(codes[order], Patient.from_dataframe(df.iloc[order]))
+    for _, group in itertools.groupby(rows, key=itemgetter(0)):
+        yield [patient for _, patient in group]
+
+
 class SinanGalData:
-    """Loads and cleans the data from GAL applying some filter rules."""
+    """Loads and cleans the data from GAL applying some filter rules.
+
+    The data can be loaded all at once (`load`, filling `df`) or streamed in chunks
+    (`stream`) when `desempenho.leitura_em_blocos` is enabled in the settings.
+    """
 
     df: pd.DataFrame
 
-    def __init__(self, settings: dict, reporter: Report):
+    def __init__(
+        self, settings: dict, reporter: Report, ledger: Optional[ExamLedger] = None
+    ):
         """Initializes SinanGalData with settings and a reporter.
 
         Args:
             settings (dict): Configuration settings.
             reporter (Report): Report object for logging.
+            ledger (Optional[ExamLedger], optional): Record of the exams processed in previous runs,
+                the settled ones are skipped. Defaults to None.
         """
         self.settings = settings
         self.reporter = reporter
+        self.ledger = ledger
+        self.selecteds: list[str] = []
+        self.__seen_exams: set[int] = set()
+        self.__settled_exams: Optional[np.ndarray] = None
+
+        performance = settings.get("desempenho", {})
+        self.streaming: bool = performance.get("leitura_em_blocos", False)
+        self.block_size = int(performance.get("tamanho_bloco_mb", 16) * 1024**2)
+        self.load_processes: Optional[int] = performance.get("processos_carregamento")
+        self.use_cache: bool = performance.get("cache_dados", True)
+        self.reprocess: bool = performance.get("reprocessar_exames", False)
+
+        criterias = settings.get("sinan_investigacao", {}).get("criterios", {})
+        self.require_birth_date: bool = criterias.get("Data de nascimento", {}).get(
+            "pode_usar", False
+        )
 
         self.__datafolder = Path(DATA_FOLDER)
         if not self.__datafolder.exists():
@@ -82,38 +403,139 @@ class SinanGalData:
 
         return selecteds
 
+    def select(self):
+        """Asks the user which GAL datasets will be loaded."""
+        display("Escolha os datasets do GAL a serem carregados:")
+        self.selecteds = self.__choice_datasets()
+        self.reporter.debug(f"Bases do GAL Selecionadas: {'; '.join(self.selecteds)}")
+
     def __get_df(self):
-        """Gets a dataframe by concatenating selected datasets.
+        """Gets a prepared dataframe by concatenating selected datasets.
+
+        When more than one dataset is selected they are loaded and prepared in a process pool
+        (`desempenho.processos_carregamento` processes, defaults to one per dataset). Datasets
+        already prepared in a previous run are loaded from the cache (`desempenho.cache_dados`).
 
         Returns:
             pd.DataFrame: Concatenated dataframe.
         """
-        selecteds = self.__choice_datasets()
-        self.reporter.debug(f"Bases do GAL Selecionadas: {'; '.join(selecteds)}")
+        paths = [self.__datafolder / dataset for dataset in self.selecteds]
+        processes = min(
+            len(paths),
+            self.load_processes
+            if self.load_processes is not None
+            else (os.cpu_count() or 1),
+        )
+
+        load = partial(load_dataset, use_cache=self.use_cache)
+        if processes > 1:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                dfs = list(pool.map(load, paths))
+        else:
+            dfs = [load(path) for path in paths]
+
+        return concat_datasets(dfs)
+
+    def __drop_duplicates(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Removes the repeated exams (same `EXAM_KEY_COLUMN`), eg. from overlapping GAL exports.
 
-        dfs = [load_data(self.__datafolder / dataset) for dataset in selecteds]
+        The keys are remembered, so in streaming mode the exams already seen in a previous
+        chunk are removed too.
+
+        Args:
+            df (pd.DataFrame): The prepared GAL dataframe (or chunk).
+
+        Returns:
+            pd.DataFrame: The first occurrence of each exam.
+        """
+        keys = df[EXAM_KEY_COLUMN]
+        duplicated = keys.duplicated() | keys.isin(self.__seen_exams)
+        self.__seen_exams.update(keys[~duplicated])
+
+        count = int(duplicated.sum())
+        if not count:
+            return df
+
+        self.reporter.increment_stat("duplicated_exams", count)
+        self.reporter.debug(
+            f"{count} exames repetidos nas bases do GAL foram removidos.",
+            "Exames com mesmo paciente, mãe, data de nascimento, tipo de exame, data da coleta e resultado.",
+        )
+        display(f"{count} exames repetidos removidos.", category="info")
+        return df[~duplicated]
+
+    def __skip_settled(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Removes the exams already settled in previous runs (see `ExamLedger`), unless
+        `desempenho.reprocessar_exames` is enabled.
+
+        Args:
+            df (pd.DataFrame): The prepared GAL dataframe (or chunk).
+
+        Returns:
+            pd.DataFrame: The exams still to be processed.
+        """
+        if self.ledger is None or self.reprocess:
+            return df
+
+        if self.__settled_exams is None:
+            self.__settled_exams = self.ledger.settled_keys()
+
+        settled = df[EXAM_KEY_COLUMN].isin(self.__settled_exams)
+        count = int(settled.sum())
+        if not count:
+            return df
+
+        self.reporter.increment_stat("settled_exams", count)
+        self.reporter.debug(
+            f"{count} exames já processados em execuções anteriores foram ignorados.",
+            "Para processá-los novamente habilite 'reprocessar_exames' na seção 'desempenho' das configurações.",
+        )
+        display(
+            f"{count} exames já processados anteriormente ignorados.", category="info"
+        )
+        return df[~settled]
+
+    def __discard_invalid(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Reports the exams that can't be processed (see `validate`) and removes them.
+
+        Args:
+            df (pd.DataFrame): The prepared GAL dataframe (or chunk).
+
+        Returns:
+            pd.DataFrame: Only the valid exams.
+        """
+        if INVALID_REASON_COLUMN not in df.columns:
+            df[INVALID_REASON_COLUMN] = validate(df, self.require_birth_date)
 
-        return pd.concat(dfs, ignore_index=True)
+        invalid = df[INVALID_REASON_COLUMN].ne("")
+        if not invalid.any():
+            return df
+
+        for patient, reason in zip(
+            Patient.from_dataframe(df[invalid]), df.loc[invalid, INVALID_REASON_COLUMN]
+        ):
+            self.reporter.set_patient(patient)
+            self.reporter.error(reason, "Exame descartado antes da pesquisa.")
+            self.reporter.increment_stat("invalid_exams")
+        self.reporter.clean_patient()
+
+        display(
+            f"{invalid.sum()} exames descartados por dados inválidos (ver relatório).",
+            category="info",
+        )
+        return df[~invalid]
 
     def load(self):
         """Loads and preprocesses GAL and SINAN datasets."""
-        display("Escolha os datasets do GAL a serem carregados:")
-        self.df = self.__get_df()
-
+        if not self.selecteds:
+            self.select()
         start_date = time.time()
-        to_normalize = ["Paciente", "Nome da Mãe"]
-        normalize_columns(self.df, to_normalize)
-        self.reporter.debug(f"Colunas da base do GAL normalizadas: {to_normalize}")
-
-        to_setdatetime = [
-            "Data de Nascimento",
-            "Data do 1º Sintomas",
-            "Data da Coleta",
-            "Data da Liberação",
-        ]
-        to_datetime(self.df, to_setdatetime, format="%d-%m-%Y")
+        self.df = self.__discard_invalid(
+            self.__skip_settled(self.__drop_duplicates(self.__get_df()))
+        )
+        self.reporter.debug(f"Colunas da base do GAL normalizadas: {TO_NORMALIZE}")
         self.reporter.debug(
-            f"Colunas da base do GAL convertidas para datetime: {to_setdatetime}"
+            f"Colunas da base do GAL convertidas para datetime: {TO_SETDATETIME}"
         )
 
         end_date = time.time()
@@ -122,3 +544,108 @@ class SinanGalData:
         display(
             f"Datasets do GAL carregados, normalizados e filtrados em {elapsed_time:.2f} segundos."
         )
+
+    def __iter_chunks(self) -> Iterator[pd.DataFrame]:
+        """Reads the selected datasets in chunks (`.csv` files are streamed, the others are read at once).
+
+        Yields:
+            pd.DataFrame: The raw chunks.
+        """
+        for dataset in self.selecteds:
+            path = self.__datafolder / dataset
+            if path.suffix == ".csv":
+                yield from iter_csv_chunks(
+                    path,
+                    self.block_size,
+                    columns=[*GAL_COLUMNS_DTYPES, *GAL_DATE_COLUMNS],
+                    date_columns=GAL_DATE_COLUMNS,
+                    date_format=GAL_DATE_FORMAT,
+                )
+            else:
+                yield read_dataset(path)
+
+    def stream(
+        self,
+        on_loaded: Callable[[pd.DataFrame], None],
+        prefetch: int = 2,
+    ) -> Iterator[pd.DataFrame]:
+        """Loads the selected datasets in a background thread yielding each prepared chunk as soon as it is ready.
+
+        Args:
+            on_loaded (Callable[[pd.DataFrame], None]): Called once (on the consumer thread) when every chunk
+                was loaded, receiving a small summary (`REPORT_SUMMARY_COLUMNS`) of the whole data.
+            prefetch (int, optional): How many prepared chunks can wait to be consumed. Defaults to 2.
+
+        Yields:
+            pd.DataFrame: The prepared chunks.
+        """
+        if not self.selecteds:
+            self.select()
+
+        chunks: queue.Queue = queue.Queue(maxsize=prefetch)
+        loaded = threading.Event()
+        summaries: list[pd.DataFrame] = []
+        start_date = time.time()
+
+        def producer():
+            try:
+                for chunk in self.__iter_chunks():
+                    chunk = prepare(chunk)
+                    chunk[INVALID_REASON_COLUMN] = validate(
+                        chunk, self.require_birth_date
+                    )
+                    summaries.append(
+                        chunk.loc[
+                            chunk[INVALID_REASON_COLUMN].eq(""),
+                            REPORT_SUMMARY_COLUMNS,
+                        ].drop_duplicates()
+                    )
+                    chunks.put(chunk)
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                loaded.set()
+                chunks.put(None)
+
+        threading.Thread(target=producer, daemon=True).start()
+
+        def notify_loaded():
+            elapsed_time = time.time() - start_date
+            display(
+                f"Datasets do GAL carregados em blocos, normalizados e filtrados em {elapsed_time:.2f} segundos."
+            )
+            on_loaded(
+                pd.concat(summaries, ignore_index=True)
+                if summaries
+                else pd.DataFrame(columns=REPORT_SUMMARY_COLUMNS)
+            )
+
+        notified = False
+        while (chunk := chunks.get()) is not None:
+            if isinstance(chunk, Exception):
+                raise chunk
+            if not notified and loaded.is_set():
+                notify_loaded()
+                notified = True
+            yield self.__discard_invalid(
+                self.__skip_settled(self.__drop_duplicates(chunk))
+            )
+
+        if not notified:
+            notify_loaded()
+
+    def batches(
+        self, on_loaded: Callable[[pd.DataFrame], None]
+    ) -> Iterator[pd.DataFrame]:
+        """Yields the GAL data to be processed: the whole `df` or, in streaming mode, each chunk.
+
+        Args:
+            on_loaded (Callable[[pd.DataFrame], None]): See `stream`.
+
+        Yields:
+            pd.DataFrame: The data batches.
+        """
+        if self.streaming:
+            yield from self.stream(on_loaded)
+        else:
+            yield self.df
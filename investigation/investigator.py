@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Literal, NamedTuple, Optional
 
 import requests
 
@@ -14,6 +14,33 @@ class NotFoundError(Exception):
         super().__init__(message)
 
 
+class SheetAction(NamedTuple):
+    """An action to be done on a sheet (notification)"""
+
+    kind: Literal["investigate", "delete"]
+    sheet: Sheet
+    patients: Optional[List[Patient]] = None
+
+    def run(self) -> bool:
+        """Run the action on the Sinan website
+
+        Returns:
+            bool: True if the action succeeded, False otherwise
+        """
+        if self.kind == "investigate":
+            return self.sheet.investigate_patient(self.patients)
+        return self.sheet.delete()
+
+
+class ExamTask(NamedTuple):
+    """The decided actions of one or more exams and the outcome to be recorded after them"""
+
+    patients: List[Patient]
+    actions: List[SheetAction]
+    outcome: Optional[str]  # None: "investigated" if the actions succeed, else "error"
+    notification_numbers: List[str]
+
+
 class DuplicateChecker:
     """Given a patient data and your payload to open the Sinan page, this class will be used to investigate the patient."""
 
@@ -37,7 +64,7 @@ class DuplicateChecker:
 
         return episode_sorted[:1], episode_sorted[1:]
 
-    def __investigate_episode(self, episode: List[Sheet]):
+    def __decide_episode(self, episode: List[Sheet]) -> List[SheetAction]:
         """Compare all the sheets (results) and define what will be considered and what will be discarded
 
         As defined in the Google Doc document:
@@ -47,6 +74,9 @@ class DuplicateChecker:
 
         Args:
             episode (List[Sheet]): The list os sheets of one episode.
+
+        Returns:
+            List[SheetAction]: The investigations and deletions to be done (in order).
         """
         considered: List[Sheet] = []
         discarded: List[Sheet] = []
@@ -82,20 +112,26 @@ class DuplicateChecker:
                 "Como houveram mais de uma ficha de notificação considerada, o algorítimo de análise de duplicidade será aplicado novamente.",
                 f"{len(considered)} notificações consideradas. ({';'.join(sheet.notification_number for sheet in considered)})",
             )
-            self.__investigate_episode(considered)
+            actions = self.__decide_episode(considered)
         else:
-            for sheet in considered:
-                sheet.investigate_patient()
+            actions = [SheetAction("investigate", sheet) for sheet in considered]
 
-        for sheet in discarded:
-            sheet.delete()
+        actions.extend(SheetAction("delete", sheet) for sheet in discarded)
+        return actions
 
-    def investigate_multiple(self, patient: Patient, sheets: List[Sheet]):
-        """Investigate multiple patients filling out the patient data on the Sinan Investigation page
+    def decide_multiple(
+        self, patient: Patient, sheets: List[Sheet]
+    ) -> List[SheetAction]:
+        """Decide which sheets of a patient with multiple results will be investigated and which will be deleted
+
+        Nothing is submitted to the Sinan website here (see `investigate_multiple`).
 
         Args:
             patient (Patient): The patient to be investigated
             sheets (List[Sheet]): The list of sheets to be duplicity-analyzed
+
+        Returns:
+            List[SheetAction]: The investigations and deletions to be done (in order).
         """
 
         # 1. Dado vários resultados, eu tenho que fazer a lódica de "episódios"
@@ -121,21 +157,32 @@ class DuplicateChecker:
                     "O exame é do tipo IgM e o resultado é Não Reagente, portanto todos episódios serão encerrados como descartados (se não houver classificação prévia).",
                     f"Quantidade de episódios encontrados: {len(episodes)}",
                 )
-                for episode in episodes:
-                    for sheet in episode:
-                        sheet.investigate_patient()
+                return [
+                    SheetAction("investigate", sheet)
+                    for episode in episodes
+                    for sheet in episode
+                ]
             else:
                 self.reporter.warn(
                     f"O exame é do tipo IgM e o resultado é {patient.exam_result}, portanto somente o último episódio será encerrado deixando os demais em branco.",
                     f"Quantidade de episódios encontrados: {len(episodes)}",
                 )
-                for sheet in episodes[-1]:
-                    sheet.investigate_patient()
+                return [SheetAction("investigate", sheet) for sheet in episodes[-1]]
         else:
             if len(episodes) > 1:
                 self.reporter.error(
                     "A pesquisa retornou vários resultados que por sua vez gerou mais de um episódio. O bot não sabe o que fazer nesta situação.",
                     "Matrix Error kk",
                 )
-                return
-            self.__investigate_episode(episodes[0])
+                return []
+            return self.__decide_episode(episodes[0])
+
+    def investigate_multiple(self, patient: Patient, sheets: List[Sheet]):
+        """Investigate multiple patients filling out the patient data on the Sinan Investigation page
+
+        Args:
+            patient (Patient): The patient to be investigated
+            sheets (List[Sheet]): The list of sheets to be duplicity-analyzed
+        """
+        for action in self.decide_multiple(patient, sheets):
+            action.run()
@@ -0,0 +1,91 @@
+from typing import Callable, Iterable, Optional
+
+import pandas as pd
+
+from core.utils import canonical_name_keys
+from investigation.patient import Patient
+
+
+def _find_column(
+    columns: Iterable[str], matches: Callable[[str], bool]
+) -> Optional[str]:
+    """Find the first column whose (lowercase) name matches"""
+    return next((column for column in columns if matches(column.lower())), None)
+
+
+class NotificationIndex:
+    """Local index of the notifications listed for an agravo and date window ("Lista de Notificação")
+
+    The patients are matched by hash lookups on the canonical name and the birth date (and the
+    mother name when the listing has it), so no search by criteria is made on the Sinan: the
+    matched notifications are only located by their number to be opened and written.
+
+    Attributes:
+        numbers (set[str]): The notification numbers listed
+        columns (dict[str, Optional[str]]): The listing column used for each field (None if missing)
+    """
+
+    def __init__(self, rows: list[dict]):
+        """Initialize the NotificationIndex
+
+        Args:
+            rows (list[dict]): The listed rows (column name -> cell text, see `parse_search_results`)
+        """
+        names = list(rows[0]) if rows else []
+        self.columns: dict[str, Optional[str]] = {
+            "number": _find_column(names, lambda c: c.startswith("n") and "notif" in c),
+            "name": _find_column(
+                names,
+                lambda c: ("nome" in c or "paciente" in c)
+                and "mãe" not in c
+                and "mae" not in c,
+            ),
+            "birth_date": _find_column(names, lambda c: "nasc" in c),
+            "mother": _find_column(names, lambda c: "mãe" in c or "mae" in c),
+        }
+        self.numbers: set[str] = set()
+        self.__by_patient: dict[tuple[str, str], list[tuple[str, str]]] = {}
+
+        number, name = self.columns["number"], self.columns["name"]
+        if number is None or name is None:
+            return
+
+        birth_date, mother = self.columns["birth_date"], self.columns["mother"]
+        name_keys = canonical_name_keys(pd.Series([row[name] for row in rows]))
+        mother_keys = (
+            canonical_name_keys(pd.Series([row[mother] for row in rows]))
+            if mother
+            else pd.Series([""] * len(rows))
+        )
+        for row, name_key, mother_key in zip(rows, name_keys, mother_keys):
+            key = (name_key, row[birth_date] if birth_date else "")
+            self.__by_patient.setdefault(key, []).append((row[number], mother_key))
+            self.numbers.add(row[number])
+
+    @property
+    def usable(self) -> bool:
+        """Whether the listing has the notification number and the patient name columns"""
+        return self.columns["number"] is not None and self.columns["name"] is not None
+
+    def match(self, patient: Patient) -> list[str]:
+        """Get the notifications listed for a patient
+
+        Args:
+            patient (Patient): The patient (exam) from GAL
+
+        Returns:
+            list[str]: The notification numbers, in the listing order
+        """
+        birth_date = patient.f_birth_date if self.columns["birth_date"] else ""
+        return [
+            number
+            for number, mother_key in self.__by_patient.get(
+                (patient.name_key, birth_date), []
+            )
+            # a missing mother name (listed or from GAL) can't tell the notifications apart
+            if not (mother_key and patient.mother_key)
+            or mother_key == patient.mother_key
+        ]
+
+    def __len__(self) -> int:
+        return len(self.numbers)
@@ -1,9 +1,9 @@
 import time
-from typing import Callable, Literal, Mapping, Optional
+from functools import partial
+from typing import Callable, Literal, Mapping, Optional, TypeVar
 
 import pandas as pd
 import requests
-from bs4 import BeautifulSoup
 
 from core.constants import (
     POSSIBLE_AGRAVOS,
@@ -11,13 +11,27 @@ from core.constants import (
     SEARCH_POSSIBLE_CRITERIAS,
     SINAN_BASE_URL,
 )
-from core.utils import Printter, generate_search_base_payload, valid_tag
+from core.journal import Journal
+from core.session import ViewExpired, ViewStateNotFound
+from core.snapshots import NotificationSnapshots
+from core.utils import Printter, generate_search_base_payload
+from investigation.notification_index import NotificationIndex
+from investigation.parser import (
+    ParseExecutor,
+    parse_consultation_page,
+    parse_results_pager,
+    parse_search_operators,
+    parse_search_results,
+)
 from investigation.patient import Patient
 from investigation.report import Report
+from investigation.search_cache import SearchCache
 from investigation.sheet import Sheet
 
 display = Printter("PESQUISA")
 
+T = TypeVar("T")
+
 
 class Criterias:
     """Criterias of notification research methods to improve the research filters"""
@@ -29,13 +43,16 @@ class Criterias:
         reporter: Report,
         endpoint: str,
         base_payload: dict,
+        parser: ParseExecutor,
     ):
         self.session = session
         self.reporter = reporter
+        self.parser = parser
         self.base_payload = base_payload
         self.endpoint = endpoint
         self.criterias = criterias
         self.current_criterias = []
+        self.field_types: dict = {}
 
     def __remove_criteria(self, criteria: SEARCH_POSSIBLE_CRITERIAS):
         """Send the payload to remove the one of the filter criterions
@@ -69,7 +86,11 @@ class Criterias:
         self.current_criterias.append("Nome do paciente")
 
     def __patient_notification_criteria(
-        self, patient: Patient, field_type_id: str, operator: str
+        self,
+        patient: Patient,
+        field_type_id: str,
+        operator: str,
+        notification_number: Optional[str] = None,
     ):
         """Send the payload to select the patient notification number criteria on search"""
         payload = self.base_payload.copy()
@@ -77,7 +98,8 @@ class Criterias:
             {
                 "form:consulta_tipoCampo": field_type_id,
                 "form:consulta_operador": operator,
-                "form:consulta_dsTextoPesquisa": patient.notification_number,
+                "form:consulta_dsTextoPesquisa": notification_number
+                or patient.notification_number,
                 "form:btnAdicionarCriterio": "form:btnAdicionarCriterio",
             }
         )
@@ -127,22 +149,14 @@ class Criterias:
         Returns:
             str: The field type value
         """
+        field_type_value = self.field_types.get(criteria)
 
-        options = self.soup.find("select", {"id": "form:consulta_tipoCampo"}).find_all(  # type: ignore
-            "option"
-        )
-        field_type = next(
-            (option for option in options if option.text.strip() == criteria),
-            None,
-        )
-
-        if not field_type:
+        if not field_type_value:
             display(
                 f"Critério fornecido ({criteria}) não foi encontrado.", category="erro"
             )
             exit(1)
 
-        field_type_value = field_type.get("value")
         payload = self.base_payload.copy()
         payload.update(
             {
@@ -153,22 +167,47 @@ class Criterias:
             }
         )
         res = self.session.post(self.endpoint, data=payload)
-        soup = BeautifulSoup(res.content, "html.parser")
-        operator_options = soup.find(
-            "select", {"id": "form:consulta_operador"}
-        ).find_all("option")  # type: ignore
-        operators = {tag.get_text(): tag.get("value") for tag in operator_options}
+        operators = self.parser.run(parse_search_operators, res.content)
         return field_type_value, operators
 
+    def criteria_value(
+        self,
+        criteria: SEARCH_POSSIBLE_CRITERIAS,
+        patient: Patient,
+        notification_number: Optional[str] = None,
+    ) -> str:
+        """Get the value searched with a filter criterion (see `add_criteria`)
+
+        Args:
+            criteria (SEARCH_POSSIBLE_CRITERIAS): The filter criterion
+            patient (Patient): The patient searched
+            notification_number (Optional[str], optional): A Sinan notification number to search
+                instead of the patient one. Defaults to None.
+
+        Returns:
+            str: The value
+        """
+        values = {
+            "Nome do paciente": patient.name,
+            "Nome da mãe": patient.mother_name,
+            "Número da Notificação": notification_number or patient.notification_number,
+            "Data de nascimento": patient.f_birth_date,
+        }
+        return values[criteria]
+
     def add_criteria(
         self,
         criteria: SEARCH_POSSIBLE_CRITERIAS,
         patient: Patient,
+        notification_number: Optional[str] = None,
     ):
         """Add a filter criterion
 
         Args:
             criteria (core.constants.SEARCH_POSSIBLE_CRITERIAS): The filter criterion
+            patient (Patient): The patient searched
+            notification_number (Optional[str], optional): A Sinan notification number to search
+                instead of the patient one (only for "Número da Notificação"). Defaults to None.
         """
         criterias = {
             "Nome do paciente": self.__patient_name_criteria,
@@ -182,7 +221,12 @@ class Criterias:
         operation = self.criterias[criteria]["operacao"]
         operator = operators[operation]
 
-        criterias[criteria](patient, field_type_id, operator)
+        if notification_number and criteria == "Número da Notificação":
+            self.__patient_notification_criteria(
+                patient, field_type_id, operator, notification_number
+            )
+        else:
+            criterias[criteria](patient, field_type_id, operator)
 
 
 class NotificationResearcher(Criterias):
@@ -193,6 +237,14 @@ class NotificationResearcher(Criterias):
         agravo (str): Agravo to filter by (eg. A90 - DENGUE)
         criterios (dict): Criterio configuration (criterios to be used)
         logger (logging.Logger): Logger client.
+        parser (ParseExecutor): Executor used to parse the server responses.
+        journal (Optional[Journal]): Journal of the progress, given to the sheets found.
+        cache (Optional[SearchCache]): Cache of the search results, shared by the sessions.
+        snapshots (Optional[NotificationSnapshots]): Store of the notification pages, given to the sheets found.
+
+    Attributes:
+        index (Optional[NotificationIndex]): Listing of the notifications to match the patients
+            locally (see `list_notifications`), instead of searching them by criteria.
 
     Methods:
         consultar(self, patient: str): Consult a notification and return the response
@@ -205,13 +257,23 @@ class NotificationResearcher(Criterias):
         municipality: POSSIBLE_MUNICIPALITIES,
         criterias: dict,
         reporter: Report,
+        parser: ParseExecutor,
+        journal: Optional[Journal] = None,
+        cache: Optional[SearchCache] = None,
+        snapshots: Optional[NotificationSnapshots] = None,
     ):
         base_payload = generate_search_base_payload(agravo)
         endpoint = f"{SINAN_BASE_URL}/sinan/secured/consultar/consultarNotificacao.jsf"
 
         self.municipality: POSSIBLE_MUNICIPALITIES = municipality
+        self.searched_criterias: list[SEARCH_POSSIBLE_CRITERIAS] = []
+        self.journal = journal
+        self.cache = cache
+        self.snapshots = snapshots
+        self.agravo = agravo
+        self.index: Optional[NotificationIndex] = None
 
-        super().__init__(session, criterias, reporter, endpoint, base_payload)
+        super().__init__(session, criterias, reporter, endpoint, base_payload, parser)
 
     def __select_agravo(self):
         """Send the payload to select the agravo"""
@@ -240,31 +302,38 @@ class NotificationResearcher(Criterias):
         return res
 
     def __define_javax_faces(self):
-        """Loads endpoint page and extract the javax.faces.ViewState this session"""
+        """Loads endpoint page and extract the javax.faces.ViewState this session and the search field types"""
         res = self.session.get(self.endpoint)
-        self.soup = BeautifulSoup(res.content, "html.parser")
-        javax_faces = valid_tag(
-            self.soup.find("input", {"name": "javax.faces.ViewState"})
-        )
-        if not javax_faces:
+        page = self.parser.run(parse_consultation_page, res.content)
+        if not page["view_state"]:
             display("Token de estado de visualização não encontrado.", category="erro")
-            exit(1)
+            raise ViewStateNotFound("Token de estado de visualização não encontrado.")
 
-        self.base_payload["javax.faces.ViewState"] = javax_faces.get("value")  # type: ignore
+        self.base_payload["javax.faces.ViewState"] = page["view_state"]
+        self.field_types = page["field_types"]
 
     def __check_mother_names(
         self, results: list[Sheet], strategy: Literal["equal", "contains"] = "equal"
     ):
-        """Filter the results by mother name using the comparator "equal"
+        """Filter the results by mother name (canonical keys) using the comparator "equal"
+
+        A missing mother name never matches, and when the patient has none the results are
+        kept as they are (there is nothing to compare).
 
         Args:
             results (list[Sheet]): The list of results to be filtered
             strategy (Literal['equal', 'contains'], optional): The strategy to use. Defaults to "equal".
         """
+        if not self.patient.mother_key:
+            self.reporter.warn(
+                "Paciente sem nome da mãe. Os resultados não foram filtrados pelo nome da mãe."
+            )
+            return results
+
         strategies: Mapping[Literal["equal", "contains"], Callable[[Sheet], bool]] = {
-            "equal": lambda x: x.mother_name == self.patient.mother_name,
-            "contains": lambda x: self.patient.mother_name.lower()
-            in x.mother_name.lower(),
+            "equal": lambda x: x.mother_key == self.patient.mother_key,
+            "contains": lambda x: bool(x.mother_key)
+            and self.patient.mother_key in x.mother_key,
         }
 
         _results = []
@@ -279,28 +348,18 @@ class NotificationResearcher(Criterias):
 
         return _results
 
-    def search(
-        self,
-        patient: Patient,
-        use_notification_number: bool = False,
-        start_time: Optional[float] = None,
-    ):
-        """Search for a patient in the Sinan website (Consultar Notificação)
+    def __search_candidates(
+        self, patient: Patient, use_notification_number: bool = False
+    ) -> Optional[list[Sheet]]:
+        """Search the notifications of a patient and open each one of them (the candidates)
 
         Args:
             patient (Patient): The patient data from GAL to search
-            start_time (Optional[float], optional): The start time of the search. Defaults to None.
+            use_notification_number (bool, optional): Search only by the notification number. Defaults to False.
 
         Returns:
-            list[Sheet]: A list of results with objects to interact with.
+            Optional[list[Sheet]]: The sheets of every notification found or None if the search was aborted.
         """
-        start_time = start_time or time.time()
-        self.patient = patient
-        self.reporter.set_patient(patient)
-        display(f"Pesquisando pelo paciente {patient.name}")
-        self.__define_javax_faces()
-        self.__select_agravo()
-
         criterias: list[SEARCH_POSSIBLE_CRITERIAS] = []
         if use_notification_number:
             if pd.isna(patient.notification_number):
@@ -312,7 +371,7 @@ class NotificationResearcher(Criterias):
                     "Exame sem número de notificação. Pesquisa abortada."
                 )
                 self.reporter.increment_stat("exams_without_notification_number")
-                return []
+                return None
             criterias.extend(["Número da Notificação"])
         else:
             criterias.extend(
@@ -326,35 +385,127 @@ class NotificationResearcher(Criterias):
                 f"Pesquisando utilizando os critérios: {'; '.join(criterias)}"
             )
 
-        if "Data de Nascimento" in criterias and patient.birth_date is None:
+        self.searched_criterias = criterias
+
+        if "Data de nascimento" in criterias and patient.birth_date is None:
             display(
                 "Este paciente não possui data de nascimento para que seja utilizada na pesquisa.",
-                category="error",
+                category="erro",
             )
             self.reporter.error(
                 "Pacientente sem data de nascimento. Pesquisa abortada."
             )
             self.reporter.clean_patient()
-            return []
+            return None
 
-        for criteria in criterias:
-            self.add_criteria(criteria, patient)
+        if self.index is not None:
+            return self.__indexed_search(self.index, patient, use_notification_number)
 
-        results = self.__treat_results(self.__search())
-        results_count = len(results)
+        return self.__cached_search(criterias, patient)
 
-        if results_count == 0 and not use_notification_number:
-            display(
-                f"Utilizando os critérios {tuple(criterias)} não foram encontrados resultados para o paciente {patient.name}. Pesquisando pelo número de notificação agora.",
-                category="info",
-            )
-            self.reporter.info(
-                "Nenhuma notificação encontrada. Será feita uma nova pesquisa utilizando o número de notificação"
-            )
-            return self.search(
-                patient, use_notification_number=True, start_time=start_time
+    def __indexed_search(
+        self, index: NotificationIndex, patient: Patient, use_notification_number: bool
+    ) -> list[Sheet]:
+        """Match the patient in the notifications listing and open the matched notifications
+
+        The matched notifications are searched by their number, because a sheet can only be
+        opened from the results page of a search of this session.
+
+        Args:
+            index (NotificationIndex): The notifications listing
+            patient (Patient): The patient data from GAL
+            use_notification_number (bool): Match only by the notification number
+
+        Returns:
+            list[Sheet]: The sheets of every notification matched
+        """
+        if use_notification_number:
+            number = str(patient.notification_number)
+            numbers = [number] if number in index.numbers else []
+        else:
+            numbers = index.match(patient)
+
+        self.reporter.debug(
+            f"Notificações encontradas na lista de notificações: {', '.join(numbers) or 'nenhuma'}"
+        )
+
+        candidates: list[Sheet] = []
+        for number in numbers:
+            candidates.extend(
+                self.__cached_search(["Número da Notificação"], patient, number)
             )
+        return candidates
 
+    def __search_key(
+        self,
+        criterias: list[SEARCH_POSSIBLE_CRITERIAS],
+        patient: Patient,
+        notification_number: Optional[str] = None,
+    ) -> tuple:
+        """Get the key of a search (agravo, date window and each criterion operation and value)"""
+        return (
+            self.agravo,
+            self.base_payload["form:consulta_dataInicialInputDate"],
+            self.base_payload["form:consulta_dataFinalInputDate"],
+            tuple(
+                (
+                    criteria,
+                    self.criterias[criteria]["operacao"],
+                    self.criteria_value(criteria, patient, notification_number),
+                )
+                for criteria in criterias
+            ),
+        )
+
+    def __cached_search(
+        self,
+        criterias: list[SEARCH_POSSIBLE_CRITERIAS],
+        patient: Patient,
+        notification_number: Optional[str] = None,
+    ) -> list[Sheet]:
+        """Search with the criteria and open the results, reusing a cached search when possible
+
+        Args:
+            criterias (list[SEARCH_POSSIBLE_CRITERIAS]): The filter criteria
+            patient (Patient): The patient searched
+            notification_number (Optional[str], optional): A Sinan notification number to search
+                instead of the patient one. Defaults to None.
+
+        Returns:
+            list[Sheet]: The sheets of every notification found
+        """
+
+        key = self.__search_key(criterias, patient, notification_number)
+
+        def search() -> list[Sheet]:
+            self.session.results_page = None
+            self.__define_javax_faces()
+            self.__select_agravo()
+            for criteria in criterias:
+                self.add_criteria(criteria, patient, notification_number)
+            res = self.__search()
+            self.session.results_page = key
+            return self.__load_candidates(res, patient)
+
+        if self.cache is None:
+            return search()
+
+        return self.cache.search(key, self.session, search, patient.key)
+
+    def __conclude(
+        self, patient: Patient, results: list[Sheet], start_time: float
+    ) -> list[Sheet]:
+        """Filter the results of a patient with more than one result by mother name and account the search
+
+        Args:
+            patient (Patient): The patient data from GAL
+            results (list[Sheet]): The opportune results of the patient
+            start_time (float): The start time of the search
+
+        Returns:
+            list[Sheet]: The results considered.
+        """
+        results_count = len(results)
         end_time = time.time()
         elapsed_time = end_time - start_time
 
@@ -378,29 +529,221 @@ class NotificationResearcher(Criterias):
         self.reporter.clean_patient()
         return results
 
-    def __treat_results(self, res: requests.Response) -> list[Sheet]:
-        """This will receive the search response from the sinan website and will return a list of dicts with the results
+    def __fallback_message(self, patient: Patient, criterias: tuple):
+        """Report that no results were found and the notification number will be used"""
+        display(
+            f"Utilizando os critérios {criterias} não foram encontrados resultados para o paciente {patient.name}. Pesquisando pelo número de notificação agora.",
+            category="info",
+        )
+        self.reporter.info(
+            "Nenhuma notificação encontrada. Será feita uma nova pesquisa utilizando o número de notificação"
+        )
+
+    def search(
+        self,
+        patient: Patient,
+        use_notification_number: bool = False,
+        start_time: Optional[float] = None,
+    ):
+        """Search for a patient in the Sinan website (Consultar Notificação)
 
         Args:
-            res (requests.Response): The response from the sinan website
+            patient (Patient): The patient data from GAL to search
+            use_notification_number (bool, optional): Search only by the notification number. Defaults to False.
+            start_time (Optional[float], optional): The start time of the search. Defaults to None.
 
         Returns:
-            list[Sheet]: A list of dicts with the results
+            list[Sheet]: A list of results with objects to interact with.
         """
-        soup = BeautifulSoup(res.content, "html.parser")
-        reult_tag = soup.find("span", {"id": "form:panelResultadoPesquisa"})
-        thead = valid_tag(soup.find("thead", {"class": "rich-table-thead"}))
-        tbody = valid_tag(soup.find("tbody", {"id": "form:tabelaResultadoPesquisa:tb"}))
+        start_time = start_time or time.time()
+        self.patient = patient
+        self.reporter.set_patient(patient)
+        display(f"Pesquisando pelo paciente {patient.name}")
 
-        if not (thead and tbody and reult_tag):
+        candidates = self.__recovering(
+            partial(self.__search_candidates, patient, use_notification_number)
+        )
+        if candidates is None:
             return []
 
-        column_names = [th.span.text.strip() for th in thead.find_all("th")]
-        sheets: list[Sheet] = []
+        results = self.__treat_results(candidates, patient)
+
+        if len(results) == 0 and not use_notification_number:
+            self.__fallback_message(patient, tuple(self.searched_criterias))
+            return self.search(
+                patient, use_notification_number=True, start_time=start_time
+            )
+
+        return self.__conclude(patient, results, start_time)
+
+    def search_group(
+        self, patients: list[Patient]
+    ) -> tuple[list[tuple[Patient, list[Sheet]]], list[Patient]]:
+        """Search once for the exams of the same patient (same name, mother and birth date)
+
+        The notifications found are shared by every exam, each exam gets its own sheets (with
+        its own opportunity check). The exams without results must be searched by their
+        notification number (`search(patient, use_notification_number=True)`) only after the
+        others were investigated, because a new search replaces the results page the shared
+        sheets are opened from.
 
-        for i, row in enumerate(tbody.find_all("tr"), 0):
-            row_values = [td.text.strip() for td in row.find_all("td")]
-            value = dict(zip(column_names, row_values))
+        Args:
+            patients (list[Patient]): The exams of the same patient
+
+        Returns:
+            tuple[list[tuple[Patient, list[Sheet]]], list[Patient]]: Each exam with results and its
+                results, and the exams to be searched by the notification number.
+        """
+        if len(patients) == 1:
+            return [(patients[0], self.search(patients[0]))], []
+
+        start_time = time.time()
+        first = patients[0]
+        self.patient = first
+        self.reporter.set_patient(first)
+        display(f"Pesquisando pelo paciente {first.name} ({len(patients)} exames)")
+        self.reporter.debug(
+            f"Uma única pesquisa será feita para os {len(patients)} exames do paciente."
+        )
+
+        candidates = self.__recovering(partial(self.__search_candidates, first))
+        if candidates is None:
+            # the abort reasons (eg. no birth date) are the same for every exam
+            return [(patient, self.search(patient)) for patient in patients], []
+
+        found: list[tuple[Patient, list[Sheet]]] = []
+        without_results: list[Patient] = []
+        for patient in patients:
+            self.patient = patient
+            self.reporter.set_patient(patient)
+            results = self.__treat_results(candidates, patient)
+            if not results:
+                self.__fallback_message(patient, tuple(self.searched_criterias))
+                without_results.append(patient)
+                continue
+
+            found.append((patient, self.__conclude(patient, results, start_time)))
+            start_time = time.time()
+
+        return found, without_results
+
+    def list_notifications(self) -> list[dict]:
+        """List every notification of the agravo in the date window ("Lista de Notificação")
+
+        A search without criteria is made and every page of its results is read (the pages
+        are changed through the RichFaces datascroller of the results table).
+
+        Returns:
+            list[dict]: The listed rows (column name -> cell text, see `parse_search_results`)
+        """
+        display(f"Carregando a lista de notificações do agravo {self.agravo}")
+        self.session.results_page = None
+        self.__define_javax_faces()
+        self.__select_agravo()
+        res = self.__search()
+
+        rows = self.parser.run(parse_search_results, res.content)
+        pager = self.parser.run(parse_results_pager, res.content)
+        page, pages, scroller = 1, pager["pages"], pager["scroller"]
+        while scroller and page < pages:
+            page += 1
+            payload = self.base_payload.copy()
+            payload.update(
+                {
+                    scroller: str(page),
+                    "ajaxSingle": scroller,
+                    "AJAX:EVENTS_COUNT": "1",
+                }
+            )
+            res = self.session.post(self.endpoint, data=payload)
+            page_rows = self.parser.run(parse_search_results, res.content)
+            if not page_rows:
+                display(
+                    f"A página {page} da lista de notificações veio vazia. Listagem interrompida.",
+                    category="erro",
+                )
+                break
+
+            rows.extend(page_rows)
+            # the pager shows only some pages around the current one
+            pages = max(pages, self.parser.run(parse_results_pager, res.content)["pages"])
+
+        display(f"{len(rows)} notificações lidas em {page} páginas.", category="info")
+        return rows
+
+    def locate(self, notification_number: str, patient: Patient) -> Optional[Sheet]:
+        """Search a notification by its number (eg. one of a reviewed plan) to act on it
+
+        Nothing is decided here, the sheet is only found again in a new search so it can be opened
+        from the results page of this session.
+
+        Args:
+            notification_number (str): The Sinan notification number
+            patient (Patient): The patient (exam) the notification is for
+
+        Returns:
+            Optional[Sheet]: The sheet of the notification or None if it was not found
+        """
+        self.patient = patient
+        self.reporter.set_patient(patient)
+        display(f"Localizando a notificação {notification_number} ({patient.name})")
+        return self.__recovering(partial(self.__locate, notification_number, patient))
+
+    def __recovering(self, search: Callable[[], T]) -> T:
+        """Run a search again (once) when the view state or the session expired in the middle of it
+
+        A search always starts from a new Consultar Notificação page, so nothing of the patient
+        context is lost by starting it over (a dropped session was already logged in again by
+        the `SinanSession`).
+
+        Args:
+            search (Callable[[], T]): The search
+
+        Returns:
+            T: The result of the search
+        """
+        try:
+            return search()
+        except ViewExpired as error:
+            display(
+                "Estado de visualização expirado durante a pesquisa. Pesquisando novamente.",
+                category="erro",
+            )
+            self.reporter.warn(
+                "Estado de visualização expirado durante a pesquisa. A pesquisa foi refeita.",
+                type(error).__name__,
+            )
+            return search()
+
+    def __locate(self, notification_number: str, patient: Patient) -> Optional[Sheet]:
+        """Search the notification by its number (see `locate`)"""
+        candidates = self.__cached_search(
+            ["Número da Notificação"], patient, notification_number
+        )
+        for candidate in candidates:
+            if candidate.notification_number == notification_number:
+                return candidate.for_patient(patient)
+
+        self.reporter.error(
+            "Notificação do plano não encontrada no Sinan. Ação ignorada.",
+            f"Nº da Notificação: {notification_number}",
+        )
+        return None
+
+    def __load_candidates(self, res: requests.Response, patient: Patient) -> list[Sheet]:
+        """This will receive the search response from the sinan website and will open every result found
+
+        Args:
+            res (requests.Response): The response from the sinan website
+            patient (Patient): The patient searched
+
+        Returns:
+            list[Sheet]: A sheet of each result
+        """
+        rows = self.parser.run(parse_search_results, res.content)
+        candidates: list[Sheet] = []
+
+        for i, value in enumerate(rows, 0):
             payload = self.base_payload.copy()
 
             payload.update(
@@ -409,14 +752,38 @@ class NotificationResearcher(Criterias):
                 }
             )
 
-            sheet = Sheet(
-                self.session,
-                self.municipality,
-                self.patient,
-                value,
-                payload,
-                self.reporter,
+            candidates.append(
+                Sheet(
+                    self.session,
+                    self.municipality,
+                    patient,
+                    value,
+                    payload,
+                    self.reporter,
+                    self.parser,
+                    self.journal,
+                    self.locate,
+                    self.cache.invalidate if self.cache else None,
+                    self.snapshots,
+                )
             )
+
+        return candidates
+
+    def __treat_results(self, candidates: list[Sheet], patient: Patient) -> list[Sheet]:
+        """Select the opportune results of an exam among the candidates (sheets of the search results)
+
+        Args:
+            candidates (list[Sheet]): The sheets of the search results
+            patient (Patient): The patient (exam) the results are for
+
+        Returns:
+            list[Sheet]: The sheets of the exam
+        """
+        sheets: list[Sheet] = []
+
+        for candidate in candidates:
+            sheet = candidate.for_patient(patient)
             self.reporter.increment_stat("notifications")
             if sheet.is_oportunity:
                 sheets.append(sheet)
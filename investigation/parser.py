@@ -0,0 +1,291 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, TypeVar
+
+from bs4 import BeautifulSoup
+
+from core.utils import get_form_data, valid_tag
+
+T = TypeVar("T")
+
+
+@contextmanager
+def _parsed(content: bytes) -> Iterator[BeautifulSoup]:
+    """Parse the content and destroy the tree (`decompose`) when leaving the context
+
+    Only the compact extracted facts must leave the context, never tags of the tree.
+
+    Args:
+        content (bytes): The raw response content
+
+    Yields:
+        BeautifulSoup: The parsed page
+    """
+    soup = BeautifulSoup(content, "html.parser")
+    try:
+        yield soup
+    finally:
+        soup.decompose()
+
+
+def parse_errors(content: bytes) -> list[str]:
+    """Extract the error messages (`<li class="error">`) from a Sinan page
+
+    Args:
+        content (bytes): The raw response content
+
+    Returns:
+        list[str]: The list of error messages
+    """
+    with _parsed(content) as soup:
+        error_tags = soup.find_all("li", {"class": "error"})
+        return [error.get_text() for error in error_tags if error.get_text()]
+
+
+def parse_search_results(content: bytes) -> list[dict]:
+    """Extract the rows of the consultation result table
+
+    Args:
+        content (bytes): The raw response content of the search
+
+    Returns:
+        list[dict]: One dict per result row mapping the column name to the cell text
+    """
+    with _parsed(content) as soup:
+        result_tag = soup.find("span", {"id": "form:panelResultadoPesquisa"})
+        thead = valid_tag(soup.find("thead", {"class": "rich-table-thead"}))
+        tbody = valid_tag(
+            soup.find("tbody", {"id": "form:tabelaResultadoPesquisa:tb"})
+        )
+
+        if not (thead and tbody and result_tag):
+            return []
+
+        column_names = [th.span.text.strip() for th in thead.find_all("th")]
+        return [
+            dict(zip(column_names, [td.text.strip() for td in row.find_all("td")]))
+            for row in tbody.find_all("tr")
+        ]
+
+
+def parse_results_pager(content: bytes) -> dict:
+    """Extract the pager (RichFaces datascroller) of the consultation result table
+
+    Args:
+        content (bytes): The raw response content of the search (or of a page change)
+
+    Returns:
+        dict: The pager facts
+            - `scroller`: the id of the datascroller component (None if the results have a single page)
+            - `pages`: the last page number shown by the pager (it may show only some pages)
+    """
+    with _parsed(content) as soup:
+        scroller = valid_tag(soup.find("div", {"class": "rich-datascr"}))
+        if not scroller:
+            return {"scroller": None, "pages": 1}
+
+        numbers = [
+            int(cell.get_text(strip=True))
+            for cell in scroller.find_all("td")
+            if cell.get_text(strip=True).isdigit()
+        ]
+        return {
+            "scroller": str(scroller.get("id") or "") or None,
+            "pages": max(numbers, default=1),
+        }
+
+
+def parse_consultation_page(content: bytes) -> dict:
+    """Extract the view state and the search field types from the consultation page
+
+    Args:
+        content (bytes): The raw response content of `consultarNotificacao.jsf`
+
+    Returns:
+        dict: The consultation facts
+            - `view_state`: the `javax.faces.ViewState` value (None if not found)
+            - `field_types`: the search field types mapping the option text to its value
+    """
+    with _parsed(content) as soup:
+        view_state_tag = valid_tag(
+            soup.find("input", {"name": "javax.faces.ViewState"})
+        )
+        field_type_select = valid_tag(
+            soup.find("select", {"id": "form:consulta_tipoCampo"})
+        )
+        field_types = (
+            {
+                option.text.strip(): option.get("value")
+                for option in field_type_select.find_all("option")
+            }
+            if field_type_select
+            else {}
+        )
+
+        return {
+            "view_state": view_state_tag.get("value") if view_state_tag else None,
+            "field_types": field_types,
+        }
+
+
+def parse_search_operators(content: bytes) -> dict:
+    """Extract the operators available for the selected search field
+
+    Args:
+        content (bytes): The raw response content of the field selection
+
+    Returns:
+        dict: The operators mapping the option text to its value
+    """
+    with _parsed(content) as soup:
+        operator_options = soup.find(
+            "select", {"id": "form:consulta_operador"}
+        ).find_all("option")  # type: ignore
+        return {tag.get_text(): tag.get("value") for tag in operator_options}
+
+
+def parse_notification_page(content: bytes) -> dict:
+    """Extract the facts used by the bot from the notification page
+
+    Args:
+        content (bytes): The raw response content of the notification page
+
+    Returns:
+        dict: The notification facts
+            - `form_data`: the notification form default values
+            - `view_state`: the `javax.faces.ViewState` value (None if not found)
+            - `investigation_tab_enabled`: whether the investigation tab is enabled (None if not found)
+            - `save_button_exists`: whether the "Salvar" button exists
+            - `residence_checkbox_checked`: whether "Habilitar para Local de Residência" is checked (None if not found)
+    """
+    with _parsed(content) as soup:
+        view_state_tag = valid_tag(soup.find(attrs={"name": "javax.faces.ViewState"}))
+        investigation_tab = valid_tag(
+            soup.find(attrs={"id": "form:tabInvestigacao_lbl"})
+        )
+        checkbox_tag = valid_tag(soup.find("input", {"id": "form:habilitaAntesPrazo"}))
+        save_button_tag = valid_tag(soup.find("input", {"id": "form:btnSalvar"}))
+
+        return {
+            "form_data": get_form_data(soup),
+            "view_state": str(view_state_tag.get("value")) if view_state_tag else None,
+            "investigation_tab_enabled": (
+                "rich-tab-disabled" not in (investigation_tab.get("class") or [])
+                if investigation_tab
+                else None
+            ),
+            "save_button_exists": save_button_tag is not None,
+            "residence_checkbox_checked": (
+                checkbox_tag.get("checked") == "checked" if checkbox_tag else None
+            ),
+        }
+
+
+def _parse_modal(soup: BeautifulSoup) -> dict:
+    """Extract the popUp (modal) shown by the server instead of the investigation page
+
+    Args:
+        soup (BeautifulSoup): The parsed page
+
+    Returns:
+        dict: The modal facts (`text` and `ok_payload`) or an `error` key
+    """
+    show_modal_script = next(
+        (
+            s
+            for s in soup.find_all("script")
+            if s.text.strip().endswith(".component.show();")
+        ),
+        None,
+    )
+
+    if not show_modal_script:
+        return {"error": "script"}
+
+    show_modal_text = "".join(show_modal_script.text.split("\n")).strip()
+
+    modal_id_match = re.search(
+        r"getElementById\(['\"]([^'\"]+)['\"]\)", show_modal_text
+    )
+    if not modal_id_match:
+        return {"error": "id"}
+
+    modal_id = modal_id_match.group(1)
+    modal_text = soup.find("div", {"id": modal_id}).get_text(strip=True)  # type: ignore
+
+    payload_modal_ok = get_form_data(
+        soup, "div", {"id": modal_id}, not_include_starts_with="--"
+    )
+
+    return {
+        "text": modal_text,
+        "ok_payload": {k: v for k, v in payload_modal_ok.items() if "ok" in v.lower()},
+    }
+
+
+def parse_investigation_page(content: bytes) -> dict:
+    """Extract the facts used by the bot from the (supposed) investigation page
+
+    Args:
+        content (bytes): The raw response content
+
+    Returns:
+        dict: The investigation facts
+            - `is_investigation`: whether the page is really the investigation page
+            - `form_data`: the page form default values (None if the page has no form)
+            - `modal`: the popUp facts (only if not `is_investigation`)
+    """
+    with _parsed(content) as soup:
+        first_investigation_input = valid_tag(
+            soup.find(attrs={"id": "form:dtInvestigacaoInputDate"})
+        )
+        form_data = get_form_data(soup) if valid_tag(soup.find(id="form")) else None
+
+        if first_investigation_input:
+            return {"is_investigation": True, "form_data": form_data}
+
+        return {
+            "is_investigation": False,
+            "form_data": form_data,
+            "modal": _parse_modal(soup),
+        }
+
+
+class ParseExecutor:
+    """Runs the HTML parsers of this module inline or in a process pool
+
+    The parsers receive the raw response bytes and return compact (picklable) results,
+    so the CPU-bound parsing can be offloaded from the workers doing network I/O.
+    """
+
+    def __init__(self, processes: int = 0):
+        """Initialize the ParseExecutor
+
+        Args:
+            processes (int, optional): Number of parser processes. Defaults to 0 (parse inline).
+        """
+        self.processes = processes
+        self.__pool: Optional[ProcessPoolExecutor] = (
+            ProcessPoolExecutor(max_workers=processes) if processes > 0 else None
+        )
+
+    def run(self, parser: Callable[[bytes], T], content: bytes) -> T:
+        """Run a parser over the response content
+
+        Args:
+            parser (Callable[[bytes], T]): A module-level parser (eg. `parse_errors`)
+            content (bytes): The raw response content
+
+        Returns:
+            T: The parser result
+        """
+        if self.__pool is None:
+            return parser(content)
+        return self.__pool.submit(parser, content).result()
+
+    def shutdown(self):
+        """Shutdown the process pool (if any)"""
+        if self.__pool is not None:
+            self.__pool.shutdown()
+            self.__pool = None
@@ -1,160 +1,235 @@
 from datetime import datetime
-from typing import Optional
+from typing import Any, Iterator, Mapping, Optional, Sequence
 
 import pandas as pd
 
 from core.constants import (
+    AGRAVO_COLUMN,
+    EXAM_KEY_COLUMN,
+    EXAM_RESULT_COLUMN,
     EXAM_RESULT_ID,
+    EXAM_TYPE_COLUMN,
     EXAM_VALUE_COL_MAP,
+    EXAMS_AGRAVO_MAP,
     EXAMS_GAL_MAP,
+    FORMATTED_DATE_COLUMNS,
+    GAL_MUNICIPALITY_COLUMN,
+    MOTHER_KEY_COLUMN,
+    PATIENT_KEY_COLUMN,
+    POSSIBLE_AGRAVOS,
     POSSIBLE_EXAM_TYPES,
+    SINAN_RESULT_ID_COLUMN,
 )
+from core.utils import canonical_name_key
 
 
-class Properties:
-    """Class to handle properties of patient data"""
+def _value(row: Sequence, positions: Mapping[str, int], column: str) -> Any:
+    """Gets the value of a column in a row (missing columns and values as None).
 
-    data: dict
+    Args:
+        row (Sequence): The row values.
+        positions (Mapping[str, int]): Position of each column in the row.
+        column (str): The column name.
 
-    @property
-    def exam_type(self) -> POSSIBLE_EXAM_TYPES:
-        """Gets the exam type (IgM, NS1, PCR).
-
-        Returns:
-            POSSIBLE_EXAM_TYPES: The type of exam.
-        """
-        return EXAMS_GAL_MAP[self.data["Exame"]]
-
-    @property
-    def name(self) -> str:
-        """Gets the patient name.
-
-        Returns:
-            str: The patient's name.
-        """
-        return self.data["Paciente"]
+    Returns:
+        Any: The value or None.
+    """
+    position = positions.get(column)
+    if position is None:
+        return None
+    value = row[position]
+    return None if pd.isna(value) else value
 
-    @property
-    def exam_result(self) -> str:
-        """Gets the result of the exam.
 
-        Returns:
-            str: The result of the exam.
-        """
-        result_exam_col_name = EXAM_VALUE_COL_MAP[self.exam_type]
-        return self.data[result_exam_col_name]
+def _format_date(date: Optional[datetime]) -> str:
+    """Formats a date as dd/mm/YYYY.
 
-    @property
-    def notification_number(self) -> str:
-        """Gets the notification number given by the GAL.
+    Args:
+        date (Optional[datetime]): The date.
 
-        Returns:
-            str: The notification number.
-        """
-        return self.data["Núm. Notificação Sinan"]
+    Returns:
+        str: The formatted date or N/A.
+    """
+    return date.strftime("%d/%m/%Y") if date is not None else "N/A"
 
-    @property
-    def birth_date(self) -> Optional[datetime]:
-        """Gets the birth date of the patient (object).
 
-        Returns:
-            Optional[datetime]: The birth date of the patient.
-        """
-        return (
-            self.data["Data de Nascimento"]
-            if not pd.isna(self.data["Data de Nascimento"])
-            else None
-        )
+class Patient:
+    """Patient representation from GAL database.
 
-    @property
-    def f_birth_date(self) -> str:
-        """Gets the formatted birth date (dd/mm/YYYY).
+    A compact record (`__slots__`) built from a row of the typed GAL dataframe (see
+    `from_dataframe`). Every value, derived ones included (exam type, Sinan result ID,
+    formatted dates, name keys...), is read from the columns derived on load or computed
+    once on creation. Missing values are None.
 
-        Returns:
-            str: The formatted birth date or N/A.
-        """
-        return self.birth_date.strftime("%d/%m/%Y") if self.birth_date else "N/A"
+    Attributes:
+        name (str): The patient's name.
+        name_key (str): The canonical key of the patient name.
+        mother_name (str): The mother's name.
+        mother_key (str): The canonical key of the mother's name.
+        notification_number (str): The notification number given by the GAL.
+        birth_date (Optional[datetime]): The birth date of the patient.
+        f_birth_date (str): The formatted birth date (dd/mm/YYYY) or N/A.
+        notification_date (datetime): The notification date given by the GAL.
+        collection_date (datetime): The date of the collection (GAL - Exam).
+        f_collection_date (str): The formatted collection date (dd/mm/YYYY) or N/A.
+        exam_type (POSSIBLE_EXAM_TYPES): The type of exam (IgM, NS1, PCR), None if unknown.
+        agravo (Optional[POSSIBLE_AGRAVOS]): The agravo of the exam (`EXAMS_AGRAVO_MAP`), None if unknown.
+        municipality (Optional[str]): The municipality of residence of the patient, None if unknown.
+        exam_result (str): The result of the exam.
+        sinan_result_id (str): The SINAN result ID, None if unknown.
+        sorotypes (list[str]): The list of sorotypes.
+        key (Optional[int]): The exam key (hash of the fields identifying the exam), None if unknown.
+    """
 
-    @property
-    def mother_name(self) -> str:
-        """Gets the mother's name.
+    __slots__ = (
+        "name",
+        "name_key",
+        "mother_name",
+        "mother_key",
+        "notification_number",
+        "birth_date",
+        "f_birth_date",
+        "notification_date",
+        "collection_date",
+        "f_collection_date",
+        "exam_type",
+        "agravo",
+        "municipality",
+        "exam_result",
+        "sinan_result_id",
+        "sorotypes",
+        "key",
+    )
+
+    def __init__(self, row: Sequence, positions: Mapping[str, int]):
+        """Initializes the Patient with a row of the GAL data.
 
-        Returns:
-            str: The mother's name.
+        Args:
+            row (Sequence): The row values (eg. from `DataFrame.itertuples(index=False, name=None)`).
+            positions (Mapping[str, int]): Position of each column in the row.
         """
-        return self.data["Nome da Mãe"]
-
-    @property
-    def notification_date(self) -> datetime:
-        """Gets the notification date given by the GAL.
+        self.name: str = _value(row, positions, "Paciente")
+        self.mother_name: str = _value(row, positions, "Nome da Mãe")
+        # the keys are computed on load, but a missing column falls back to the name
+        self.name_key: str = (
+            _value(row, positions, PATIENT_KEY_COLUMN)
+            if PATIENT_KEY_COLUMN in positions
+            else canonical_name_key(self.name)
+        ) or ""
+        self.mother_key: str = (
+            _value(row, positions, MOTHER_KEY_COLUMN)
+            if MOTHER_KEY_COLUMN in positions
+            else canonical_name_key(self.mother_name)
+        ) or ""
+        self.notification_number: str = _value(
+            row, positions, "Núm. Notificação Sinan"
+        )
 
-        Returns:
-            datetime: The notification date.
-        """
-        return self.data["Data da Notificação"]
+        self.birth_date: Optional[datetime] = _value(
+            row, positions, "Data de Nascimento"
+        )
+        self.notification_date: datetime = _value(
+            row, positions, "Data da Notificação"
+        )
+        self.collection_date: datetime = _value(row, positions, "Data da Coleta")
+
+        if EXAM_TYPE_COLUMN in positions:
+            # derived on load (see `investigation.data_loader.derive`)
+            self.f_birth_date: str = _value(
+                row, positions, FORMATTED_DATE_COLUMNS["Data de Nascimento"]
+            )
+            self.f_collection_date: str = _value(
+                row, positions, FORMATTED_DATE_COLUMNS["Data da Coleta"]
+            )
+            self.exam_type: POSSIBLE_EXAM_TYPES = _value(
+                row, positions, EXAM_TYPE_COLUMN
+            )
+            self.exam_result: str = _value(row, positions, EXAM_RESULT_COLUMN)
+            self.sinan_result_id: str = _value(row, positions, SINAN_RESULT_ID_COLUMN)
+        else:
+            self.f_birth_date = _format_date(self.birth_date)
+            self.f_collection_date = _format_date(self.collection_date)
+            self.exam_type = EXAMS_GAL_MAP.get(_value(row, positions, "Exame"))
+            self.exam_result = (
+                _value(row, positions, EXAM_VALUE_COL_MAP[self.exam_type])
+                if self.exam_type
+                else None
+            )
+            result_map = EXAM_RESULT_ID.get(self.exam_type, {})
+            self.sinan_result_id = (
+                result_map.get(self.exam_result, result_map.get("_default"))
+                if self.exam_result is not None
+                else None
+            )
+
+        self.agravo: Optional[POSSIBLE_AGRAVOS] = (
+            _value(row, positions, AGRAVO_COLUMN)
+            if AGRAVO_COLUMN in positions
+            else EXAMS_AGRAVO_MAP.get(_value(row, positions, "Exame"))
+        )
 
-    @property
-    def collection_date(self) -> datetime:
-        """Gets the date of the collection (GAL - Exam).
+        self.municipality: Optional[str] = _value(
+            row, positions, GAL_MUNICIPALITY_COLUMN
+        )
 
-        Returns:
-            datetime: The collection date.
-        """
-        return self.data["Data da Coleta"]
+        sorotypes = _value(row, positions, "Sorotipo")
+        self.sorotypes: list[str] = sorotypes.split(" e ") if sorotypes else []
 
-    @property
-    def f_collection_date(self) -> str:
-        """Gets the formatted collection date (dd/mm/YYYY).
+        key = _value(row, positions, EXAM_KEY_COLUMN)
+        self.key: Optional[int] = int(key) if key is not None else None
 
-        Returns:
-            str: The formatted collection date.
-        """
-        return self.collection_date.strftime("%d/%m/%Y")
+    @classmethod
+    def from_dict(cls, patient_data: Mapping[str, Any]) -> "Patient":
+        """Creates a Patient from a dict of the patient data.
 
-    @property
-    def exam_result_map(self):
-        """Gets the exam result ID map.
+        Args:
+            patient_data (Mapping[str, Any]): The patient data (column -> value).
 
         Returns:
-            dict: The exam result ID map.
+            Patient: The patient.
         """
-        return EXAM_RESULT_ID[self.exam_type]
+        return cls(
+            tuple(patient_data.values()),
+            {column: i for i, column in enumerate(patient_data)},
+        )
 
-    @property
-    def sinan_result_id(self):
-        """Gets the SINAN result ID.
+    def to_dict(self) -> dict[str, Any]:
+        """Converts the Patient to a dict of the patient data (the inverse of `from_dict`).
 
         Returns:
-            str: The SINAN result ID.
+            dict[str, Any]: The patient data (column -> value), derived columns included.
         """
-        return self.exam_result_map[self.exam_result]
+        return {
+            "Paciente": self.name,
+            "Nome da Mãe": self.mother_name,
+            PATIENT_KEY_COLUMN: self.name_key,
+            MOTHER_KEY_COLUMN: self.mother_key,
+            "Núm. Notificação Sinan": self.notification_number,
+            "Data de Nascimento": self.birth_date,
+            "Data da Notificação": self.notification_date,
+            "Data da Coleta": self.collection_date,
+            FORMATTED_DATE_COLUMNS["Data de Nascimento"]: self.f_birth_date,
+            FORMATTED_DATE_COLUMNS["Data da Coleta"]: self.f_collection_date,
+            EXAM_TYPE_COLUMN: self.exam_type,
+            AGRAVO_COLUMN: self.agravo,
+            GAL_MUNICIPALITY_COLUMN: self.municipality,
+            EXAM_RESULT_COLUMN: self.exam_result,
+            SINAN_RESULT_ID_COLUMN: self.sinan_result_id,
+            "Sorotipo": " e ".join(self.sorotypes) or None,
+            EXAM_KEY_COLUMN: self.key,
+        }
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> Iterator["Patient"]:
+        """Creates the patients of each row of a GAL dataframe (lazily).
 
-    @property
-    def sorotypes(self) -> list[str]:
-        """Gets the sorotypes from the data.
+        Args:
+            df (pd.DataFrame): The prepared GAL dataframe.
 
-        Returns:
-            list[str]: The list of sorotypes.
+        Yields:
+            Patient: The patient of each row.
         """
-        sorotypes = self.data.get("Sorotipo", "")
-        if pd.isna(sorotypes):
-            return []
-        return sorotypes.split(" e ")
-
-
-class Patient(Properties):
-    """Patient representation from GAL database.
-
-    A lot of properties are defined here for easy access.
+        positions = {column: i for i, column in enumerate(df.columns)}
+        for row in df.itertuples(index=False, name=None):
+            yield cls(row, positions)
 
-    Attributes:
-        data (dict): The patient data.
-    """
-
-    def __init__(self, patient_data: dict):
-        """Initializes the Patient with patient data.
-
-        Args:
-            patient_data (dict): The patient data.
-        """
-        self.data = patient_data
@@ -0,0 +1,166 @@
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Literal, NamedTuple, Optional
+
+from core.constants import PLAN_PATH
+from investigation.investigator import ExamTask
+from investigation.patient import Patient
+from investigation.sheet import planned_exam_fields
+
+_DATE_COLUMNS = ("Data de Nascimento", "Data da Notificação", "Data da Coleta")
+"""Columns of the patient data stored as ISO dates in the plan"""
+
+
+def _dump_patient(patient: Patient) -> dict:
+    """Convert a patient (exam) to a JSON serializable dict"""
+    data = patient.to_dict()
+    for column in _DATE_COLUMNS:
+        if data[column] is not None:
+            data[column] = data[column].isoformat()
+    return data
+
+
+def _load_patient(data: dict) -> Patient:
+    """Rebuild a patient (exam) from its dict in the plan"""
+    data = dict(data)
+    for column in _DATE_COLUMNS:
+        if data.get(column) is not None:
+            data[column] = datetime.fromisoformat(data[column])
+    return Patient.from_dict(data)
+
+
+class PlannedAction(NamedTuple):
+    """An action of the plan, the notification is located again by its number on execution"""
+
+    kind: Literal["investigate", "delete"]
+    notification_number: str
+    patients: list[Patient]
+
+
+class PlannedTask(NamedTuple):
+    """An entry of the plan: the actions of one or more exams and the outcome to be recorded"""
+
+    patients: list[Patient]
+    actions: list[PlannedAction]
+    outcome: Optional[str]  # None: "investigated" if the actions succeed, else "error"
+    notification_numbers: list[str]
+
+
+class PlanWriter:
+    """Writes the decided tasks to a plan (JSON lines) instead of submitting them to the Sinan
+
+    Each line is an entry that can be reviewed before the execution (`read_plan`):
+    `{"exams": [<patient data>], "outcome": ..., "notification_numbers": [...], "actions": [...]}`.
+    An investigation action lists the exams (positions in "exams") and the form fields they will
+    fill. The classification and the closing date depend on the investigation saved in the Sinan,
+    so they are only defined on the execution.
+    """
+
+    def __init__(self, path: Path = PLAN_PATH):
+        """Initialize the PlanWriter (a previous plan in the path is replaced)
+
+        Args:
+            path (Path, optional): Path to the plan file. Defaults to `PLAN_PATH`.
+        """
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.__file = self.path.open("w", encoding="utf-8")
+        self.__lock = threading.Lock()
+        self.__started = time.perf_counter()
+        self.counts = {"entries": 0, "exams": 0, "investigate": 0, "delete": 0}
+
+    def __describe(self, task: ExamTask) -> dict:
+        """Describe a task as an entry of the plan"""
+        actions = []
+        for action in task.actions:
+            patients = action.patients or [action.sheet.patient]
+            entry = {
+                "kind": action.kind,
+                "notification_number": action.sheet.notification_number,
+                "notification_date": action.sheet.f_notification_date,
+                "exams": [task.patients.index(patient) for patient in patients],
+            }
+            if action.kind == "investigate":
+                fields: dict[str, str] = {}
+                # the most recent exam of each type is filled (see `Sheet.investigate_patient`)
+                for patient in sorted(patients, key=lambda p: p.collection_date):
+                    fields.update(planned_exam_fields(patient))
+                entry["fields"] = fields
+            actions.append(entry)
+
+        return {
+            "exams": [_dump_patient(patient) for patient in task.patients],
+            "outcome": task.outcome,
+            "notification_numbers": task.notification_numbers,
+            "actions": actions,
+            "planned_at": datetime.now().isoformat(timespec="seconds"),
+        }
+
+    def write(self, tasks: Iterable[ExamTask]):
+        """Write the tasks to the plan
+
+        Args:
+            tasks (Iterable[ExamTask]): The tasks decided (see `InvestigationBot.__plan`)
+        """
+        for task in tasks:
+            line = json.dumps(self.__describe(task), ensure_ascii=False)
+            with self.__lock:
+                self.__file.write(f"{line}\n")
+                self.__file.flush()
+                self.counts["entries"] += 1
+                self.counts["exams"] += len(task.patients)
+                for action in task.actions:
+                    self.counts[action.kind] += 1
+
+    def summary(self) -> str:
+        """Describe the plan generated and the time spent on it
+
+        Returns:
+            str: The summary
+        """
+        elapsed = time.perf_counter() - self.__started
+        return (
+            f"Plano gerado em {elapsed:.1f} segundos ({self.path}): {self.counts['exams']} exames, "
+            f"{self.counts['investigate']} investigações e {self.counts['delete']} exclusões planejadas."
+        )
+
+    def close(self):
+        """Close the plan file"""
+        self.__file.close()
+
+
+def read_plan(path: Path = PLAN_PATH) -> list[PlannedTask]:
+    """Read the entries of a plan generated by `PlanWriter`
+
+    Args:
+        path (Path, optional): Path to the plan file. Defaults to `PLAN_PATH`.
+
+    Returns:
+        list[PlannedTask]: The entries in the order they were planned
+    """
+    tasks: list[PlannedTask] = []
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+
+            entry = json.loads(line)
+            patients = [_load_patient(data) for data in entry["exams"]]
+            actions = [
+                PlannedAction(
+                    action["kind"],
+                    action["notification_number"],
+                    [patients[index] for index in action["exams"]],
+                )
+                for action in entry["actions"]
+            ]
+            tasks.append(
+                PlannedTask(
+                    patients, actions, entry["outcome"], entry["notification_numbers"]
+                )
+            )
+
+    return tasks
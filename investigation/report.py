@@ -1,5 +1,7 @@
 import json
+import threading
 from datetime import datetime
+from pathlib import Path
 from typing import Literal, Union
 
 import pandas as pd
@@ -25,6 +27,7 @@ class Report:
             "Data de Nascimento",
             "Tipo de Exame",
             "Resultado do Exame",
+            "Agravo",
             "Mensagem",
             "Categoria da Mensagem",
             "Observações",
@@ -36,7 +39,9 @@ class Report:
         self.df = self.df[self.columns]
 
         self.__messages_stack = []
-        self.__current_patient = {}
+        # the current patient is kept per thread (the pipeline stages run in parallel)
+        self.__local = threading.local()
+        self.__lock = threading.RLock()
 
         self.__importance_map = {
             "debug": "Informação Simples",
@@ -66,11 +71,23 @@ class Report:
             "investigated": 0,
             "warnings": 0,
             "exams_without_notification_number": 0,
+            "invalid_exams": 0,
+            "duplicated_exams": 0,
+            "merged_exams": 0,
+            "settled_exams": 0,
+            "resumed_exams": 0,
+            "postponed_exams": 0,
+            "failed_exams": 0,
             "search_time": 0.0,
             "investigation_time": 0.0,
             "average_search_time": 0.0,
             "average_investigation_time": 0.0,
             "average_notifications_found": 0.0,
+            "patient_allocation_mb": 0.0,
+            "average_patient_allocation_mb": 0.0,
+            "max_patient_allocation_mb": 0.0,
+            "traced_memory_mb": 0.0,
+            "peak_rss_mb": 0.0,
         }
 
         self.stats_translated = {
@@ -84,11 +101,23 @@ class Report:
             "investigated": "Total de Fichas Investigadas",
             "warnings": "Quantidade de Avisos",
             "exams_without_notification_number": "Quantidade de Exames sem Número de Notificação (Pesquisa abortada)",
+            "invalid_exams": "Quantidade de Exames Descartados por Dados Inválidos (Sem Pesquisa)",
+            "duplicated_exams": "Quantidade de Exames Repetidos nas Bases do GAL (Removidos)",
+            "merged_exams": "Quantidade de Exames Preenchidos Junto de Outro Exame da Mesma Ficha",
+            "settled_exams": "Quantidade de Exames Já Processados em Execuções Anteriores (Ignorados)",
+            "resumed_exams": "Quantidade de Exames Finalizados Antes da Interrupção (Execução Retomada)",
+            "postponed_exams": "Quantidade de Exames Adiados para Nova Tentativa no Final da Execução (Falhas)",
+            "failed_exams": "Quantidade de Exames Não Concluídos Após Todas as Tentativas",
             "search_time": "Tempo Total de Pesquisa (Segundos)",
             "investigation_time": "Tempo Total de Investigação (Segundos)",
             "average_search_time": "Tempo Médio de Pesquisa (Segundos)",
             "average_investigation_time": "Tempo Médio de Investigação (Total Investigado / Segundos)",
             "average_notifications_found": "Média de Notificações Encontradas (Notificacoes / Segundos)",
+            "patient_allocation_mb": "Memória Total Alocada nos Pacientes (MB)",
+            "average_patient_allocation_mb": "Memória Média Alocada por Paciente (MB)",
+            "max_patient_allocation_mb": "Maior Memória Alocada por um Paciente (MB)",
+            "traced_memory_mb": "Memória Python em Uso Após o Último Paciente (MB)",
+            "peak_rss_mb": "Pico de Memória do Processo (RSS, MB)",
         }
 
         self.df_stats = pd.DataFrame(columns=["Estatística", "Valor"])
@@ -103,20 +132,21 @@ class Report:
             patient (dict): The patient data from GAL
         """
         exam_type = patient.exam_type
-        self.__current_patient = {
+        self.__local.patient = {
             "Nº de Notificação (GAL)": patient.notification_number,
             "Nome do Paciente": patient.name,
             "Nome da Mãe": patient.mother_name,
             "Data de Nascimento": patient.f_birth_date,
             "Tipo de Exame": exam_type,
             "Resultado do Exame": patient.exam_result,
+            "Agravo": patient.agravo or "N/A",
             "Sorotipo": "; ".join(patient.sorotypes) or "Nenhum Sorotipo Informado",
             "Data da Coleta": patient.f_collection_date,
         }
 
     def clean_patient(self):
         """Clean the current patient data"""
-        self.__current_patient = {}
+        self.__local.patient = {}
 
     def __apply_colors(self, worksheet):
         """Apply colors to cells in 'Categoria da Mensagem' column based on importance"""
@@ -169,22 +199,46 @@ class Report:
     def generate_reports_filename(self, data: pd.DataFrame):
         """Generate the reports filename based on the date and the time of execution and release
 
+        Without release dates (eg. every streamed chunk was filtered out) the run date is used.
+
         Args:
             data (pd.DataFrame): The GAL database
         """
-        max_release_date = data["Data da Liberação"].max().strftime("%d.%m.%Y")
-        min_release_date = data["Data da Liberação"].min().strftime("%d.%m.%Y")
-
-        if max_release_date != min_release_date:
-            release_dates = f"{min_release_date} à {max_release_date}"
+        release = data["Data da Liberação"].dropna()
+        if release.empty:
+            release_dates = EXECUTION_DATE.strftime("%d.%m.%Y")
         else:
-            release_dates = max_release_date
+            max_release_date = release.max().strftime("%d.%m.%Y")
+            min_release_date = release.min().strftime("%d.%m.%Y")
+
+            if max_release_date != min_release_date:
+                release_dates = f"{min_release_date} à {max_release_date}"
+            else:
+                release_dates = max_release_date
 
-        exams = ", ".join(map(lambda e: EXAMS_GAL_MAP[e], data["Exame"].unique()))
+        exams = (
+            ", ".join(map(lambda e: EXAMS_GAL_MAP[e], data["Exame"].dropna().unique()))
+            or "nenhum exame"
+        )
         run_datetime = EXECUTION_DATE.strftime("%d.%m.%Y às %Hh%M")
-        self.__reports_filename = f"Investigação ({exams}) - liberação {release_dates} - execução {run_datetime}.xlsx"
-        print(f"[RELATORIO] Nome do relatório: {self.__reports_filename}")
-        self.__export()
+        with self.__lock:
+            self.__reports_filename = f"Investigação ({exams}) - liberação {release_dates} - execução {run_datetime}.xlsx"
+            print(f"[RELATORIO] Nome do relatório: {self.__reports_filename}")
+            self.__export()
+
+    def generate_plan_reports_filename(self, plan_path: Path):
+        """Generate the reports filename of the execution of a plan (see `investigation.plan`)
+
+        Args:
+            plan_path (Path): The plan file executed
+        """
+        run_datetime = EXECUTION_DATE.strftime("%d.%m.%Y às %Hh%M")
+        with self.__lock:
+            self.__reports_filename = (
+                f"Execução do plano ({plan_path.stem}) - execução {run_datetime}.xlsx"
+            )
+            print(f"[RELATORIO] Nome do relatório: {self.__reports_filename}")
+            self.__export()
 
     def __add_message(
         self,
@@ -199,7 +253,7 @@ class Report:
             importance (int, optional): The message importance mapped. Defaults to 0.
             observation (str, optional): Some observation about the message. Defaults to "".
         """
-        row = self.__current_patient.copy()
+        row = getattr(self.__local, "patient", {}).copy()
         if row.get("Nome do Paciente") is None:
             observation = (
                 f"{observation} (Esta é uma mensagem sem relação à algum paciente)"
@@ -214,10 +268,11 @@ class Report:
             }
         )
 
-        self.__messages_stack.append(row)
-        self.df = pd.DataFrame(self.__messages_stack)
+        with self.__lock:
+            self.__messages_stack.append(row)
+            self.df = pd.DataFrame(self.__messages_stack)
 
-        self.__export()
+            self.__export()
 
     def debug(self, message: str, observation: str = ""):
         """Add a debug message (Importance: Informação Simples)
@@ -287,23 +342,39 @@ class Report:
             key (str): The key to increment
             value (Union[int, float], optional): The value to increment. Defaults to 1.
         """
-        self.stats[key] = self.stats.get(key, 0) + value
+        with self.__lock:
+            self.stats[key] = self.stats.get(key, 0) + value
 
-        self.stats["average_search_time"] = (
-            self.stats["search_time"] / (self.stats["patients"])
-            if self.stats["patients"] > 0
-            else 0
-        )
-        self.stats["average_investigation_time"] = (
-            self.stats["investigation_time"] / (self.stats["investigated"])
-            if self.stats["investigated"] > 0
-            else 0
-        )
-        self.stats["average_notifications_found"] = (
-            self.stats["notifications"] / (self.stats["patients"])
-            if self.stats["patients"] > 0
-            else 0
-        )
+            self.stats["average_search_time"] = (
+                self.stats["search_time"] / (self.stats["patients"])
+                if self.stats["patients"] > 0
+                else 0
+            )
+            self.stats["average_investigation_time"] = (
+                self.stats["investigation_time"] / (self.stats["investigated"])
+                if self.stats["investigated"] > 0
+                else 0
+            )
+            self.stats["average_notifications_found"] = (
+                self.stats["notifications"] / (self.stats["patients"])
+                if self.stats["patients"] > 0
+                else 0
+            )
+            self.stats["average_patient_allocation_mb"] = (
+                self.stats["patient_allocation_mb"] / (self.stats["patients"])
+                if self.stats["patients"] > 0
+                else 0
+            )
+
+    def set_stat(self, key: str, value: Union[int, float]):
+        """Set (overwrite) a stat in the report
+
+        Args:
+            key (str): The key to set
+            value (Union[int, float]): The new value
+        """
+        with self.__lock:
+            self.stats[key] = value
 
     def __update_stats_df(self):
         """Update the stats dataframe"""
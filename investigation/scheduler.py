@@ -0,0 +1,176 @@
+import heapq
+import itertools
+from datetime import datetime
+from typing import Iterable, Iterator, Literal, Mapping, Optional, get_args
+
+from core.constants import (
+    DEFAULT_EXAM_COSTS,
+    SCHEDULING_URGENCY_DAYS,
+    SCHEDULING_WINDOW,
+)
+from investigation.patient import Patient
+
+SCHEDULING_POLICIES = Literal["ordem", "custo", "urgencia", "equilibrado"]
+"""Orders of the patients: as loaded, cheapest first, oldest first or urgency per cost"""
+
+
+class CostModel:
+    """Estimated time (seconds) of the exams from the history recorded in the ledger
+
+    The average time by exam type and number of results found is used when the number of
+    results is known (exams processed in a previous run without a settled outcome), otherwise
+    the average by exam type. Without history the defaults (`DEFAULT_EXAM_COSTS`) are used.
+    """
+
+    def __init__(
+        self,
+        timings: Mapping[tuple[str, int], tuple[float, int]],
+        known_results: Mapping[int, int],
+    ):
+        """Initialize the CostModel
+
+        Args:
+            timings (Mapping[tuple[str, int], tuple[float, int]]): The average seconds and the
+                number of exams recorded, by exam type and number of results (see `ExamLedger.average_timings`)
+            known_results (Mapping[int, int]): The number of results by exam key (see `ExamLedger.notification_counts`)
+        """
+        self.timings = timings
+        self.known_results = known_results
+        self.by_type: dict[str, float] = {}
+
+        totals: dict[str, tuple[float, int]] = {}
+        for (exam_type, _), (seconds, count) in timings.items():
+            total, exams = totals.get(exam_type, (0.0, 0))
+            totals[exam_type] = (total + seconds * count, exams + count)
+        for exam_type, (total, exams) in totals.items():
+            self.by_type[exam_type] = total / exams
+
+    def exam_cost(self, patient: Patient) -> float:
+        """Estimate the time of an exam
+
+        Args:
+            patient (Patient): The exam
+
+        Returns:
+            float: The estimated seconds
+        """
+        exam_type = patient.exam_type
+        results = (
+            None if patient.key is None else self.known_results.get(patient.key)
+        )
+        if results is not None and (exam_type, results) in self.timings:
+            return self.timings[(exam_type, results)][0]
+        if exam_type in self.by_type:
+            return self.by_type[exam_type]
+        return DEFAULT_EXAM_COSTS.get(exam_type, max(DEFAULT_EXAM_COSTS.values()))
+
+    def group_cost(self, group: list[Patient]) -> float:
+        """Estimate the time of the exams of a patient
+
+        Args:
+            group (list[Patient]): The exams of a patient
+
+        Returns:
+            float: The estimated seconds
+        """
+        return sum(self.exam_cost(patient) for patient in group)
+
+
+def _age_days(patient: Patient, now: datetime) -> float:
+    """Days since the collection (or the notification) of an exam, 0 if unknown"""
+    date: Optional[datetime] = patient.collection_date or patient.notification_date
+    if date is None:
+        return 0.0
+    return max(0.0, (now - date).total_seconds() / 86400)
+
+
+class Scheduler:
+    """Orders the patients (groups of exams) to close more investigations per hour
+
+    Policies (`desempenho.agendamento`):
+    - ordem: the order of the GAL data (nothing is reordered)
+    - custo: the cheapest patients first (eg. a single PCR/NS1 before an IgM with many episodes)
+    - urgencia: the oldest collections first
+    - equilibrado: the highest urgency per estimated second first, the priority of an exam
+        doubles every `SCHEDULING_URGENCY_DAYS` days of age
+
+    The patients are reordered in windows (`desempenho.janela_agendamento`), so the streamed
+    data is not held in memory and the processing starts before the whole data is read.
+    """
+
+    def __init__(
+        self,
+        cost_model: CostModel,
+        policy: SCHEDULING_POLICIES = "ordem",
+        window: int = SCHEDULING_WINDOW,
+    ):
+        """Initialize the Scheduler
+
+        Args:
+            cost_model (CostModel): The estimated time of the exams
+            policy (SCHEDULING_POLICIES, optional): The scheduling policy. Defaults to "ordem".
+            window (int, optional): Number of patients reordered at a time. Defaults to `SCHEDULING_WINDOW`.
+
+        Raises:
+            ValueError: When the policy is unknown
+        """
+        if policy not in get_args(SCHEDULING_POLICIES):
+            raise ValueError(
+                f"Política de agendamento inválida: {policy} "
+                f"(possíveis: {', '.join(get_args(SCHEDULING_POLICIES))})"
+            )
+
+        self.cost_model = cost_model
+        self.policy = policy
+        self.window = max(1, window)
+        self.scheduled = 0
+        self.estimated_seconds = 0.0
+
+    def __priority(self, group: list[Patient], now: datetime) -> float:
+        """Priority of a patient in the window (the lowest is processed first)"""
+        cost = self.cost_model.group_cost(group)
+        self.estimated_seconds += cost
+        if self.policy == "custo":
+            return cost
+
+        age = max(_age_days(patient, now) for patient in group)
+        if self.policy == "urgencia":
+            return -age
+        return -(1 + age / SCHEDULING_URGENCY_DAYS) / max(cost, 1.0)
+
+    def order(self, groups: Iterable[list[Patient]]) -> Iterator[list[Patient]]:
+        """Reorder the patients by the scheduling policy
+
+        Args:
+            groups (Iterable[list[Patient]]): The exams grouped by patient
+
+        Yields:
+            list[Patient]: The exams of each patient, in the scheduled order
+        """
+        if self.policy == "ordem":
+            yield from groups
+            return
+
+        groups = iter(groups)
+        while window := list(itertools.islice(groups, self.window)):
+            now = datetime.now()
+            # the position breaks the ties, keeping the original order
+            heap = [
+                (self.__priority(group, now), position, group)
+                for position, group in enumerate(window)
+            ]
+            heapq.heapify(heap)
+            while heap:
+                self.scheduled += 1
+                yield heapq.heappop(heap)[2]
+
+    def summary(self) -> str:
+        """Describe the scheduling done
+
+        Returns:
+            str: The summary
+        """
+        return (
+            f"Agendamento '{self.policy}': {self.scheduled} pacientes reordenados, "
+            f"tempo estimado {self.estimated_seconds / 3600:.1f} horas."
+        )
@@ -0,0 +1,160 @@
+import threading
+import time
+from typing import Callable, Hashable, NamedTuple, Optional
+
+from core.constants import SEARCH_CACHE_TTL
+from investigation.sheet import Sheet
+
+
+class CachedSearch(NamedTuple):
+    """The candidates (opened sheets) of a search and when they were stored"""
+
+    candidates: list[Sheet]
+    stored_at: float
+
+
+class SearchCache:
+    """Cache of the search results (candidates) by search key, with a time to live
+
+    The Sinan keeps the results page of a search in the server session, and a sheet can only be
+    opened from the last search of its session. So the results of a search are reused:
+    - by any session when nothing was found (no sheet to open);
+    - by the same session while the results page is still the one of that search.
+
+    Concurrent searches of the same key are made only once (single-flight): the other workers
+    wait and reuse the result when they can, otherwise they search in their own session.
+    The results with a notification investigated or deleted are dropped (`invalidate`), and so
+    are the searches without results of a patient reported as not found (`forget`).
+    """
+
+    def __init__(self, ttl: float = SEARCH_CACHE_TTL):
+        """Initialize the SearchCache
+
+        Args:
+            ttl (float, optional): Seconds a search result is kept. Defaults to `SEARCH_CACHE_TTL`.
+        """
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+        self.__entries: dict[tuple[Hashable, Optional[int]], CachedSearch] = {}
+        self.__in_flight: dict[Hashable, threading.Event] = {}
+        self.__pages: dict[int, Hashable] = {}  # last search of each session (owner)
+        self.__tags: dict[Hashable, set[Hashable]] = {}  # searches of each patient (tag)
+
+    def __reusable(self, key: Hashable, owner: object) -> Optional[list[Sheet]]:
+        """Get the cached candidates of a key if the owner can use them (called with the lock)"""
+        # a search without results is shared, the others are kept by session
+        for entry_key in ((key, None), (key, id(owner))):
+            entry = self.__entries.get(entry_key)
+            if entry is None:
+                continue
+            if time.monotonic() - entry.stored_at > self.ttl:
+                del self.__entries[entry_key]
+                continue
+            if not entry.candidates or self.__pages.get(id(owner)) == key:
+                return entry.candidates
+        return None
+
+    def search(
+        self,
+        key: Hashable,
+        owner: object,
+        search: Callable[[], Optional[list[Sheet]]],
+        tag: Optional[Hashable] = None,
+    ) -> Optional[list[Sheet]]:
+        """Get the candidates of a search from the cache or make the search
+
+        Args:
+            key (Hashable): The search key (agravo, criteria, operations, values and date window)
+            owner (object): The session making the search
+            search (Callable[[], Optional[list[Sheet]]]): Makes the search in the owner session
+            tag (Optional[Hashable], optional): The patient searched (eg. the exam key), see
+                `forget`. Defaults to None.
+
+        Returns:
+            Optional[list[Sheet]]: The candidates, None if the search was aborted
+        """
+        while True:
+            with self.__lock:
+                if tag is not None:
+                    self.__tags.setdefault(tag, set()).add(key)
+                candidates = self.__reusable(key, owner)
+                if candidates is not None:
+                    self.hits += 1
+                    return candidates
+
+                flight = self.__in_flight.get(key)
+                if flight is None:
+                    flight = self.__in_flight[key] = threading.Event()
+                    self.misses += 1
+                    break
+
+            # another session is making the same search
+            flight.wait()
+
+        candidates = None
+        try:
+            candidates = search()
+            return candidates
+        finally:
+            with self.__lock:
+                del self.__in_flight[key]
+                if candidates is None:
+                    # failed midway, the results page of the session is unknown
+                    self.__pages.pop(id(owner), None)
+                else:
+                    self.__pages[id(owner)] = key
+                    self.__prune()
+                    entry_key = (key, id(owner) if candidates else None)
+                    self.__entries[entry_key] = CachedSearch(candidates, time.monotonic())
+            flight.set()
+
+    def __prune(self):
+        """Drop the expired results (called with the lock)"""
+        now = time.monotonic()
+        for key, entry in list(self.__entries.items()):
+            if now - entry.stored_at > self.ttl:
+                del self.__entries[key]
+
+    def moved(self, owner: object):
+        """Tell that the results page of a session was replaced or lost (eg. a new login)
+
+        Args:
+            owner (object): The session
+        """
+        with self.__lock:
+            self.__pages.pop(id(owner), None)
+
+    def forget(self, tag: Hashable):
+        """Drop the searches without results of a patient (eg. reported as not found), so a
+        notification entered in the meantime is found by the next search
+
+        Args:
+            tag (Hashable): The patient (see `search`)
+        """
+        with self.__lock:
+            for key in self.__tags.pop(tag, ()):
+                self.__entries.pop((key, None), None)
+
+    def invalidate(self, notification_number: str):
+        """Drop the results with a notification (eg. investigated or deleted)
+
+        Args:
+            notification_number (str): The Sinan notification number
+        """
+        with self.__lock:
+            for key, entry in list(self.__entries.items()):
+                if any(
+                    sheet.notification_number == notification_number
+                    for sheet in entry.candidates
+                ):
+                    del self.__entries[key]
+
+    def summary(self) -> str:
+        """Describe the use of the cache
+
+        Returns:
+            str: The summary
+        """
+        return f"Cache de pesquisas: {self.hits} pesquisas reaproveitadas, {self.misses} feitas no Sinan."
@@ -1,9 +1,9 @@
-import re
 import time
+from copy import copy
+from functools import partial
 from datetime import datetime, timedelta
-from typing import Literal, Mapping
+from typing import Callable, Literal, Mapping, Optional
 
-from bs4 import BeautifulSoup
 from requests import Response, Session
 
 from core.constants import (
@@ -17,7 +17,16 @@ from core.constants import (
     TODAY,
     TODAY_FORMATTED,
 )
-from core.utils import Printter, get_form_data, valid_tag
+from core.journal import Journal
+from core.session import ViewExpired, ViewStateNotFound
+from core.snapshots import NotificationSnapshots
+from core.utils import Printter, canonical_name_key
+from investigation.parser import (
+    ParseExecutor,
+    parse_errors,
+    parse_investigation_page,
+    parse_notification_page,
+)
 from investigation.patient import Patient
 from investigation.report import Report
 
@@ -25,18 +34,94 @@ POSSIBLE_POSITIONS = Literal["results", "notification", "investigation"]
 
 display = Printter("FICHA")
 
+_EXAM_FORM_FIELDS: Mapping[POSSIBLE_EXAM_TYPES, tuple[str, str, str]] = {
+    "PCR": (
+        "form:dengue_dataColetaRTPCRInputDate",
+        "form:dengue_resultadoRTPCR",
+        "form:j_id572",
+    ),
+    "IgM": (
+        "form:dengue_dataColetaExameSorologicoInputDate",
+        "form:dengue_resultadoExameSorologico",
+        "form:j_id530",
+    ),
+    "NS1": (
+        "form:dengue_dataColetaNS1InputDate",
+        "form:dengue_resultadoNS1",
+        "form:j_id542",
+    ),
+}
+"""Investigation form fields of each exam type: collection date, result and the event that submits them"""
+
+
+def _selected_sorotype(patient: Patient) -> Optional[str]:
+    """Get the sorotype filled for a positive PCR exam (the highest one)
+
+    Args:
+        patient (Patient): The exam
+
+    Returns:
+        Optional[str]: The sorotype (eg. "DENV2") or None if not filled
+    """
+    if patient.exam_type != "PCR" or patient.sinan_result_id != "1":
+        return None
+    return max(patient.sorotypes, key=lambda s: int(s.removeprefix("DENV")))
+
+
+def planned_exam_fields(patient: Patient) -> dict[str, str]:
+    """Get the investigation form fields an exam will fill (used to describe the plan)
+
+    Args:
+        patient (Patient): The exam
+
+    Returns:
+        dict[str, str]: Form field name -> value
+    """
+    fields = _EXAM_FORM_FIELDS.get(patient.exam_type)
+    if not fields:
+        return {}
+
+    date_key, result_key, _ = fields
+    planned = {
+        date_key: patient.f_collection_date,
+        result_key: patient.sinan_result_id,
+    }
+    if patient.sorotypes and (sorotype := _selected_sorotype(patient)):
+        planned["form:dengue_sorotipo"] = sorotype.removeprefix("DENV")
+    return planned
+
+
+def _result_notification_number(
+    search_result_data: Mapping[str, str]
+) -> Optional[str]:
+    """Get the notification number of a row of the search results (eg. "Nº Notificação")
+
+    Args:
+        search_result_data (Mapping[str, str]): The row (column name -> cell text)
+
+    Returns:
+        Optional[str]: The notification number or None if the column was not found
+    """
+    for column, value in search_result_data.items():
+        name = column.lower()
+        if name.startswith("n") and "notif" in name and value:
+            return value
+    return None
+
 
 class Properties:
     """Properties of the sheet"""
 
-    notification_soup: BeautifulSoup
+    notification_page: dict
     notification_form_data: dict
-    investigation_soup: BeautifulSoup
+    notification_loaded: bool = False  # the notification facts were read (opened or snapshot)
+    investigation_page: dict
     investigation_form_data: dict
     reporter: Report
     patient: Patient
     municipality: POSSIBLE_MUNICIPALITIES
     search_result_data: dict
+    __mother_key: Optional[str] = None
 
     @property
     def first_symptoms_date(self) -> datetime:
@@ -65,31 +150,27 @@ class Properties:
         Returns:
             bool: True if the investigation tab is enabled, False otherwise
         """
-        investigation_tab = valid_tag(
-            self.notification_soup.find(attrs={"id": "form:tabInvestigacao_lbl"})
-        )
+        is_enabled = self.notification_page["investigation_tab_enabled"]
 
-        if not investigation_tab:
+        if is_enabled is None:
             display("Erro: Aba de investigação não foi encontrada.", category="erro")
             raise FileNotFoundError
 
-        return "rich-tab-disabled" not in (investigation_tab.get("class") or [])
+        return is_enabled
 
     @property
     def javax_view_state(self) -> str:
-        """Get the `javax.faces.ViewState` from the `notification_soup`
+        """Get the `javax.faces.ViewState` from the `notification_page`
 
         Returns:
             str: The value of `javax.faces.ViewState`
         """
-        tag = valid_tag(
-            self.notification_soup.find(attrs={"name": "javax.faces.ViewState"})
-        )
+        view_state = self.notification_page["view_state"]
 
-        if not tag:
-            raise FileNotFoundError("Não foi possível obter o token de visualização.")
+        if view_state is None:
+            raise ViewStateNotFound("Não foi possível obter o token de visualização.")
 
-        return str(tag.get("value"))
+        return view_state
 
     @property
     def dengue_classification(self) -> str:
@@ -245,6 +326,17 @@ class Properties:
         """
         return self.notification_form_data["form:notificacao_nome_mae"]
 
+    @property
+    def mother_key(self) -> str:
+        """Get the canonical key of the mother's name (to compare with the GAL one)
+
+        Returns:
+            str: The mother's name key
+        """
+        if self.__mother_key is None:
+            self.__mother_key = canonical_name_key(self.mother_name)
+        return self.__mother_key
+
     @property
     def is_oportunity(self) -> bool:
         """Check if the patient is an opportunity to be investigated
@@ -252,9 +344,9 @@ class Properties:
         Returns:
             bool: True if the patient is an opportunity, False otherwise
         """
-        if "notification" not in self.positions_history:
+        if not self.notification_loaded:
             display(
-                "Para verificar se o paciente é oportuno, é preciso ter passado pela aba de notificação ao menos uma vez.",
+                "Para verificar se o paciente é oportuno, é preciso ter carregado a ficha de notificação.",
                 category="erro",
             )
             return False
@@ -319,16 +411,14 @@ class Properties:
         Returns:
             bool: True if the save button exists, False otherwise
         """
-        if "notification" not in self.positions_history:
+        if not self.notification_loaded:
             display(
-                "Para verificar se a ficha foi encerrada pelo município, é preciso ter passado pela aba de notificação ao menos uma vez.",
+                "Para verificar se a ficha foi encerrada pelo município, é preciso ter carregado a ficha de notificação.",
                 category="erro",
             )
             return False
 
-        save_button_tag = self.notification_soup.find("input", {"id": "form:btnSalvar"})
-
-        return valid_tag(save_button_tag) is not None
+        return self.notification_page["save_button_exists"]
 
     @property
     def is_return_flow(self) -> bool:
@@ -337,25 +427,22 @@ class Properties:
         Returns:
             bool: True if the patient was notified by this municipality but resides outside, False otherwise
         """
-        if "notification" not in self.positions_history:
+        if not self.notification_loaded:
             display(
-                "Para verificar se a ficha foi encerrada pelo município, é preciso ter passado pela aba de notificação ao menos uma vez.",
+                "Para verificar se a ficha foi encerrada pelo município, é preciso ter carregado a ficha de notificação.",
                 category="erro",
             )
             return False
 
-        checkbox_tag = valid_tag(
-            self.notification_soup.find("input", {"id": "form:habilitaAntesPrazo"})
-        )
+        is_checked = self.notification_page["residence_checkbox_checked"]
 
-        if not checkbox_tag:
+        if is_checked is None:
             self.reporter.error(
                 "Ao tentar verificar se a ficha é fluxo de retorno, pois o bot não encontrou a caixinha de 'Habilitar para Local de Residência'",
                 "Resultado foi definido como Falso.",
             )
             return False
 
-        is_checked = checkbox_tag.get("checked") == "checked"
         is_municipality_resident = self.municipality_of_residence == self.municipality
         return (
             is_checked and not self.save_button_exists and not is_municipality_resident
@@ -368,25 +455,22 @@ class Properties:
         Returns:
             bool: True if the patient is a resident but notified by another municipality, False otherwise
         """
-        if "notification" not in self.positions_history:
+        if not self.notification_loaded:
             display(
-                "Para verificar se a ficha foi encerrada pelo município, é preciso ter passado pela aba de notificação ao menos uma vez.",
+                "Para verificar se a ficha foi encerrada pelo município, é preciso ter carregado a ficha de notificação.",
                 category="erro",
             )
             return False
 
-        checkbox_tag = valid_tag(
-            self.notification_soup.find("input", {"id": "form:habilitaAntesPrazo"})
-        )
+        is_checked = self.notification_page["residence_checkbox_checked"]
 
-        if not checkbox_tag:
+        if is_checked is None:
             self.reporter.error(
                 "Ao tentar verificar se a ficha foi encerrada por outro município o bot não encontrou a caixinha de 'Habilitar para Local de Residência'",
                 "Resultado foi definido como Falso.",
             )
             return False
 
-        is_checked = checkbox_tag.get("checked") == "checked"
         is_municipality_resident = self.municipality_of_residence == self.municipality
 
         return (
@@ -400,25 +484,22 @@ class Properties:
         Returns:
             bool: True if this is an extra test case, False otherwise
         """
-        if "notification" not in self.positions_history:
+        if not self.notification_loaded:
             display(
-                "Para verificar se a ficha foi encerrada pelo município, é preciso ter passado pela aba de notificação ao menos uma vez.",
+                "Para verificar se a ficha foi encerrada pelo município, é preciso ter carregado a ficha de notificação.",
                 category="erro",
             )
             return False
 
-        checkbox_tag = valid_tag(
-            self.notification_soup.find("input", {"id": "form:habilitaAntesPrazo"})
-        )
+        is_checked = self.notification_page["residence_checkbox_checked"]
 
-        if not checkbox_tag:
+        if is_checked is None:
             self.reporter.error(
                 "Ao tentar verificar caso de teste extra, o bot não encontrou a caixinha de 'Habilitar para Local de Residência'",
                 "Resultado foi definido como Falso.",
             )
             return False
 
-        is_checked = checkbox_tag.get("checked") == "checked"
         is_municipality_resident = self.municipality_of_residence == self.municipality
         return is_checked and not self.save_button_exists and is_municipality_resident
 
@@ -455,6 +536,11 @@ class Sheet(Properties):
         search_result_data: dict,
         open_payload: dict,
         reporter: Report,
+        parser: ParseExecutor,
+        journal: Optional[Journal] = None,
+        locate: Optional[Callable[[str, Patient], Optional["Sheet"]]] = None,
+        on_change: Optional[Callable[[str], None]] = None,
+        snapshots: Optional[NotificationSnapshots] = None,
     ):
         """Initialize the Sheet
 
@@ -465,8 +551,25 @@ class Sheet(Properties):
             search_result_data (dict): The search result data
             open_payload (dict): The payload to open the notification sheet
             reporter (Report): The report object
+            parser (ParseExecutor): The executor used to parse the server responses
+            journal (Optional[Journal], optional): Journal of the saves and deletions done (they are
+                not submitted again when resuming). Defaults to None.
+            locate (Optional[Callable[[str, Patient], Optional[Sheet]]], optional): Finds the
+                notification again by its number, used to recover from an expired view state
+                (see `NotificationResearcher.locate`). Defaults to None.
+            on_change (Optional[Callable[[str], None]], optional): Called with the notification
+                number after a save or deletion is tried (eg. `SearchCache.invalidate`). Defaults to None.
+            snapshots (Optional[NotificationSnapshots], optional): Store of the notification pages,
+                a valid snapshot is used instead of opening the notification. Defaults to None.
         """
         self.session = session
+        self.parser = parser
+        self.journal = journal
+        self.locate = locate
+        self.on_change = on_change
+        # the search this sheet was found by (see `SinanSession.results_page`)
+        self.results_page = getattr(session, "results_page", None)
+        self.snapshots = snapshots
         self.municipality = municipality
         self.patient = patient
         self.search_result_data = search_result_data
@@ -480,8 +583,53 @@ class Sheet(Properties):
         self.has_previous_investigation = None
         self._positions_history: list[POSSIBLE_POSITIONS] = ["results"]
 
-        self.__open_notification_sheet()
-        self.return_to_results_page()
+        # the writes open the notification again, so the read-only facts can come from a snapshot
+        if not self.__load_snapshot():
+            self.__open_notification_sheet()
+            self.return_to_results_page()
+            if self.snapshots:
+                self.snapshots.put(
+                    self.notification_number,
+                    self.notification_page,
+                    self.notification_form_data,
+                )
+
+    def __load_snapshot(self) -> bool:
+        """Load the notification page from a valid snapshot (the position stays in the results)
+
+        Returns:
+            bool: True if the snapshot was loaded, False otherwise
+        """
+        number = _result_notification_number(self.search_result_data)
+        if self.snapshots is None or number is None:
+            return False
+
+        snapshot = self.snapshots.get(number)
+        if snapshot is None or snapshot.form_data.get("form:nuNotificacao") != number:
+            return False
+
+        self.notification_page = snapshot.page
+        self.notification_form_data = snapshot.form_data
+        self.notification_loaded = True
+        return True
+
+    def for_patient(self, patient: Patient) -> "Sheet":
+        """Get a copy of this sheet (not yet investigated) for another exam of the same patient
+
+        The notification already loaded is reused, so no request is made.
+
+        Args:
+            patient (Patient): The other exam of the patient
+
+        Returns:
+            Sheet: The sheet for the exam
+        """
+        sheet = copy(self)
+        sheet.patient = patient
+        sheet.notification_page = dict(self.notification_page)
+        sheet.notification_form_data = dict(self.notification_form_data)
+        sheet._positions_history = list(self._positions_history)
+        return sheet
 
     def __open_notification_sheet(self):
         """Open the notification sheet using the `open_payload`"""
@@ -493,13 +641,13 @@ class Sheet(Properties):
             return
 
         res = self.session.post(self.open_notification_endpoint, self.open_payload)
-        self.notification_soup = BeautifulSoup(res.content, "html.parser")
+        self.notification_page = self.parser.run(parse_notification_page, res.content)
         self.position = "notification"
 
         self.__loads_notification_form_data()
 
     def __loads_notification_form_data(self):
-        """Given the `notification_soup` loads the notification form data as a dict"""
+        """Given the `notification_page` loads the notification form data as a dict"""
         if "notification" not in self.positions_history:
             display(
                 "Para carregar o formulário de notificação se faz necessário ter passado pela aba de notificação ao menos uma vez.",
@@ -507,50 +655,42 @@ class Sheet(Properties):
             )
             return
 
-        self.notification_form_data = get_form_data(self.notification_soup)
+        # the page is kept intact (it may be stored or shared), the copy shares the values
+        self.notification_form_data = dict(self.notification_page["form_data"])
         self.notification_form_data.update(
             {"javax.faces.ViewState": self.javax_view_state}
         )
+        self.notification_loaded = True
 
     def __loads_investigation_form_data(self):
-        """Given the `investigation_soup` loads the investigation form data as a dict"""
+        """Given the `investigation_page` loads the investigation form data as a dict"""
         if "investigation" not in self.positions_history:
             display(
                 "Para carregar o formulário de investigação se faz necessário ter passado pela aba de investigação ao menos uma vez.",
                 category="erro",
             )
             return
-        self.investigation_form_data = get_form_data(self.investigation_soup)
+        form_data = self.investigation_page["form_data"]
+        if form_data is None:
+            raise FileNotFoundError("Formulário de investigação não encontrado.")
+
+        self.investigation_form_data = dict(form_data)
         self.investigation_form_data.update(
             {"javax.faces.ViewState": self.javax_view_state}
         )
 
     def __click_popup_ok(self, depth: int):
         """ "Click" in "Ok" button if modal appears in the response"""
-        soup = self.investigation_soup
-
-        show_modal_script = next(
-            (
-                s
-                for s in soup.find_all("script")
-                if s.text.strip().endswith(".component.show();")
-            ),
-            None,
-        )
+        modal = self.investigation_page["modal"]
 
-        if not show_modal_script:
+        if modal.get("error") == "script":
             self.reporter.error(
                 "Código que mostra o popUp não foi encontrado na resposta do servidor. Provável mudança no site.",
                 "Paciente não pôde ser investigado.",
             )
             raise FileNotFoundError("Script pra mostrar o popUp não encontrado.")
 
-        show_modal_text = "".join(show_modal_script.text.split("\n")).strip()
-
-        modal_id_match = re.search(
-            r"getElementById\(['\"]([^'\"]+)['\"]\)", show_modal_text
-        )
-        if not modal_id_match:
+        if modal.get("error") == "id":
             self.reporter.error(
                 "ID do popUp não encontrado na resposta do servidor.",
                 "Paciente não pôde ser investigado.",
@@ -559,31 +699,21 @@ class Sheet(Properties):
                 "ID do popUp não encontrado na resposta do servidor."
             )
 
-        modal_id = modal_id_match.group(1)
-        modal_text = soup.find("div", {"id": modal_id}).get_text(strip=True)  # type: ignore
-
-        self.reporter.info(f"Texto do popUp {depth}: {modal_text}")
-
-        payload_modal_ok = get_form_data(
-            soup, "div", {"id": modal_id}, not_include_starts_with="--"
-        )
-        payload_modal_ok = {
-            k: v for k, v in payload_modal_ok.items() if "ok" in v.lower()
-        }
+        self.reporter.info(f"Texto do popUp {depth}: {modal['text']}")
 
         display("Clicando em 'Ok' para continuar.", category="investigação")
         res = self.session.post(
             self.master_endpoint,
-            data={**self.notification_form_data, **payload_modal_ok},
+            data={**self.notification_form_data, **modal["ok_payload"]},
         )
 
-        self.investigation_soup = BeautifulSoup(res.content, "html.parser")
+        self.investigation_page = self.parser.run(parse_investigation_page, res.content)
         display("Ok!", category="investigação")
 
         self.__verify_investigation_sheet(depth + 1)
 
     def __verify_investigation_sheet(self, depth: int = 1, retry: bool = True) -> bool:
-        """Verify if the `investigation_soup` is really the investigation page or a different page
+        """Verify if the `investigation_page` is really the investigation page or a different page
 
         Args:
             depth (int, optional): The depth of the verification. Defaults to 1.
@@ -592,17 +722,15 @@ class Sheet(Properties):
         Returns:
             bool: True if the investigation sheet is verified, False otherwise
         """
-        first_investigation_input = valid_tag(
-            self.investigation_soup.find(attrs={"id": "form:dtInvestigacaoInputDate"})
-        )
+        is_investigation = self.investigation_page["is_investigation"]
 
-        if not first_investigation_input:
+        if not is_investigation:
             if retry:
                 self.__click_popup_ok(depth)
         else:
             self.position = "investigation"
 
-        return first_investigation_input is not None
+        return is_investigation
 
     def __update_notification_form_data_javascript_rendering(self):
         """Update the `notification_form_data` to be equal to the form data rendered in javascript on page load"""
@@ -639,7 +767,7 @@ class Sheet(Properties):
             {**self.notification_form_data, "form:botaoSalvar": "Salvar"},
         )
 
-        self.investigation_soup = BeautifulSoup(res.content, "html.parser")
+        self.investigation_page = self.parser.run(parse_investigation_page, res.content)
 
         self.__verify_investigation_sheet()
 
@@ -656,7 +784,7 @@ class Sheet(Properties):
             },
         )
 
-        self.investigation_soup = BeautifulSoup(res.content, "html.parser")
+        self.investigation_page = self.parser.run(parse_investigation_page, res.content)
 
         result = self.__verify_investigation_sheet(retry=False)
         if not result:
@@ -705,10 +833,7 @@ class Sheet(Properties):
         Returns:
             list[str]: The list of error messages
         """
-        soup = BeautifulSoup(response.content, "html.parser")
-        error_tags = soup.find_all("li", {"class": "error"})
-
-        return [error.get_text() for error in error_tags if error.get_text()]
+        return self.parser.run(parse_errors, response.content)
 
     def __save_investigation(self) -> bool:
         """Save the investigation filled form
@@ -749,39 +874,39 @@ class Sheet(Properties):
 
         return bool(errors)
 
-    def __fill_exam_result(self):
+    def __fill_exam_result(self, patient: Patient):
         """Fill the exam result on sinan investigation form
 
         Possible Inputs that can be filled:
             39, 41, 45 - Data da Coleta,
             40, 42, 46 - Resultado,
             47 - Sorotipo
+
+        Args:
+            patient (Patient): The exam to fill
         """
+        self.reporter.set_patient(patient)
 
-        if self.patient.exam_type == "PCR":
-            sinan_collection_date_key = "form:dengue_dataColetaRTPCRInputDate"
-            sinan_collection_result_key = "form:dengue_resultadoRTPCR"
+        fields = _EXAM_FORM_FIELDS.get(patient.exam_type)
+        if fields:
+            sinan_collection_date_key, sinan_collection_result_key, event = fields
             self.investigation_form_data.update(
                 {
-                    sinan_collection_date_key: self.patient.f_collection_date,
-                    sinan_collection_result_key: self.patient.sinan_result_id,
+                    sinan_collection_date_key: patient.f_collection_date,
+                    sinan_collection_result_key: patient.sinan_result_id,
                 }
             )
-
             res = self.session.post(
                 self.master_endpoint,
-                data={**self.investigation_form_data, "form:j_id572": "form:j_id572"},
+                data={**self.investigation_form_data, event: event},
             )
             self.__log_errors(res, "preencher resultado do exame")
 
-            if self.patient.sinan_result_id == "1":
-                sotorype_dengue = max(
-                    self.patient.sorotypes, key=lambda s: int(s.removeprefix("DENV"))
-                )
-
-                if len(self.patient.sorotypes) > 1:
+            sotorype_dengue = _selected_sorotype(patient)
+            if sotorype_dengue:
+                if len(patient.sorotypes) > 1:
                     self.reporter.warn(
-                        f"Dos {len(self.patient.sorotypes)} sorotipos ({self.patient.sorotypes}), foi selecionado o sorotipo {sotorype_dengue}.",
+                        f"Dos {len(patient.sorotypes)} sorotipos ({patient.sorotypes}), foi selecionado o sorotipo {sotorype_dengue}.",
                     )
 
                 self.investigation_form_data.update(
@@ -799,40 +924,8 @@ class Sheet(Properties):
                 )
                 self.__log_errors(res, "preencher sorotipo")
 
-        elif self.patient.exam_type == "IgM":
-            sinan_collection_date_key = "form:dengue_dataColetaExameSorologicoInputDate"
-            sinan_collection_result_key = "form:dengue_resultadoExameSorologico"
-
-            self.investigation_form_data.update(
-                {
-                    sinan_collection_date_key: self.patient.f_collection_date,
-                    sinan_collection_result_key: self.patient.sinan_result_id,
-                }
-            )
-            res = self.session.post(
-                self.master_endpoint,
-                data={**self.investigation_form_data, "form:j_id530": "form:j_id530"},
-            )
-            self.__log_errors(res, "preencher resultado do exame")
-
-        elif self.patient.exam_type == "NS1":
-            sinan_collection_date_key = "form:dengue_dataColetaNS1InputDate"
-            sinan_collection_result_key = "form:dengue_resultadoNS1"
-
-            self.investigation_form_data.update(
-                {
-                    sinan_collection_date_key: self.patient.f_collection_date,
-                    sinan_collection_result_key: self.patient.sinan_result_id,
-                }
-            )
-            res = self.session.post(
-                self.master_endpoint,
-                data={**self.investigation_form_data, "form:j_id542": "form:j_id542"},
-            )
-            self.__log_errors(res, "preencher resultado do exame")
-
         display(
-            f"Definindo resultado para exame tipo {self.patient.exam_type} com data de coleta {self.patient.f_collection_date}.",
+            f"Definindo resultado para exame tipo {patient.exam_type} com data de coleta {patient.f_collection_date}.",
             category="preenchimento",
         )
 
@@ -949,14 +1042,123 @@ class Sheet(Properties):
             }
         )
 
-    def investigate_patient(self):
-        """Open the investigation sheet page and fill the investigation form with the classification and the patient data"""
+    def __latest_exams(self, patients: list[Patient]) -> list[Patient]:
+        """Get the most recent exam (collection date) of each exam type, the form has one result per type
+
+        Args:
+            patients (list[Patient]): The exams of the notification
+
+        Returns:
+            list[Patient]: The exams to be filled
+        """
+        latest: dict[POSSIBLE_EXAM_TYPES, Patient] = {}
+        for patient in sorted(patients, key=lambda p: p.collection_date):
+            if patient.exam_type in latest:
+                self.reporter.set_patient(latest[patient.exam_type])
+                self.reporter.debug(
+                    f"Exame {patient.exam_type} mais recente ({patient.f_collection_date}) será preenchido no lugar deste na mesma investigação."
+                )
+            latest[patient.exam_type] = patient
+        return list(latest.values())
+
+    def __relocate(self) -> bool:
+        """Locate the notification again, going back to the results page of the new search
+
+        Returns:
+            bool: False if the notification was not found again
+        """
+        located = self.locate(self.notification_number, self.patient)
+        if located is None:
+            return False
+
+        self.open_payload = located.open_payload
+        self.results_page = located.results_page
+        self.position = "results"
+        return True
+
+    def __recovering(self, action: Callable[[], bool]) -> bool:
+        """Run an action on the sheet, recovering (once) from an expired view state or session
+
+        The patient context is kept: the notification is located again by its number, the sheet
+        goes back to the results page of the new search and the action restarts from there,
+        passing through the same positions (notification -> investigation) as before. The same is
+        done beforehand when another search replaced the results page of the session (eg. other
+        exams searched in between), since the sheet can only be opened from its own search.
+
+        Args:
+            action (Callable[[], bool]): The action (eg. fill and save the investigation)
+
+        Returns:
+            bool: The result of the action, False if the notification was not found again
+        """
+        if (
+            self.locate is not None
+            and self.position == "results"
+            and getattr(self.session, "results_page", None) != self.results_page
+            and not self.__relocate()
+        ):
+            return False
+
+        try:
+            return action()
+        except ViewExpired as error:
+            if self.locate is None:
+                raise
+
+            self.reporter.set_patient(self.patient)
+            self.reporter.warn(
+                "Estado de visualização expirado. A notificação será localizada novamente para continuar.",
+                f"{type(error).__name__} | Posição: {self.position} | Nº da Notificação: {self.notification_number}",
+            )
+            if not self.__relocate():
+                return False
+            return action()
+
+    def __changed(self):
+        """Drop the cached data of the notification after a save or deletion was tried"""
+        if self.snapshots:
+            self.snapshots.invalidate(self.notification_number)
+        if self.on_change:
+            self.on_change(self.notification_number)
+
+    def investigate_patient(self, patients: Optional[list[Patient]] = None) -> bool:
+        """Open the investigation sheet page and fill the investigation form with the classification and the patient data
+
+        Every exam of the notification is filled in the same visit (one open, fill and save), so
+        the classification is based on the combined results.
+
+        Args:
+            patients (Optional[list[Patient]], optional): The exams of this notification. Defaults to the sheet patient.
+
+        Returns:
+            bool: True if the investigation was saved without errors, False otherwise
+        """
+        try:
+            return self.__recovering(partial(self.__investigate, patients))
+        finally:
+            self.__changed()
+
+    def __investigate(self, patients: Optional[list[Patient]]) -> bool:
+        """Fill and save the investigation (see `investigate_patient`)"""
         start_time = time.time()
+        patients = patients or [self.patient]
+        keys = [patient.key for patient in patients]
+        if self.journal and self.journal.has_done(
+            "investigated", keys, self.notification_number
+        ):
+            self.reporter.set_patient(self.patient)
+            self.reporter.info(
+                "Investigação já salva antes da interrupção da execução anterior. Ignorada.",
+                f"Nº da Notificação: {self.notification_number}",
+            )
+            return True
+
+        patients = self.__latest_exams(patients)
         self.__open_investigation_sheet()
 
         form_builders = [
             self.__fill_investigation_date,
-            self.__fill_exam_result,
+            *(partial(self.__fill_exam_result, patient) for patient in patients),
             self.__fill_classification,
             self.__fill_criteria,
             self.__fill_closing_date,
@@ -974,11 +1176,37 @@ class Sheet(Properties):
         if not has_errors:
             display("Ok!", category="investigação")
             self.reporter.increment_stat("investigated")
+            self.reporter.increment_stat("merged_exams", len(patients) - 1)
+            if self.journal:
+                for key in keys:
+                    self.journal.append(key, "investigated", self.notification_number)
 
         self.reporter.increment_stat("investigation_time", elapsed_time)
+        return not has_errors
+
+    def delete(self) -> bool:
+        """Delete the notification sheet
+
+        Returns:
+            bool: True if the notification was deleted, False otherwise
+        """
+        try:
+            return self.__recovering(self.__delete)
+        finally:
+            self.__changed()
+
+    def __delete(self) -> bool:
+        """Delete the notification sheet (see `delete`)"""
+        if self.journal and self.journal.notification_has_done(
+            "deleted", self.notification_number
+        ):
+            self.reporter.set_patient(self.patient)
+            self.reporter.info(
+                "Notificação já excluída antes da interrupção da execução anterior. Ignorada.",
+                f"Nº da Notificação: {self.notification_number}",
+            )
+            return True
 
-    def delete(self):
-        """Delete the notification sheet"""
         self.__open_notification_sheet()
 
         res = self.session.post(
@@ -996,6 +1224,12 @@ class Sheet(Properties):
                 "Notificação excluída.",
                 f"Notificação excluída: {self.notification_number}",
             )
+            if self.journal:
+                self.journal.append(
+                    self.patient.key, "deleted", self.notification_number
+                )
+
+        return not had_error
 
     def return_to_results_page(self):
         """Reset the javax.viewState returning to the results page allowing to open other sheets"""
@@ -1,19 +1,101 @@
 # sinan.py
+import threading
+import time
+from collections import Counter
+from functools import partial
+from pathlib import Path
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Union,
+)
+
 import requests
 from bs4 import BeautifulSoup
 
 from core.abstract import Bot
-from core.constants import SINAN_BASE_URL, USER_AGENT
-from core.utils import Printter, valid_tag
-from investigation.data_loader import SinanGalData
-from investigation.investigator import DuplicateChecker
+from core.constants import (
+    EXAMS_AGRAVO_MAP,
+    PATIENT_TIME_BUDGET,
+    POSSIBLE_AGRAVOS,
+    POSSIBLE_MUNICIPALITIES,
+    REQUEST_TIMEOUT,
+    SCHEDULING_WINDOW,
+    SEARCH_CACHE_TTL,
+    SNAPSHOT_MAX_AGE,
+    SINAN_BASE_URL,
+    USER_AGENT,
+)
+from core.journal import Journal
+from core.ledger import ExamLedger
+from core.memory import MemoryTracker, peak_rss_mb
+from core.pipeline import Pipeline
+from core.retry import (
+    FAILURE_CLASSES_TRANSLATED,
+    RETRY_STRATEGIES,
+    RETRYABLE_ERRORS,
+    RetryQueue,
+    RetryStrategy,
+    classify_failure,
+)
+from core.session import SinanSession
+from core.snapshots import NotificationSnapshots
+from core.utils import Printter, canonical_name_key, valid_tag
+from investigation.data_loader import SinanGalData, group_patients
+from investigation.investigator import DuplicateChecker, ExamTask, SheetAction
+from investigation.notification_index import NotificationIndex
 from investigation.notification_researcher import NotificationResearcher
+from investigation.parser import ParseExecutor
 from investigation.patient import Patient
+from investigation.plan import PlannedTask, PlanWriter, read_plan
 from investigation.report import Report
+from investigation.scheduler import CostModel, Scheduler
+from investigation.search_cache import SearchCache
+from investigation.sheet import Sheet
 
 display = Printter("SINAN")
 
 
+class Profile(NamedTuple):
+    """An agravo and municipality investigated in the run (`perfis` in the settings)
+
+    The exams go to the profile of their agravo and, when the agravo has profiles in several
+    municipalities, of the municipality of residence of the patient (`GAL_MUNICIPALITY_COLUMN`).
+    """
+
+    agravo: POSSIBLE_AGRAVOS
+    municipality: POSSIBLE_MUNICIPALITIES
+
+
+class Lane(NamedTuple):
+    """A logged Sinan session and the apps bound to it
+
+    The Sinan results page is kept by the server in the session, so a patient group uses the
+    same lane from its search until its last write.
+    """
+
+    session: SinanSession
+    researcher: NotificationResearcher
+    duplicate_checker: DuplicateChecker
+    profile: Profile
+
+
+class Work(NamedTuple):
+    """A patient group going through the search, decision and write stages"""
+
+    lane: Lane
+    group: list[Patient]
+    results: list[tuple[Patient, list[Sheet]]]
+    without_results: list[Patient]
+    tasks: Sequence[ExamTask] = ()
+    expired: bool = False  # failed and postponed (see `__postpone`)
+    elapsed: float = 0.0  # seconds spent in the stages (the waits in the queues don't count)
+
+
 class InvestigationBot(Bot):
     """Sinan client that will be used to interact with the Sinan Website doing things like:
     - Login
@@ -21,56 +103,264 @@ class InvestigationBot(Bot):
     - Verifying submitted forms
     """
 
-    def __init__(self, settings: dict) -> None:
+    def __init__(
+        self,
+        settings: dict,
+        resume: bool = False,
+        dry_run: bool = False,
+        plan_path: Optional[Path] = None,
+    ) -> None:
         self._username = settings["sinan_credentials"]["username"]
         self._password = settings["sinan_credentials"]["password"]
         self._settings = settings
+        # a dry-run doesn't change the Sinan, so there is nothing to resume
+        self._resume = resume and not dry_run
+        self._dry_run = dry_run
+        self._plan_path = plan_path
         self.reporter = Report()
+        self.memory = MemoryTracker()
         # self.reporter._example()  # Just for testing purposes
 
         self._init_apps()
 
     def __create_data_manager(self):
-        """Load data from SINAN and GAL datasets"""
-        self.data = SinanGalData(self._settings, self.reporter)
-        self.data.load()
-        self.reporter.generate_reports_filename(self.data.df)
+        """Load data from SINAN and GAL datasets (in streaming mode only the datasets are selected here)"""
+        if self._plan_path:
+            # the exams of a reviewed plan are in the plan itself
+            self.reporter.generate_plan_reports_filename(self._plan_path)
+            return
 
-    def __create_session(self):
+        self.data = SinanGalData(self._settings, self.reporter, self.ledger)
+        if self.data.streaming:
+            self.data.select()
+        else:
+            self.data.load()
+            self.reporter.generate_reports_filename(self.data.df)
+
+    def __new_session(self) -> SinanSession:
         """Create a session agent that will be used to make requests"""
-        self.session = requests.session()
-        self.session.headers.update({"User-Agent": USER_AGENT})
+        timeout = self._settings.get("desempenho", {}).get(
+            "tempo_limite_requisicao", REQUEST_TIMEOUT
+        )
+        session = SinanSession(timeout)
+        session.headers.update({"User-Agent": USER_AGENT})
+        return session
 
-    def __create_notification_researcher(self):
+    def __create_session(self):
+        """Create the main session agent"""
+        self.session = self.__new_session()
+
+    def __create_parse_executor(self):
+        """Create the executor that will parse the Sinan pages (inline or in a process pool)"""
+        processes = self._settings.get("desempenho", {}).get("processos_analise", 0)
+        self.parser = ParseExecutor(processes)
+
+    def __create_profiles(self):
+        """Create the profiles (agravo and municipality) of the run
+
+        Without `perfis` in the settings the run has the single profile of `sinan_investigacao`.
+        The exams are split by agravo and municipality (see `Profile`), so each pair must have a
+        single profile and the agravo must be the agravo of some GAL exam (`EXAMS_AGRAVO_MAP`),
+        otherwise its sessions would stay idle.
+
+        Raises:
+            ValueError: When a profile is repeated or its agravo has no exam
+        """
+        investigation = self._settings["sinan_investigacao"]
+        profiles = self._settings.get("perfis") or [investigation]
+        self.profiles = [
+            Profile(
+                profile["agravo"],
+                profile.get("municipio", investigation["municipio"]),
+            )
+            for profile in profiles
+        ]
+
+        profiles = Counter(
+            (profile.agravo, canonical_name_key(profile.municipality))
+            for profile in self.profiles
+        )
+        repeated = [
+            f"{agravo} ({municipality})"
+            for (agravo, municipality), count in profiles.items()
+            if count > 1
+        ]
+        if repeated:
+            raise ValueError(
+                f"Cada agravo e município deve ter um único perfil (repetidos: {', '.join(repeated)})"
+            )
+
+        # a single profile takes every exam, whatever their agravo
+        if len(self.profiles) > 1:
+            exams_agravos = set(EXAMS_AGRAVO_MAP.values())
+            unmapped = [
+                profile.agravo
+                for profile in self.profiles
+                if profile.agravo not in exams_agravos
+            ]
+            if unmapped:
+                raise ValueError(
+                    f"Nenhum exame do GAL é do agravo dos perfis: {', '.join(unmapped)}"
+                )
+
+        self.__profiles_by_agravo: dict[str, dict[str, Profile]] = {}
+        for profile in self.profiles:
+            self.__profiles_by_agravo.setdefault(profile.agravo, {})[
+                canonical_name_key(profile.municipality)
+            ] = profile
+
+    def __profile_of(self, patient: Patient) -> Optional[Profile]:
+        """Give the profile of an exam (see `Profile`)
+
+        Args:
+            patient (Patient): The exam
+
+        Returns:
+            Optional[Profile]: The profile or None if there is no profile for the exam
+        """
+        profiles = self.__profiles_by_agravo.get(patient.agravo or "", {})
+        if len(profiles) == 1:
+            return next(iter(profiles.values()))
+        return profiles.get(canonical_name_key(patient.municipality))
+
+    def __new_researcher(
+        self, session: requests.Session, profile: Profile
+    ) -> NotificationResearcher:
         """Create a notification searcher that will be used to research notifications given a patient"""
-        agravo = self._settings["sinan_investigacao"]["agravo"]
         criterios = self._settings["sinan_investigacao"]["criterios"]
-        municipality = self._settings["sinan_investigacao"]["municipio"]
-        self.researcher = NotificationResearcher(
-            self.session, agravo, municipality, criterios, self.reporter
+        return NotificationResearcher(
+            session,
+            profile.agravo,
+            profile.municipality,
+            criterios,
+            self.reporter,
+            self.parser,
+            self.journal,
+            self.search_cache,
+            self.snapshots,
+        )
+
+    def __create_search_cache(self):
+        """Create the cache of the search results shared by the sessions (disabled with a TTL of 0)"""
+        ttl = self._settings.get("desempenho", {}).get(
+            "cache_pesquisa", SEARCH_CACHE_TTL
+        )
+        self.search_cache = SearchCache(ttl) if ttl else None
+
+    def __create_snapshots(self):
+        """Create the store of the notification pages (disabled with a maximum age of 0)"""
+        max_age = self._settings.get("desempenho", {}).get(
+            "cache_fichas", SNAPSHOT_MAX_AGE
+        )
+        self.snapshots = NotificationSnapshots(max_age=max_age) if max_age else None
+
+    def __create_notification_researcher(self):
+        """Create the notification searcher of the main session"""
+        self.researcher = self.__new_researcher(self.session, self.profiles[0])
+
+    def __create_journal(self):
+        """Create the journal of the batch progress (kept from the interrupted run when resuming)"""
+        if self._dry_run:
+            # nothing is submitted, the journal of an interrupted run is kept untouched
+            self.journal = None
+            return
+
+        self.journal = Journal(resume=self._resume)
+        if self.journal.rotated:
+            display(
+                f"Diário da execução anterior guardado em {self.journal.rotated}. Para retomá-la, "
+                f"renomeie-o para {self.journal.path.name} e execute com --resume.",
+                category="info",
+            )
+        if self._resume:
+            display(
+                "Retomando a execução anterior: exames finalizados serão ignorados.",
+                category="info",
+            )
+
+    def __create_plan_writer(self):
+        """Create the plan writer of the dry-run (the decided actions are written instead of submitted)"""
+        self.plan = PlanWriter() if self._dry_run else None
+
+    def __create_ledger(self):
+        """Create the ledger of the exams processed (used to skip the settled ones in the next runs)"""
+        self.ledger = ExamLedger()
+
+    def __create_scheduler(self):
+        """Create the scheduler of the patients, the costs are estimated from the ledger history"""
+        performance = self._settings.get("desempenho", {})
+        self.scheduler = Scheduler(
+            CostModel(self.ledger.average_timings(), self.ledger.notification_counts()),
+            performance.get("agendamento", "ordem"),
+            performance.get("janela_agendamento", SCHEDULING_WINDOW),
         )
 
     def __create_duplicate_checker(self):
         """Create a duplicate checker instance that will be used to analyze duplicates"""
         self.duplicate_checker = DuplicateChecker(self.session, self.reporter)
 
+    def __create_lanes(self):
+        """Create the lanes (sessions) of the pipeline, `sessoes` for each profile
+
+        The first lane uses the main session.
+        """
+        sessions = max(1, self._settings.get("desempenho", {}).get("sessoes", 1))
+        self.lanes = [
+            Lane(self.session, self.researcher, self.duplicate_checker, self.profiles[0])
+        ]
+        for index, profile in enumerate(self.profiles):
+            # the main session is already a lane of the first profile
+            for _ in range(sessions - 1 if index == 0 else sessions):
+                session = self.__new_session()
+                self.lanes.append(
+                    Lane(
+                        session,
+                        self.__new_researcher(session, profile),
+                        DuplicateChecker(session, self.reporter),
+                        profile,
+                    )
+                )
+        for lane in self.lanes:
+            # a dropped session is logged in again as soon as it is detected
+            lane.session.on_session_expired = partial(self.__relogin, lane)
+
+        # the pipeline takes the lanes of the exam profile (a single pool with one profile)
+        self.__pools: dict[Optional[Profile], list[Lane]] = (
+            {None: self.lanes}
+            if len(self.profiles) == 1
+            else {
+                profile: [lane for lane in self.lanes if lane.profile == profile]
+                for profile in self.profiles
+            }
+        )
+
     def _init_apps(self):
         """Factory method to initialize the apps"""
         initializators = [
             self.__create_session,
+            self.__create_parse_executor,
+            self.__create_journal,
+            self.__create_profiles,
+            self.__create_search_cache,
+            self.__create_snapshots,
             self.__create_notification_researcher,
             self.__create_duplicate_checker,
+            self.__create_lanes,
+            self.__create_ledger,
+            self.__create_scheduler,
+            self.__create_plan_writer,
             self.__create_data_manager,
         ]
 
         for fn in initializators:
             fn()
 
-    def __verify_login(self, res: requests.Response):
+    def __verify_login(self, res: requests.Response, lane: Lane):
         """Verify if the login was successful
 
         Args:
             res (requests.Response): The response from the sinan website
+            lane (Lane): The lane of the logged session
         """
         soup = BeautifulSoup(res.content, "html.parser")
         if not soup.find("div", {"id": "detalheUsuario"}):
@@ -78,18 +368,41 @@ class InvestigationBot(Bot):
             exit(1)
 
         # update the apps that use the session
-        need_session = [self.researcher, self.duplicate_checker]
+        need_session = [lane.researcher, lane.duplicate_checker]
         for app in need_session:
-            setattr(app, "session", self.session)
+            setattr(app, "session", lane.session)
 
     def _login(self):
-        """Login to the Sinan Website"""
+        """Login to the Sinan Website (once for each lane)"""
+        for lane in self.lanes:
+            self.__login(lane)
+
+    def __relogin(self, lane: Lane):
+        """Login again a session dropped by the Sinan (see `SinanSession`)
+
+        Args:
+            lane (Lane): The lane of the session
+        """
+        display("Sessão expirada no Sinan. Fazendo login novamente...", category="erro")
+        lane.session.cookies.clear()
+        self.__login(lane)
+
+    def __login(self, lane: Lane):
+        """Login a session to the Sinan Website
+
+        Args:
+            lane (Lane): The lane of the session
+        """
         display(
             "Fazendo login utilizando as credenciais fornecidas...", category="info"
         )
+        # the results page of the previous server session is lost
+        lane.session.results_page = None
+        if self.search_cache:
+            self.search_cache.moved(lane.session)
 
         # set JSESSIONID
-        res = self.session.get(f"{SINAN_BASE_URL}/sinan/login/login.jsf")
+        res = lane.session.get(f"{SINAN_BASE_URL}/sinan/login/login.jsf")
 
         soup = BeautifulSoup(res.content, "html.parser")
         form = valid_tag(soup.find("form"))
@@ -110,59 +423,670 @@ class InvestigationBot(Bot):
                 value = self._password
             payload[name] = value
 
-        res = self.session.post(
+        res = lane.session.post(
             f"{SINAN_BASE_URL}{form.get('action')}",
             data=payload,
             headers={"Content-Type": "application/x-www-form-urlencoded"},
         )
-        self.__verify_login(res)
+        self.__verify_login(res, lane)
         display("Login efetuado com sucesso!", category="sucesso")
 
-    def __fill_form(self, patient: Patient):
-        """Fill out the form with the patient data
+    def __plan(
+        self, lane: Lane, results: list[tuple[Patient, list[Sheet]]]
+    ) -> list[ExamTask]:
+        """Decide what will be done for the exams of the same patient (nothing is submitted here)
+
+        The exams with a single result in the same notification are filled together, in only one
+        investigation visit (see `Sheet.investigate_patient`). The sheets of the exams with
+        multiple results are analyzed by the duplicate checker.
 
         Args:
-            patient (Patient): The patient data
-        """
-        self.reporter.increment_stat("patients")
-        sheets = self.researcher.search(patient)
+            lane (Lane): The lane of the search
+            results (list[tuple[Patient, list[Sheet]]]): Each exam and the results of its search
 
-        self.reporter.set_patient(patient)
-        match len(sheets):
-            case 0:
-                display(
-                    f"Nenhum resultado encontrado para {patient.name}. Ignorado.",
-                    category="info",
+        Returns:
+            list[ExamTask]: The tasks to be executed (see `__execute`)
+        """
+        tasks: list[ExamTask] = []
+        by_notification: dict[str, list[tuple[Patient, Sheet]]] = {}
+        for patient, sheets in results:
+            with self.__lock:
+                # a postponed exam is decided again, but counted only once
+                if patient.key is None or patient.key not in self.__decided:
+                    self.__decided.add(patient.key)
+                    self.__progress += 1
+                progress = self.__progress
+            display(
+                f"[{progress} de {self.__total}] Preenchendo investigação do paciente {patient.name}...",
+                category="info",
+            )
+            self.reporter.increment_stat("patients")
+            if self.journal:
+                self.journal.append(
+                    patient.key,
+                    "decided",
+                    ";".join(sheet.notification_number for sheet in sheets),
                 )
-                self.reporter.error("Paciente ignorado por não ter nenhum resultado.")
-                self.reporter.increment_stat("patients_not_found")
-            case 1:
+            self.reporter.set_patient(patient)
+            match len(sheets):
+                case 0:
+                    display(
+                        f"Nenhum resultado encontrado para {patient.name}. Ignorado.",
+                        category="info",
+                    )
+                    self.reporter.error(
+                        "Paciente ignorado por não ter nenhum resultado."
+                    )
+                    self.reporter.increment_stat("patients_not_found")
+                    if self.search_cache:
+                        self.search_cache.forget(patient.key)
+                    tasks.append(ExamTask([patient], [], "not_found", []))
+                case 1:
+                    sheet = sheets[0]
+                    by_notification.setdefault(sheet.notification_number, []).append(
+                        (patient, sheet)
+                    )
+                case _:
+                    display(
+                        f"Múltiplos resultados encontrados para {patient.name}.",
+                        category="info",
+                    )
+                    self.reporter.warn("Paciente tem mais de 1 resultado (duplicidade).")
+                    self.reporter.increment_stat("duplicates")
+                    tasks.append(
+                        ExamTask(
+                            [patient],
+                            lane.duplicate_checker.decide_multiple(patient, sheets),
+                            "duplicates",
+                            [sheet.notification_number for sheet in sheets],
+                        )
+                    )
+
+        for exams in by_notification.values():
+            patient, sheet = exams[0]
+            patients = [exam for exam, _ in exams]
+            if len(exams) == 1:
                 display(
                     f"Preechendo investigação do resultado encontrado para {patient.name}.",
                     category="info",
                 )
-                sheet = next(iter(sheets))
-                sheet.investigate_patient()
-            case _:
+                action = SheetAction("investigate", sheet)
+            else:
                 display(
-                    f"Múltiplos resultados encontrados para {patient.name}.",
+                    f"Preechendo investigação do resultado encontrado para {patient.name} com {len(exams)} exames na mesma ficha.",
                     category="info",
                 )
-                self.reporter.warn("Paciente tem mais de 1 resultado (duplicidade).")
-                self.reporter.increment_stat("duplicates")
-                self.duplicate_checker.investigate_multiple(patient, sheets)
+                action = SheetAction("investigate", sheet, patients)
+            tasks.append(ExamTask(patients, [action], None, [sheet.notification_number]))
 
-    def start(self):
-        """Start the investigation bot process"""
-        self._login()
-        total = len(self.data.df)
-        for i, patient in self.data.df.iterrows():
-            i += 1  # type: ignore
-            patient = Patient(patient.to_dict())
+        return tasks
+
+    def __execute(self, tasks: list[ExamTask]):
+        """Submit the decided actions to the Sinan website and record the outcome of each exam
+
+        Args:
+            tasks (list[ExamTask]): The tasks decided by `__plan`
+        """
+        for task in tasks:
+            self.reporter.set_patient(task.patients[0])
+            # every action runs, even after a failed one (eg. the deletions of a duplicity)
+            succeeded = all([action.run() for action in task.actions])
+            self.__finish_task(task, succeeded)
+
+    def __finish_task(self, task: Union[ExamTask, PlannedTask], succeeded: bool):
+        """Record the outcome of the exams of an executed task
+
+        Args:
+            task (Union[ExamTask, PlannedTask]): The task executed
+            succeeded (bool): If every action of the task succeeded
+        """
+        outcome = task.outcome or ("investigated" if succeeded else "error")
+        for patient in task.patients:
+            self.__finish_exam(patient, outcome, task.notification_numbers)
+        display("\n" + "*" * 25, category="info", end="\n\n")
+
+    def __execute_planned(self, lane: Lane, task: PlannedTask):
+        """Execute an entry of a reviewed plan, locating each notification by its number
+
+        The results page is kept by the Sinan in the session, so each notification is searched
+        right before its action.
+
+        Args:
+            lane (Lane): The lane used by the entry
+            task (PlannedTask): The entry of the plan
+        """
+        with self.__lock:
+            if not self.__attempt:
+                self.__progress += 1
+            progress = self.__progress
+        patient = task.patients[0]
+        display(
+            f"[{progress} de {self.__total}] Executando o plano do paciente {patient.name}...",
+            category="info",
+        )
+        self.reporter.increment_stat("patients")
+
+        succeeded = True
+        lane.session.set_budget(self.__patient_budget)
+        try:
+            with lane.session.metered():
+                for planned in task.actions:
+                    sheet = lane.researcher.locate(
+                        planned.notification_number, planned.patients[0]
+                    )
+                    if sheet is None:
+                        succeeded = False
+                        continue
+
+                    patients = (
+                        planned.patients if planned.kind == "investigate" else None
+                    )
+                    action = SheetAction(planned.kind, sheet, patients)
+                    succeeded = action.run() and succeeded
+        except RETRYABLE_ERRORS as error:
+            # the actions already done are skipped on the retry (see `Journal`)
+            self.__postpone(task.patients, error, task)
+            return
+
+        self.reporter.set_patient(patient)
+        self.__finish_task(task, succeeded)
+
+    def __finish_exam(
+        self, patient: Patient, outcome: str, notification_numbers: Sequence[str] = ()
+    ):
+        """Record the outcome of an exam in the ledger and mark it as finished in the journal
+
+        A dry-run changes nothing on the Sinan, so neither the ledger nor the journal is written.
+
+        Args:
+            patient (Patient): The exam
+            outcome (str): The outcome (eg. "investigated", "not_found")
+            notification_numbers (Sequence[str], optional): The notification numbers involved. Defaults to ().
+        """
+        if not self._dry_run:
+            self.ledger.record(patient.key, outcome, notification_numbers)
+        if self.journal:
+            self.journal.append(patient.key, "done", ";".join(notification_numbers))
+        self.__finished.add(patient.key)
+
+    def __apply_strategy(self, strategy: RetryStrategy):
+        """Prepare the sessions for a retry round
+
+        Args:
+            strategy (RetryStrategy): The strategy of the round
+        """
+        for lane in self.lanes:
+            lane.session.request_interval = strategy.request_interval
+            if strategy.fresh_session:
+                # a new JSESSIONID, the server state of the failed pages is left behind
+                lane.session.cookies.clear()
+                self.__login(lane)
+
+    def __retry_failed(self, process: Callable[[list], None]):
+        """Replay the failed groups (or plan entries) after the main pass, escalating the strategy each round
+
+        Args:
+            process (Callable[[list], None]): Processes a list of groups (or plan entries)
+        """
+        for attempt, strategy in enumerate(RETRY_STRATEGIES[: self.__max_attempts], 1):
+            failed = self.__retry.drain()
+            if not failed:
+                return
+
+            items = [item for items in failed.values() for item in items]
+            counts = "; ".join(
+                f"{FAILURE_CLASSES_TRANSLATED[failure]}: {len(items)}"
+                for failure, items in failed.items()
+            )
             display(
-                f"[{i} de {total}] Preenchendo investigação do paciente {patient.name}...",
+                f"Tentativa {attempt} de {self.__max_attempts} ({strategy.description}): reprocessando {len(items)} paciente(s) que falharam ({counts}).",
                 category="info",
             )
-            self.__fill_form(patient)
-            display("\n" + "*" * 25, category="info", end="\n\n")
+            self.__attempt = attempt
+            self.__apply_strategy(strategy)
+            if strategy.split_groups:
+                # each exam searched alone (plan entries are already one per task)
+                split = []
+                for item in items:
+                    if isinstance(item, list):
+                        split.extend([exam] for exam in item)
+                    else:
+                        split.append(item)
+                items = split
+            process(items)
+
+    def __write_plan(self, tasks: list[ExamTask]):
+        """Write the tasks to the plan of the dry-run (instead of submitting them)
+
+        Args:
+            tasks (list[ExamTask]): The tasks decided by `__plan`
+        """
+        self.plan.write(tasks)
+        for task in tasks:
+            self.__finished.update(patient.key for patient in task.patients)
+
+    def __postpone(
+        self,
+        group: list[Patient],
+        error: Exception,
+        item: Optional[PlannedTask] = None,
+    ):
+        """Postpone the unfinished exams of a group that failed (see `core.retry.classify_failure`)
+
+        The postponed exams are replayed after the main pass (`__retry_failed`). After the last
+        round they are finished with the failure class as outcome (processed in the next run).
+
+        Args:
+            group (list[Patient]): The exams of a patient
+            error (Exception): The error raised
+            item (Optional[PlannedTask], optional): The plan entry to replay instead of the exams. Defaults to None.
+        """
+        failure = classify_failure(error)
+        pending = [patient for patient in group if patient.key not in self.__finished]
+        if not pending:
+            return
+
+        patient = pending[0]
+        reason = FAILURE_CLASSES_TRANSLATED[failure]
+        self.reporter.set_patient(patient)
+        if self.__attempt >= self.__max_attempts:
+            display(
+                f"Paciente {patient.name} falhou ({reason}) e não será mais tentado nesta execução.",
+                category="erro",
+            )
+            self.reporter.error(
+                "Paciente não concluído após todas as tentativas.",
+                f"{reason} | {type(error).__name__}: {error}",
+            )
+            self.reporter.increment_stat("failed_exams", len(pending))
+            for exam in pending:
+                self.__finish_exam(exam, failure)
+            return
+
+        display(
+            f"Paciente {patient.name} falhou ({reason}). Será processado novamente no final da execução.",
+            category="info",
+        )
+        self.reporter.warn(
+            "Paciente falhou e foi adiado para uma nova tentativa no final da execução.",
+            f"{reason} | {type(error).__name__}: {error}",
+        )
+        self.reporter.increment_stat("postponed_exams", len(pending))
+        self.__retry.add(failure, item or pending)
+
+    def __search(self, lane: Lane, group: list[Patient]) -> Work:
+        """Search stage: search the notifications of the exams of the same patient
+
+        Args:
+            lane (Lane): The lane used by the group
+            group (list[Patient]): The exams of a patient
+
+        Returns:
+            Work: The found results and the exams without them
+        """
+        started = time.perf_counter()
+        lane.session.set_budget(self.__patient_budget)
+        try:
+            with lane.session.metered():
+                # the exams of the same patient share the same search
+                results, without_results = lane.researcher.search_group(group)
+        except RETRYABLE_ERRORS as error:
+            self.__postpone(group, error)
+            return Work(lane, group, [], [], expired=True)
+
+        elapsed = time.perf_counter() - started
+        return Work(lane, group, results, without_results, elapsed=elapsed)
+
+    def __decide(self, work: Work) -> Work:
+        """Decision stage: decide the actions for the found results (duplicity analysis)
+
+        Args:
+            work (Work): The searched group
+
+        Returns:
+            Work: The group with its tasks
+        """
+        if work.expired:
+            return work
+        started = time.perf_counter()
+        tasks = self.__plan(work.lane, work.results)
+        return work._replace(
+            tasks=tasks, elapsed=work.elapsed + time.perf_counter() - started
+        )
+
+    def __write(self, work: Work):
+        """Write stage: submit the decided actions, then search and fill the exams without results
+
+        In a dry-run the tasks are written to the plan instead of being submitted.
+
+        Args:
+            work (Work): The decided group
+        """
+        if work.expired:
+            return
+
+        apply = self.__write_plan if self.plan else self.__execute
+        lane = work.lane
+        started = time.perf_counter()
+        results = {id(patient): len(sheets) for patient, sheets in work.results}
+        try:
+            with lane.session.metered():
+                apply(work.tasks)
+                # a new search replaces the shared results page (see `search_group`)
+                for patient in work.without_results:
+                    sheets = lane.researcher.search(
+                        patient, use_notification_number=True
+                    )
+                    results[id(patient)] = len(sheets)
+                    apply(self.__plan(lane, [(patient, sheets)]))
+        except RETRYABLE_ERRORS as error:
+            self.__postpone(work.group, error)
+            return
+
+        if not self.plan:
+            self.__record_timings(
+                work.group, results, work.elapsed + time.perf_counter() - started
+            )
+
+    def __record_timings(
+        self, group: list[Patient], results: dict[int, int], elapsed: float
+    ):
+        """Record the time spent on the exams of a patient (the history of the scheduler costs)
+
+        Args:
+            group (list[Patient]): The exams of the patient
+            results (dict[int, int]): The number of results found by exam (`id` of the patient)
+            elapsed (float): The seconds spent on the patient (shared by its exams)
+        """
+        seconds = elapsed / len(group)
+        self.ledger.record_timings(
+            (patient.exam_type, results.get(id(patient), 0), seconds)
+            for patient in group
+            if patient.exam_type is not None
+        )
+
+    def __skip_finished(self, group: list[Patient]) -> list[Patient]:
+        """Remove the exams finished before the interruption of the resumed run
+
+        Args:
+            group (list[Patient]): The exams of a patient
+
+        Returns:
+            list[Patient]: The exams still to be processed
+        """
+        pending = [
+            patient for patient in group if not self.journal.is_finished(patient.key)
+        ]
+        finished = len(group) - len(pending)
+        if finished:
+            with self.__lock:
+                self.__progress += finished
+            self.reporter.increment_stat("resumed_exams", finished)
+        return pending
+
+    def __update_memory_stats(self):
+        """Update the memory stats of the report with the last tracked patient"""
+        allocation = self.memory.last_allocation_mb
+        self.reporter.increment_stat("patient_allocation_mb", allocation)
+        self.reporter.set_stat(
+            "max_patient_allocation_mb",
+            max(self.reporter.stats["max_patient_allocation_mb"], allocation),
+        )
+        self.reporter.set_stat("traced_memory_mb", self.memory.traced_mb)
+        self.reporter.set_stat("peak_rss_mb", peak_rss_mb() or 0.0)
+
+    def __groups(self) -> Iterator[list[Patient]]:
+        """Iterate over the exams grouped by patient (the finished ones are skipped when resuming)
+
+        With several profiles the exams of a patient are also split by profile.
+
+        Yields:
+            list[Patient]: The exams of a patient
+        """
+        for batch in self.data.batches(self.reporter.generate_reports_filename):
+            for group in group_patients(batch):
+                if self._resume:
+                    group = self.__skip_finished(group)
+                    if not group:
+                        continue
+                if len(self.profiles) == 1:
+                    yield group
+                    continue
+
+                by_profile: dict[Optional[Profile], list[Patient]] = {}
+                for patient in group:
+                    by_profile.setdefault(self.__profile_of(patient), []).append(patient)
+
+                for profile, exams in by_profile.items():
+                    if profile is None:
+                        self.__skip_without_profile(exams)
+                        continue
+                    self.__dispatched[profile] += len(exams)
+                    yield exams
+
+    def __profiles_summary(self):
+        """Show the exams processed by each profile (when there are several)"""
+        if len(self.profiles) == 1:
+            return
+
+        for profile in self.profiles:
+            message = (
+                f"Perfil {profile.agravo} ({profile.municipality}): "
+                f"{self.__dispatched[profile]} exames processados."
+            )
+            display(message, category="info")
+            self.reporter.info(message)
+
+    def __skip_without_profile(self, exams: list[Patient]):
+        """Report the exams of an agravo and municipality without profile (they are not processed)
+
+        Args:
+            exams (list[Patient]): The exams of the same patient without profile
+        """
+        for patient in exams:
+            self.reporter.set_patient(patient)
+            self.reporter.warn(
+                "Agravo ou município do exame sem perfil configurado. Exame ignorado.",
+                f"Agravo: {patient.agravo or 'desconhecido'} | Município de residência: {patient.municipality or 'desconhecido'}",
+            )
+        with self.__lock:
+            self.__progress += len(exams)
+
+    def __load_notification_index(self):
+        """Load the notifications listing of each agravo to match the patients locally
+
+        Enabled by `desempenho.pesquisa_em_lote`: the listing is loaded once by the first lane of
+        the agravo and shared by the lanes of its profiles, so the patients are no longer searched
+        by criteria. A listing without the notification number or the patient name columns is
+        discarded (the patients are searched as usual).
+        """
+        if not self._settings.get("desempenho", {}).get("pesquisa_em_lote", False):
+            return
+
+        for agravo in dict.fromkeys(profile.agravo for profile in self.profiles):
+            lanes = [lane for lane in self.lanes if lane.profile.agravo == agravo]
+            index = NotificationIndex(lanes[0].researcher.list_notifications())
+            if not index.usable:
+                message = "Colunas da lista de notificações não reconhecidas. Os pacientes serão pesquisados individualmente."
+                display(message, category="erro")
+                self.reporter.warn(message, f"Agravo: {agravo}")
+                continue
+
+            for lane in lanes:
+                lane.researcher.index = index
+            message = f"Lista de notificações do agravo {agravo} carregada: {len(index)} notificações."
+            display(message, category="sucesso")
+            self.reporter.info(message)
+
+    def __route(self, item: Union[list[Patient], PlannedTask]) -> Optional[Profile]:
+        """Give the pool of lanes (profile) of a group of exams or a plan entry
+
+        Args:
+            item (Union[list[Patient], PlannedTask]): The work unit
+
+        Returns:
+            Optional[Profile]: The profile of the lanes, None when there is a single profile
+                (or when the work unit has no profile)
+        """
+        if len(self.profiles) == 1:
+            return None
+        patients = item.patients if isinstance(item, PlannedTask) else item
+        return self.__profile_of(patients[0])
+
+    def __run_pipeline(self, groups: Iterable[list[Patient]]):
+        """Run the groups through the search, decision and write stages in parallel
+
+        Each stage has its own workers and a bounded queue, so slow writes don't stop the searches
+        until every session (lane) is taken. The memory is not tracked by patient in this mode.
+        """
+        performance = self._settings.get("desempenho", {})
+        sessions = len(self.lanes)
+        pipeline = Pipeline(
+            self.__pools,
+            [
+                (
+                    "pesquisa",
+                    lambda job: self.__search(*job),
+                    performance.get("trabalhadores_pesquisa", sessions),
+                ),
+                ("decisão", self.__decide, performance.get("trabalhadores_decisao", 1)),
+                (
+                    "escrita",
+                    self.__write,
+                    performance.get("trabalhadores_escrita", sessions),
+                ),
+            ],
+            queue_size=performance.get("tamanho_filas", sessions),
+            route=self.__route,
+        )
+        pipeline.run(groups)
+
+    def __process(self, groups: Iterable[list[Patient]]):
+        """Process the groups, in the pipeline when there are multiple sessions
+
+        Args:
+            groups (Iterable[list[Patient]]): The exams grouped by patient
+        """
+        if len(self.lanes) > 1:
+            self.__run_pipeline(groups)
+            return
+
+        lane = self.lanes[0]
+        # tracemalloc hooks every allocation, so the patients are only measured on demand
+        track_memory = self._settings.get("desempenho", {}).get("medir_memoria", False)
+        for group in groups:
+            if not track_memory:
+                self.__write(self.__decide(self.__search(lane, group)))
+                continue
+
+            with self.memory.track():
+                self.__write(self.__decide(self.__search(lane, group)))
+            self.__update_memory_stats()
             # input("Pressione Enter para prosseguir para o próximo paciente.")
+
+    def __execute_plan(self):
+        """Execute a reviewed plan (see `investigation.plan`), the entries are spread over the sessions"""
+        tasks = read_plan(self._plan_path)
+        self.__total = len(tasks)
+        if self._resume:
+            pending = [
+                task
+                for task in tasks
+                if not all(self.journal.is_finished(p.key) for p in task.patients)
+            ]
+            self.__progress += len(tasks) - len(pending)
+            self.reporter.increment_stat(
+                "resumed_exams",
+                sum(len(task.patients) for task in tasks)
+                - sum(len(task.patients) for task in pending),
+            )
+            tasks = pending
+
+        self.__run_planned(tasks)
+        self.__retry_failed(self.__run_planned)
+
+    def __run_planned(self, tasks: list[PlannedTask]):
+        """Execute the plan entries, in the pipeline when there are multiple sessions
+
+        Args:
+            tasks (list[PlannedTask]): The entries of the plan
+        """
+        if len(self.lanes) == 1:
+            for task in tasks:
+                self.__execute_planned(self.lanes[0], task)
+            return
+
+        if len(self.profiles) > 1:
+            routed: list[PlannedTask] = []
+            for task in tasks:
+                if self.__route(task) in self.__pools:
+                    routed.append(task)
+                else:
+                    self.__skip_without_profile(task.patients)
+            tasks = routed
+
+        performance = self._settings.get("desempenho", {})
+        sessions = len(self.lanes)
+        pipeline = Pipeline(
+            self.__pools,
+            [
+                (
+                    "escrita",
+                    lambda job: self.__execute_planned(*job),
+                    performance.get("trabalhadores_escrita", sessions),
+                )
+            ],
+            queue_size=performance.get("tamanho_filas", sessions),
+            route=self.__route,
+        )
+        pipeline.run(tasks)
+
+    def start(self):
+        """Start the investigation bot process"""
+        self._login()
+        self.__progress = 0
+        self.__lock = threading.Lock()
+        self.__patient_budget = self._settings.get("desempenho", {}).get(
+            "tempo_limite_paciente", PATIENT_TIME_BUDGET
+        )
+        self.__decided: set[Optional[int]] = set()
+        self.__finished: set[Optional[int]] = set()
+        self.__retry = RetryQueue()
+        self.__dispatched: Counter[Profile] = Counter()
+        self.__attempt = 0  # 0: main pass, then each retry round
+        self.__max_attempts = min(
+            self._settings.get("desempenho", {}).get(
+                "tentativas_falha", len(RETRY_STRATEGIES)
+            ),
+            len(RETRY_STRATEGIES),
+        )
+        try:
+            if self._plan_path:
+                self.__execute_plan()
+                return
+
+            # in streaming mode the total is unknown until the last chunk is loaded
+            self.__total = "?" if self.data.streaming else len(self.data.df)
+            self.__load_notification_index()
+            self.__process(self.scheduler.order(self.__groups()))
+            if self.scheduler.policy != "ordem":
+                self.reporter.info(self.scheduler.summary())
+            self.__retry_failed(self.__process)
+            self.reporter.set_stat("peak_rss_mb", peak_rss_mb() or 0.0)
+            self.__profiles_summary()
+            for store in (self.search_cache, self.snapshots):
+                if store:
+                    display(store.summary(), category="info")
+                    self.reporter.info(store.summary())
+        finally:
+            self.parser.shutdown()
+            self.memory.stop()
+            self.ledger.close()
+            if self.snapshots:
+                self.snapshots.close()
+            if self.journal:
+                self.journal.close()
+            if self.plan:
+                self.plan.close()
+                display(self.plan.summary(), category="sucesso")
+                self.reporter.info(self.plan.summary())
@@ -1,4 +1,8 @@
+import argparse
+from pathlib import Path
+
 from core.abstract import Bot
+from core.constants import PLAN_PATH
 from core.utils import clear_screen, get_settings
 from investigation import InvestigationBot
 
@@ -6,6 +10,28 @@ from investigation import InvestigationBot
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AutoSinan")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="retoma a execução interrompida, ignorando os exames já finalizados",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--dry-run",
+        action="store_true",
+        help=f"apenas pesquisa e decide, gravando as ações planejadas em {PLAN_PATH} sem alterar o Sinan",
+    )
+    mode.add_argument(
+        "--execute-plan",
+        nargs="?",
+        const=PLAN_PATH,
+        type=Path,
+        metavar="PLANO",
+        help=f"executa um plano revisado (padrão: {PLAN_PATH})",
+    )
+    args = parser.parse_args()
+
     clear_screen()
     settings = get_settings()
     bots: dict[str, type[Bot]] = {
@@ -18,4 +44,9 @@ if __name__ == "__main__":
 
     choice = int(input("Qual bot deseja executar? "))
     bot = bots[list(bots.keys())[choice - 1]]
-    bot(settings).start()
+    bot(
+        settings,
+        resume=args.resume,
+        dry_run=args.dry_run,
+        plan_path=args.execute_plan,
+    ).start()
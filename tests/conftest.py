@@ -0,0 +1,11 @@
+import pytest
+
+from core.constants import SCRIPT_GENERATED_PATH
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run the test inside a temporary folder (the generated files go to its `script`)"""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / SCRIPT_GENERATED_PATH).mkdir()
+    return tmp_path
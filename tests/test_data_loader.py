@@ -0,0 +1,44 @@
+import warnings
+
+import pandas as pd
+
+from core.constants import EXAM_KEY_COLUMN, EXAM_TYPE_COLUMN
+from investigation.data_loader import concat_datasets, prepare
+
+
+def _exams(*patients: str) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Paciente": list(patients),
+            "Nome da Mãe": ["Maria"] * len(patients),
+            "Exame": ["Dengue, IgM"] * len(patients),
+            "Data de Nascimento": pd.to_datetime(["2000-02-01"] * len(patients)),
+            "Data da Coleta": pd.to_datetime(["2024-01-03"] * len(patients)),
+        }
+    )
+
+
+def test_concat_datasets_ignores_the_empty_datasets():
+    full = prepare(_exams("José", "Ana"))
+    empty = prepare(_exams())
+    all_missing = prepare(pd.DataFrame({"Paciente": [None]}))
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        df = concat_datasets([empty, full, all_missing])
+
+    expected = concat_datasets([full])
+    assert len(df) == 2
+    assert df.dtypes.equals(expected.dtypes)
+    assert isinstance(df[EXAM_TYPE_COLUMN].dtype, pd.CategoricalDtype)
+    assert df[EXAM_KEY_COLUMN].tolist() == full[EXAM_KEY_COLUMN].tolist()
+
+
+def test_concat_datasets_unifies_the_categories():
+    igm = prepare(_exams("José"))
+    ns1 = _exams("Ana")
+    ns1["Exame"] = "Dengue, Detecção de Antígeno NS1"
+    df = concat_datasets([igm, prepare(ns1)])
+
+    assert isinstance(df[EXAM_TYPE_COLUMN].dtype, pd.CategoricalDtype)
+    assert df[EXAM_TYPE_COLUMN].tolist() == ["IgM", "NS1"]
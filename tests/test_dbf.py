@@ -0,0 +1,107 @@
+import struct
+from datetime import date
+
+import pandas as pd
+import pytest
+from dbfread import DBF
+
+from core.dbf import read_dbf
+
+FIELDS = [
+    ("NU_NOTIFIC", "C", 7, 0),
+    ("NM_PACIENT", "C", 20, 0),
+    ("NU_IDADE_N", "N", 4, 0),
+    ("VL_TAXA", "N", 6, 2),
+    ("DT_NOTIFIC", "D", 8, 0),
+    ("ST_ATIVO", "L", 1, 0),
+]
+
+RECORDS = [
+    (b" ", ["0000001", "JOÃO DA CONCEIÇÃO", "4012", "1.50", "20240131", "T"]),
+    (b"*", ["0000002", "REGISTRO APAGADO", "4030", "2.00", "20240201", "F"]),
+    (b" ", ["0000003", "", "", "", "", "?"]),
+    (b" ", ["0000004", "MARIA", "3005", "-0.25", "20231225", "n"]),
+]
+
+
+def write_dbf(path, fields, records, encoding="latin-1"):
+    """Write a dBase III file with the given fields and records"""
+    record_length = 1 + sum(length for _, _, length, _ in fields)
+    header_length = 32 + 32 * len(fields) + 1
+    content = bytearray(
+        struct.pack(
+            "<BBBBIHH20x", 0x03, 124, 1, 1, len(records), header_length, record_length
+        )
+    )
+    for name, field_type, length, decimals in fields:
+        content += struct.pack(
+            "<11sc4xBB14x",
+            name.encode("ascii"),
+            field_type.encode("ascii"),
+            length,
+            decimals,
+        )
+    content += b"\r"
+    for flag, values in records:
+        content += flag
+        for (_, field_type, length, _), value in zip(fields, values):
+            raw = value.encode(encoding)
+            content += raw.rjust(length) if field_type == "N" else raw.ljust(length)
+    content += b"\x1a"
+    path.write_bytes(bytes(content))
+
+
+def normalized(value):
+    """Compare the values of both readers (blank text is None here and "" on dbfread)"""
+    if value == "" or value is None or value is pd.NaT:
+        return None
+    if isinstance(value, float) and value != value:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.date()
+    return value
+
+
+@pytest.fixture
+def dbf_path(tmp_path):
+    path = tmp_path / "sinan.dbf"
+    write_dbf(path, FIELDS, RECORDS)
+    return path
+
+
+def test_read_dbf_matches_dbfread(dbf_path):
+    df = read_dbf(dbf_path)
+    expected = list(DBF(dbf_path, encoding="latin-1"))
+
+    assert list(df.columns) == [name for name, *_ in FIELDS]
+    assert len(df) == len(expected) == 3
+    for row, record in zip(df.to_dict("records"), expected):
+        assert {k: normalized(v) for k, v in row.items()} == {
+            k: normalized(v) for k, v in record.items()
+        }
+
+    assert df.loc[0, "NM_PACIENT"] == "JOÃO DA CONCEIÇÃO"
+    assert df.loc[1, "DT_NOTIFIC"] is pd.NaT
+    assert df.loc[1, "NM_PACIENT"] is None
+    assert df.loc[2, "DT_NOTIFIC"].date() == date(2023, 12, 25)
+    assert df.loc[2, "VL_TAXA"] == -0.25
+
+
+def test_read_dbf_projects_the_columns(dbf_path):
+    df = read_dbf(dbf_path, columns=["DT_NOTIFIC", "NU_NOTIFIC"])
+    assert list(df.columns) == ["DT_NOTIFIC", "NU_NOTIFIC"]
+    assert df["NU_NOTIFIC"].tolist() == ["0000001", "0000003", "0000004"]
+
+    df = read_dbf(dbf_path, columns=lambda name: name.startswith("NU_"))
+    assert list(df.columns) == ["NU_NOTIFIC", "NU_IDADE_N"]
+
+    with pytest.raises(ValueError):
+        read_dbf(dbf_path, columns=["NU_NOTIFIC", "CS_SEXO"])
+
+def test_read_dbf_ignores_records_past_the_end(dbf_path):
+    content = dbf_path.read_bytes()
+    # the header still counts the last record, but the export was cut in its middle
+    dbf_path.write_bytes(content[:-10])
+
+    df = read_dbf(dbf_path)
+    assert df["NU_NOTIFIC"].tolist() == ["0000001", "0000003"]
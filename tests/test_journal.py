@@ -0,0 +1,54 @@
+from core.journal import Journal
+
+
+def test_resume_keeps_the_progress(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = Journal(path)
+    journal.append(1, "investigated", "123")
+    journal.append(1, "done", "123")
+    journal.append(2, "deleted", "456")
+    journal.close()
+
+    resumed = Journal(path, resume=True)
+    assert resumed.is_finished(1)
+    assert not resumed.is_finished(2)
+    assert resumed.has_done("investigated", [1], "123")
+    assert not resumed.has_done("investigated", [1, 2], "123")
+    assert resumed.notification_has_done("deleted", "456")
+    resumed.close()
+
+
+def test_partially_written_line_is_ignored(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = Journal(path)
+    journal.append(1, "done")
+    journal.close()
+    with path.open("a", encoding="utf-8") as f:
+        f.write('{"exam": 2, "step": "do')
+
+    resumed = Journal(path, resume=True)
+    resumed.append(3, "done")
+    resumed.close()
+
+    again = Journal(path, resume=True)
+    assert again.is_finished(1)
+    assert not again.is_finished(2)
+    assert again.is_finished(3)
+    again.close()
+
+
+def test_new_journal_keeps_the_previous_one(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = Journal(path)
+    journal.append(1, "done")
+    journal.close()
+
+    fresh = Journal(path)
+    assert fresh.rotated == tmp_path / "journal.jsonl.prev"
+    assert not fresh.is_finished(1)
+    fresh.close()
+
+    fresh.rotated.replace(path)
+    resumed = Journal(path, resume=True)
+    assert resumed.is_finished(1)
+    resumed.close()
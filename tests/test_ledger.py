@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from core.ledger import ExamLedger
+
+# keys above 2**63 are stored as negative integers by SQLite
+KEYS = [0, 12345, 2**63 - 1, 2**63, 2**64 - 1]
+
+
+def test_keys_round_trip(tmp_path):
+    path = tmp_path / "ledger.sqlite3"
+    ledger = ExamLedger(path)
+    for key in KEYS:
+        ledger.record(key, "investigated", ["123"])
+    ledger.record(None, "investigated")
+    ledger.close()
+
+    again = ExamLedger(path)
+    settled = again.settled_keys()
+    assert settled.dtype == np.uint64
+    assert sorted(int(key) for key in settled) == KEYS
+    again.close()
+
+
+def test_settled_keys_match_the_exam_hashes(tmp_path):
+    keys = pd.util.hash_pandas_object(pd.Series(["a", "b", "c", "d"]), index=False)
+    ledger = ExamLedger(tmp_path / "ledger.sqlite3")
+    ledger.record(int(keys[0]), "investigated", ["123"])
+    ledger.record(int(keys[1]), "not_found")
+    ledger.record(int(keys[3]), "investigated")
+
+    assert keys.isin(ledger.settled_keys()).tolist() == [True, False, False, True]
+    ledger.close()
+
+
+def test_notification_counts_of_unsettled_exams(tmp_path):
+    ledger = ExamLedger(tmp_path / "ledger.sqlite3")
+    ledger.record(2**64 - 1, "error", ["123", "456"])
+    ledger.record(2**63, "not_found")
+    ledger.record(1, "investigated", ["789"])
+    # the last outcome replaces the previous one
+    ledger.record(2**63, "error", ["123"])
+
+    assert ledger.notification_counts() == {2**64 - 1: 2, 2**63: 1}
+    ledger.close()
+
+
+def test_average_timings(tmp_path):
+    ledger = ExamLedger(tmp_path / "ledger.sqlite3")
+    ledger.record_timings([("PCR", 1, 10.0), ("PCR", 1, 20.0), ("IgM", 0, 5.0)])
+
+    assert ledger.average_timings() == {("PCR", 1): (15.0, 2), ("IgM", 0): (5.0, 1)}
+    ledger.close()
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+from core.utils import canonical_name_key
+from investigation.notification_index import NotificationIndex
+
+ROWS = [
+    {
+        "Nº Notificação": "1",
+        "Nome do Paciente": "José da Silva",
+        "Data de Nascimento": "01/02/2000",
+        "Nome da Mãe": "Maria",
+    },
+    {
+        "Nº Notificação": "2",
+        "Nome do Paciente": "JOSE SILVA",
+        "Data de Nascimento": "01/02/2000",
+        "Nome da Mãe": "Ana",
+    },
+    {
+        "Nº Notificação": "3",
+        "Nome do Paciente": "José Silva",
+        "Data de Nascimento": "05/05/1990",
+        "Nome da Mãe": "",
+    },
+]
+
+
+def _patient(name: str, birth_date: str, mother: str = "") -> SimpleNamespace:
+    return SimpleNamespace(
+        name_key=canonical_name_key(name),
+        f_birth_date=birth_date,
+        mother_key=canonical_name_key(mother),
+    )
+
+
+def test_columns_are_detected():
+    index = NotificationIndex(ROWS)
+
+    assert index.usable
+    assert len(index) == 3
+    assert index.columns == {
+        "number": "Nº Notificação",
+        "name": "Nome do Paciente",
+        "birth_date": "Data de Nascimento",
+        "mother": "Nome da Mãe",
+    }
+
+
+def test_match_by_canonical_name_birth_date_and_mother():
+    index = NotificationIndex(ROWS)
+
+    assert index.match(_patient("Jose Silva", "01/02/2000", "MARIA")) == ["1"]
+    assert index.match(_patient("Jose Silva", "01/02/2000")) == ["1", "2"]
+    assert index.match(_patient("Jose Silva", "05/05/1990", "Joana")) == ["3"]
+    assert index.match(_patient("Jose Silva", "02/02/2000", "Maria")) == []
+
+
+def test_listing_without_the_needed_columns_is_not_usable():
+    assert not NotificationIndex([]).usable
+    assert not NotificationIndex([{"Agravo": "A90"}]).usable
@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+import pytest
+
+from investigation.sinan import InvestigationBot, Profile
+
+
+def _bot(profiles=None) -> InvestigationBot:
+    bot = InvestigationBot.__new__(InvestigationBot)
+    bot._settings = {
+        "sinan_investigacao": {"agravo": "A90 - DENGUE", "municipio": "FLORIANOPOLIS"}
+    }
+    if profiles is not None:
+        bot._settings["perfis"] = profiles
+    bot._InvestigationBot__create_profiles()
+    return bot
+
+
+def _exam(agravo="A90 - DENGUE", municipality=None) -> SimpleNamespace:
+    return SimpleNamespace(agravo=agravo, municipality=municipality)
+
+
+def test_single_profile_from_the_investigation_settings():
+    bot = _bot()
+    profile_of = bot._InvestigationBot__profile_of
+
+    assert bot.profiles == [Profile("A90 - DENGUE", "FLORIANOPOLIS")]
+    # a single profile of the agravo takes its exams whatever the municipality
+    assert profile_of(_exam(municipality="Palhoça")) == bot.profiles[0]
+    assert profile_of(_exam(agravo=None)) is None
+
+
+def test_profiles_of_the_same_agravo_route_by_municipality():
+    bot = _bot(
+        [
+            {"agravo": "A90 - DENGUE"},
+            {"agravo": "A90 - DENGUE", "municipio": "SAO JOSE"},
+        ]
+    )
+    florianopolis, sao_jose = bot.profiles
+    profile_of = bot._InvestigationBot__profile_of
+
+    assert florianopolis == Profile("A90 - DENGUE", "FLORIANOPOLIS")
+    assert profile_of(_exam(municipality="Florianópolis")) == florianopolis
+    assert profile_of(_exam(municipality="SÃO JOSÉ")) == sao_jose
+    assert profile_of(_exam(municipality="Palhoça")) is None
+    assert profile_of(_exam()) is None
+
+
+def test_repeated_profile_is_refused():
+    with pytest.raises(ValueError, match="repetidos"):
+        _bot([{"agravo": "A90 - DENGUE"}, {"agravo": "A90 - DENGUE"}])
+
+
+def test_profile_of_an_agravo_without_exams_is_refused():
+    with pytest.raises(ValueError, match="CHIKUNGUNYA"):
+        _bot(
+            [
+                {"agravo": "A90 - DENGUE"},
+                {"agravo": "A92.0 - FEBRE DE CHIKUNGUNYA"},
+            ]
+        )
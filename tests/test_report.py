@@ -0,0 +1,26 @@
+import pandas as pd
+
+from core.constants import EXECUTION_DATE, SCRIPT_GENERATED_PATH
+from investigation.data_loader import REPORT_SUMMARY_COLUMNS
+from investigation.report import Report
+
+
+def test_reports_filename_without_exams_uses_the_run_date(workdir):
+    Report().generate_reports_filename(pd.DataFrame(columns=REPORT_SUMMARY_COLUMNS))
+
+    (report,) = (workdir / SCRIPT_GENERATED_PATH).glob("*.xlsx")
+    assert f"liberação {EXECUTION_DATE:%d.%m.%Y}" in report.name
+    assert "(nenhum exame)" in report.name
+
+
+def test_reports_filename_with_the_release_dates(workdir):
+    data = pd.DataFrame(
+        {
+            "Data da Liberação": pd.to_datetime(["2024-03-01", None, "2024-03-05"]),
+            "Exame": ["Dengue, IgM", None, "Dengue, IgM"],
+        }
+    )
+    Report().generate_reports_filename(data)
+
+    (report,) = (workdir / SCRIPT_GENERATED_PATH).glob("*.xlsx")
+    assert "(IgM) - liberação 01.03.2024 à 05.03.2024" in report.name
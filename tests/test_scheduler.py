@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from investigation.scheduler import CostModel, Scheduler
+
+
+def exam(name, exam_type, days=0, key=None):
+    return SimpleNamespace(
+        name=name,
+        exam_type=exam_type,
+        key=key,
+        collection_date=datetime.now() - timedelta(days=days),
+        notification_date=None,
+    )
+
+
+def names(groups):
+    return [group[0].name for group in groups]
+
+
+GROUPS = [
+    [exam("igm", "IgM", days=21)],
+    [exam("pcr", "PCR", days=0)],
+    [exam("ns1", "NS1", days=14)],
+    [exam("pcr+igm", "PCR", days=3), exam("pcr+igm", "IgM", days=3)],
+]
+
+
+def test_cost_model_uses_the_history():
+    model = CostModel(
+        {("IgM", 0): (10.0, 1), ("IgM", 3): (70.0, 3), ("PCR", 1): (12.0, 2)},
+        {7: 3, 8: 5},
+    )
+
+    # known number of results
+    assert model.exam_cost(exam("a", "IgM", key=7)) == 70.0
+    # average of the exam type (weighted by the exams recorded)
+    assert model.exam_cost(exam("b", "IgM", key=8)) == 55.0
+    assert model.exam_cost(exam("c", "IgM")) == 55.0
+    # no history of the exam type
+    assert model.exam_cost(exam("d", "NS1")) == 20.0
+    assert model.group_cost([exam("e", "PCR"), exam("f", "NS1")]) == 32.0
+
+
+@pytest.mark.parametrize(
+    "policy, expected",
+    [
+        ("ordem", ["igm", "pcr", "ns1", "pcr+igm"]),
+        ("custo", ["pcr", "ns1", "igm", "pcr+igm"]),
+        ("urgencia", ["igm", "ns1", "pcr+igm", "pcr"]),
+        ("equilibrado", ["ns1", "igm", "pcr", "pcr+igm"]),
+    ],
+)
+def test_policies(policy, expected):
+    scheduler = Scheduler(CostModel({}, {}), policy)
+    assert names(scheduler.order(GROUPS)) == expected
+
+
+def test_patients_are_reordered_by_window():
+    scheduler = Scheduler(CostModel({}, {}), "urgencia", window=2)
+
+    assert names(scheduler.order(GROUPS)) == ["igm", "pcr", "ns1", "pcr+igm"]
+    assert scheduler.scheduled == 4
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        Scheduler(CostModel({}, {}), "aleatorio")
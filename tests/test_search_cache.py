@@ -0,0 +1,94 @@
+import threading
+from types import SimpleNamespace
+
+from investigation import search_cache
+from investigation.search_cache import SearchCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def sheet(notification_number):
+    return SimpleNamespace(notification_number=notification_number)
+
+
+def test_concurrent_searches_are_made_once():
+    cache = SearchCache(ttl=60)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def search():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return []
+
+    results = []
+    first = threading.Thread(
+        target=lambda: results.append(cache.search("key", "a", search))
+    )
+    first.start()
+    started.wait(5)
+    second = threading.Thread(
+        target=lambda: results.append(cache.search("key", "b", search))
+    )
+    second.start()
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert calls == [1]
+    assert results == [[], []]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_results_are_kept_by_session():
+    cache = SearchCache(ttl=60)
+    found = [sheet("123")]
+
+    assert cache.search("key", "a", lambda: found) is found
+    # the results page is on the session that searched
+    assert cache.search("key", "a", lambda: []) is found
+    assert cache.search("key", "b", lambda: found) is found
+    assert cache.misses == 2
+
+    # the session "a" moved to another page
+    cache.moved("a")
+    assert cache.search("key", "a", lambda: None) is None
+
+
+def test_results_expire(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(search_cache.time, "monotonic", clock)
+    cache = SearchCache(ttl=10)
+
+    cache.search("key", "a", lambda: [])
+    clock.now = 5
+    assert cache.search("key", "b", lambda: [sheet("123")]) == []
+    clock.now = 11
+    assert cache.search("key", "b", lambda: [sheet("123")])[0].notification_number == "123"
+
+
+def test_invalidated_notification_is_searched_again():
+    cache = SearchCache(ttl=60)
+    cache.search("key", "a", lambda: [sheet("123")])
+
+    cache.invalidate("123")
+    assert cache.search("key", "a", lambda: []) == []
+
+
+def test_patient_not_found_is_searched_again():
+    cache = SearchCache(ttl=60)
+    cache.search("name", "a", lambda: [], tag=1)
+    cache.search("mother", "a", lambda: [], tag=1)
+    cache.search("other", "a", lambda: [], tag=2)
+
+    cache.forget(1)
+    assert cache.search("name", "b", lambda: [sheet("123")])[0].notification_number == "123"
+    assert cache.search("mother", "b", lambda: [sheet("456")])[0].notification_number == "456"
+    assert cache.search("other", "b", lambda: [sheet("789")]) == []
@@ -0,0 +1,106 @@
+import pytest
+
+from core import snapshots
+from core.snapshots import NotificationSnapshots
+
+PAGE = {
+    "investigation_tab_enabled": True,
+    "save_button_exists": False,
+    "javax.faces.ViewState": "state",
+}
+FORM_DATA = {
+    "form:nuNotificacao": "123",
+    "form:dtNotificacaoInputDate": "01/02/2024",
+    "form:notificacao_nome_paciente": "MARIA DA SILVA",
+}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(snapshots.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    store = NotificationSnapshots(tmp_path / "snapshots.sqlite3", max_age=60)
+    yield store
+    store.close()
+
+
+def test_only_the_checked_fields_are_stored(store):
+    store.put("123", PAGE, FORM_DATA)
+
+    snapshot = store.get("123")
+    assert snapshot.page == {"investigation_tab_enabled": True, "save_button_exists": False}
+    assert snapshot.form_data == {
+        "form:nuNotificacao": "123",
+        "form:dtNotificacaoInputDate": "01/02/2024",
+    }
+
+
+def test_snapshot_is_a_copy(store):
+    store.put("123", PAGE, FORM_DATA)
+
+    store.get("123").form_data["form:nuNotificacao"] = "456"
+    assert store.get("123").form_data["form:nuNotificacao"] == "123"
+
+
+def test_snapshots_expire(store, clock):
+    store.put("123", PAGE, FORM_DATA)
+
+    clock.now += 60
+    assert store.get("123") is not None
+    clock.now += 1
+    assert store.get("123") is None
+    assert (store.hits, store.misses) == (1, 1)
+
+
+def test_invalidated_snapshot_is_dropped(tmp_path, store):
+    store.put("123", PAGE, FORM_DATA)
+    store.invalidate("123")
+    assert store.get("123") is None
+
+    again = NotificationSnapshots(tmp_path / "snapshots.sqlite3", max_age=60)
+    assert again.get("123") is None
+    again.close()
+
+
+def test_snapshots_are_kept_for_the_next_runs(tmp_path, clock):
+    path = tmp_path / "snapshots.sqlite3"
+    store = NotificationSnapshots(path, max_age=60, memory_size=1)
+    store.put("123", PAGE, FORM_DATA)
+    store.put("456", PAGE, FORM_DATA)
+    # the least recently used is read back from the database
+    assert store.get("123").form_data["form:nuNotificacao"] == "123"
+    store.close()
+
+    again = NotificationSnapshots(path, max_age=60)
+    assert again.get("456") is not None
+    again.close()
+
+    clock.now += 61
+    expired = NotificationSnapshots(path, max_age=60)
+    assert expired.get("123") is None
+    expired.close()
+
+
+def test_snapshots_of_another_version_are_ignored(tmp_path, clock, monkeypatch):
+    path = tmp_path / "snapshots.sqlite3"
+    store = NotificationSnapshots(path, max_age=60)
+    store.put("123", PAGE, FORM_DATA)
+    store.close()
+
+    monkeypatch.setattr(snapshots, "SNAPSHOT_VERSION", snapshots.SNAPSHOT_VERSION + 1)
+    again = NotificationSnapshots(path, max_age=60)
+    assert again.get("123") is None
+    again.close()